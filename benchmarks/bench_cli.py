@@ -0,0 +1,78 @@
+"""Benchmark of full rulecheck runs from the command line.
+
+Writes a generated corpus to a temporary directory and times rulecheck processes checking it
+with the benchmark rules, using the fake srcml, in several configurations: one srcml run per
+file, batched srcml runs, several worker processes, streamed srcml output and a result cache
+filled by an earlier run. Process start up and rule loading are included.
+
+Run from the repository root:
+    python -m benchmarks.bench_cli [--files 100] [--lines 400] [--jobs 4]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# Local imports
+from benchmarks import common
+from benchmarks.corpus import generate_corpus
+
+def get_configurations(jobs:int, directory:str) -> dict:
+    """Returns the rulecheck options of each configuration, by name."""
+    return {"srcml per file": ["--srcml-batch-size", "1"],
+            "srcml batches": ["--srcml-batch-size", "25"],
+            "srcml jobs": ["--srcml-batch-size", "25", "--srcml-jobs", str(jobs)],
+            "jobs": ["--srcml-batch-size", "25", "-j", str(jobs)],
+            "srcml stream": ["--srcml-stream"],
+            "result cache": ["--srcml-batch-size", "25",
+                             "--result-cache", os.path.join(directory, "result-cache")]}
+
+def run_rulecheck(srcml_dir:str, corpus_dir:str, options:[str]):
+    command = [sys.executable, "-m", "rulecheck", "-c", common.RULES_CONFIG,
+               "-r", common.BENCHMARKS_DIR] + options + \
+              [os.path.join(corpus_dir, "**", "*.c*")]
+    # The fake srcml is found first in the path.
+    env = dict(os.environ, PATH=srcml_dir + os.pathsep + os.environ.get("PATH", ""))
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            env=env, check=False)
+    # 2 and 3 mean the rules reported violations, as they do on the corpus.
+    if result.returncode not in (0, 2, 3):
+        raise RuntimeError("rulecheck failed with " + str(result.returncode) + ": " +
+                           result.stderr.decode(errors="replace"))
+
+def run_benchmarks(options) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="rulecheck-bench-") as directory:
+        corpus_dir = os.path.join(directory, "corpus")
+        paths = generate_corpus(corpus_dir, options.files, options.lines, options.depth,
+                                seed=options.seed)
+        line_count = 0
+        for path in paths:
+            with open(path, newline="") as file_stream:
+                line_count += len(file_stream.readlines())
+        srcml_dir = os.path.dirname(common.write_fake_srcml(directory))
+
+        for name, rulecheck_options in get_configurations(options.jobs, directory).items():
+            if "--result-cache" in rulecheck_options:
+                # Fill the cache, only runs with every result cached are timed.
+                run_rulecheck(srcml_dir, corpus_dir, rulecheck_options)
+            results[name] = common.make_result(common.measure(
+                lambda rulecheck_options=rulecheck_options: run_rulecheck(srcml_dir, corpus_dir,
+                                                                          rulecheck_options),
+                options.repeat), len(paths), line_count)
+    return results
+
+def add_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--jobs", help="processes or srcml jobs for the parallel runs",
+                        default=4, type=int)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    common.add_corpus_arguments(parser)
+    add_arguments(parser)
+    common.print_results(run_benchmarks(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark of the xml end line computation used by RuleManager.run_rules_on_file.
+
+Generates srcML for C files of increasing size and times building the end line table
+(Srcml.get_xml_end_lines) against calling Srcml.get_xml_line for every end event. The time per
+line of the table should stay flat as the file grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_end_lines [--lines 50000] [--depth 12]
+"""
+
+import argparse
+import time
+
+# 3rd party imports
+from lxml import etree as ET
+
+# Local imports
+from rulecheck.srcml import Srcml
+
+SRCML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' \
+               '<unit xmlns="http://www.srcML.org/srcML/src" ' \
+               'xmlns:pos="http://www.srcML.org/srcML/position" revision="1.0.0" ' \
+               'language="C" filename="generated.c" pos:tabs="8">'
+
+def generate_srcml(line_count:int, depth:int) -> bytes:
+    """Returns srcML for a C file of about line_count lines made of functions whose bodies are
+    nested 'depth' if statements deep. The whole file is wrapped in an extern "C" block so the
+    unit and the outer block are as large as the file."""
+
+    lines = ['<extern pos:start="1:1" pos:end="{last}:1">extern <literal>"C"</literal> '
+             '<block pos:start="1:12" pos:end="{last}:1">{{<block_content>']
+    function_num = 0
+
+    while len(lines) < line_count - 1:
+        row = len(lines) + 1
+        lines.append('<function pos:start="%d:1"><type><name>void</name></type> '
+                     '<name>f%d</name><parameter_list>(<parameter><decl><type><name>int</name>'
+                     '</type> <name>x</name></decl></parameter>)</parameter_list>'
+                     ' <block>{<block_content>' % (row, function_num))
+        for level in range(depth):
+            lines.append('    <if_stmt><if>if <condition>(<expr><name>x</name> <operator>&gt;'
+                         '</operator> <literal type="number">%d</literal></expr>)</condition>'
+                         ' <block>{<block_content>' % level)
+        lines.append('    <expr_stmt><expr><call><name>work</name><argument_list>('
+                     '<argument><expr><name>x</name></expr></argument>)</argument_list>'
+                     '</call></expr>;</expr_stmt>')
+        for _ in range(depth):
+            lines.append('    </block_content>}</block></if></if_stmt>')
+        lines.append('</block_content>}</block></function>')
+        function_num += 1
+
+    lines.append('</block_content>}</block></extern>')
+    last = len(lines)
+    lines[0] = lines[0].format(last=last)
+
+    return (SRCML_HEADER + "\n".join(lines) + "\n</unit>\n").encode()
+
+def time_end_line_table(root) -> float:
+    start = time.perf_counter()
+    Srcml.get_xml_end_lines(root)
+    return time.perf_counter() - start
+
+def time_get_xml_line(root) -> float:
+    start = time.perf_counter()
+    for event, elem in ET.iterwalk(root, events=("start", "end")):
+        if event == "end":
+            Srcml.get_xml_line(elem, event)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", help="largest file size, in lines", default=50000, type=int)
+    parser.add_argument("--depth", help="if statement nesting depth", default=12, type=int)
+    parser.add_argument("--skip-per-element", help="do not time get_xml_line per end event",
+                        action="store_true")
+    args = parser.parse_args()
+
+    print("%8s %12s %14s %14s %14s" % ("lines", "table (s)", "table (us/ln)",
+                                        "per-elem (s)", "per-elem (us/ln)"))
+    for divisor in (8, 4, 2, 1):
+        line_count = args.lines // divisor
+        root = ET.fromstring(generate_srcml(line_count, args.depth))
+        table_time = time_end_line_table(root)
+        row = "%8d %12.4f %14.3f" % (line_count, table_time, table_time / line_count * 1e6)
+        if not args.skip_per_element:
+            element_time = time_get_xml_line(root)
+            row += " %14.4f %14.3f" % (element_time, element_time / line_count * 1e6)
+        print(row)
+
+if __name__ == "__main__":
+    main()
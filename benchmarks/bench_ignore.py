@@ -0,0 +1,105 @@
+"""Benchmark of IgnoreFilter on a generated ignore list.
+
+Generates an ignore list with entries for the files of a generated corpus, then times reading it,
+compiling it (see --compile-ignorelist), opening the compiled list, selecting the entries of each
+file with init_filter, and is_filtered lookups of which about half match an entry.
+
+Run from the repository root:
+    python -m benchmarks.bench_ignore [--files 100] [--entries 50]
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import random
+import tempfile
+
+# Local imports
+from rulecheck.ignore import IgnoreFilter
+from rulecheck.ignore import read_ignore_list
+from rulecheck.compiled_ignore import CompiledIgnoreList
+from rulecheck.compiled_ignore import compile_ignore_list
+from benchmarks import common
+from benchmarks.corpus import get_corpus_paths
+
+RULE_NAMES = ("benchrules.lineLength", "benchrules.commentWord", "benchrules.nestingDepth")
+
+def generate_ignore_list(file_names:[str], entries_per_file:int, seed:int) -> (str, list):
+    """Returns the text of an ignore list with entries_per_file entries for each file and the
+    (file name, rule name, line number, hash) lookups to time, half of them of listed
+    violations."""
+    rand = random.Random(seed)
+    lines = []
+    lookups = []
+    for file_name in file_names:
+        for entry_num in range(entries_per_file):
+            rule_name = rand.choice(RULE_NAMES)
+            line_num = rand.randrange(1, 1000)
+            line_hash = hashlib.md5((file_name + str(entry_num)).encode()).hexdigest()
+            lines.append(line_hash + ": " + file_name + ":" + str(line_num) + ":1: WARNING: " +
+                         rule_name + ": generated violation " + str(entry_num) + "\n")
+            lookups.append((file_name, rule_name, line_num, line_hash))
+            lookups.append((file_name, rule_name, line_num + 1,
+                            hashlib.md5(line_hash.encode()).hexdigest()))
+    return "".join(lines), lookups
+
+def run_benchmarks(options) -> dict:
+    file_names = [name.replace(os.sep, "/") for name in
+                  get_corpus_paths(options.files, seed=options.seed)]
+    ignore_list, lookups = generate_ignore_list(file_names, options.entries, options.seed)
+
+    lookups_by_file = {}
+    for file_name, rule_name, line_num, line_hash in lookups:
+        lookups_by_file.setdefault(file_name, []).append((rule_name, line_num, line_hash))
+
+    def check_files(ignore_filter:IgnoreFilter):
+        for file_name, file_lookups in lookups_by_file.items():
+            ignore_filter.init_filter(file_name)
+            for rule_name, line_num, line_hash in file_lookups:
+                ignore_filter.is_filtered(rule_name, line_num, line_hash)
+
+    with tempfile.TemporaryDirectory(prefix="rulecheck-bench-") as directory:
+        compiled_path = os.path.join(directory, "ignore.bin")
+
+        def compile_list():
+            with open(compiled_path, "wb") as output:
+                compile_ignore_list(read_ignore_list(io.StringIO(ignore_list), False), output)
+
+        def open_compiled_list():
+            IgnoreFilter(None, False, CompiledIgnoreList(compiled_path)).init_filter(
+                file_names[0])
+
+        # Entries of the ignore list, and lookups, are counted as lines.
+        entry_count = len(file_names) * options.entries
+        repeat = options.repeat
+        results = {
+            "read ignore list": common.make_result(
+                common.measure(lambda: IgnoreFilter(io.StringIO(ignore_list), False), repeat),
+                lines=entry_count),
+            "compile ignore list": common.make_result(common.measure(compile_list, repeat),
+                                                      lines=entry_count),
+            "open compiled ignore list": common.make_result(
+                common.measure(open_compiled_list, repeat)),
+            "init_filter and is_filtered": common.make_result(
+                common.measure(check_files, repeat,
+                               lambda: IgnoreFilter(io.StringIO(ignore_list), False)),
+                len(lookups_by_file), len(lookups)),
+            "init_filter and is_filtered, compiled": common.make_result(
+                common.measure(check_files, repeat,
+                               lambda: IgnoreFilter(None, False,
+                                                    CompiledIgnoreList(compiled_path))),
+                len(lookups_by_file), len(lookups))}
+    return results
+
+def add_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--entries", help="ignore list entries per file", default=50, type=int)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    common.add_corpus_arguments(parser)
+    add_arguments(parser)
+    common.print_results(run_benchmarks(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark of Logger.log_violation with each output format.
+
+Logs violations on the lines of a generated file, as the rules would, to a discarded output in
+each output format, and once more with an ignore list listing half of the violations. Hashing the
+violated line is included, as it is needed to match the ignore list and for --generatehashes.
+
+Run from the repository root:
+    python -m benchmarks.bench_logger [--violations 20000]
+"""
+
+import argparse
+import io
+import os
+
+# Local imports
+from rulecheck.ignore import IgnoreFilter
+from rulecheck.ignore import get_ignore_hash
+from rulecheck.logger import Logger
+from rulecheck.logger import OUTPUT_FORMATS
+from rulecheck.logger import OutputWriter
+from rulecheck.logger import create_output_sink
+from rulecheck.rule import LogFilePosition
+from rulecheck.rule import LogType
+from benchmarks import common
+from benchmarks.corpus import generate_source
+
+FILE_NAME = "dir0/file0.c"
+RULE_NAME = "benchrules.lineLength"
+
+def create_logger(output_format:str, ignore_filter:IgnoreFilter) -> Logger:
+    logger = Logger()
+    logger.set_ignore_filter(ignore_filter)
+    logger.set_output_sink(create_output_sink(output_format,
+                                              OutputWriter(open(os.devnull, "w"),
+                                                           OutputWriter.DEFAULT_BUFFER_SIZE),
+                                              "benchmark"))
+    return logger
+
+def run_benchmarks(options) -> dict:
+    lines = generate_source(options.seed, options.lines, options.depth).splitlines(keepends=True)
+    positions = [LogFilePosition(violation_num % len(lines) + 1, 1)
+                 for violation_num in range(options.violations)]
+
+    # Every other violation is in the ignore list.
+    ignore_list = "".join(get_ignore_hash(FILE_NAME, lines[pos.line - 1], False, "WARNING",
+                                          RULE_NAME) + ": " + FILE_NAME + ":" + str(pos.line) +
+                          ":1: WARNING: " + RULE_NAME + ": ignored\n"
+                          for pos in positions[::2])
+
+    def log_violations(logger:Logger):
+        for pos in positions:
+            logger.log_violation(LogType.WARNING, pos, "line is too long", False, FILE_NAME,
+                                 RULE_NAME, lines)
+        logger.get_output_sink().finish()
+        logger.flush_output()
+
+    def setup_ignore_list() -> Logger:
+        ignore_filter = IgnoreFilter(io.StringIO(ignore_list), False)
+        ignore_filter.init_filter(FILE_NAME)
+        return create_logger("text", ignore_filter)
+
+    results = {}
+    for output_format in OUTPUT_FORMATS:
+        samples = common.measure(log_violations, options.repeat,
+                                 lambda output_format=output_format:
+                                 create_logger(output_format, IgnoreFilter(None, False)))
+        results["log_violation " + output_format] = common.make_result(samples,
+                                                                       lines=len(positions))
+    results["log_violation text with ignore list"] = common.make_result(
+        common.measure(log_violations, options.repeat, setup_ignore_list), lines=len(positions))
+    return results
+
+def add_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--violations", help="violations to log", default=20000, type=int)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    common.add_corpus_arguments(parser)
+    add_arguments(parser)
+    common.print_results(run_benchmarks(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
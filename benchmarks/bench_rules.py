@@ -0,0 +1,83 @@
+"""Benchmark of RuleManager.run_rules_on_file on a generated corpus.
+
+Loads the benchmark rule pack (benchmarks/benchrules.json) and runs it over the files of a
+generated corpus, with srcML made in memory by the fake srcml, so neither srcml nor the disk
+are involved. Parsing the srcML into File objects is timed on its own.
+
+Run from the repository root:
+    python -m benchmarks.bench_rules [--files 100] [--lines 400] [--depth 6]
+"""
+
+import argparse
+import os
+
+# Local imports
+from rulecheck.file import File
+from rulecheck.ignore import IgnoreFilter
+from rulecheck.logger import LOGGER
+from rulecheck.logger import OutputWriter
+from rulecheck.logger import TextSink
+from rulecheck.logger import log_violation_wrapper
+from rulecheck.rule import Rule
+from rulecheck.rule_manager import RuleManager
+from benchmarks import common
+from benchmarks.corpus import generate_source
+from benchmarks.corpus import get_corpus_paths
+from benchmarks.fake_srcml import to_srcml
+
+def get_corpus(options) -> [(str, [str], bytes)]:
+    """Returns the (file name, lines, srcml) of each file of the corpus described by options."""
+    corpus = []
+    for file_num, file_name in enumerate(get_corpus_paths(options.files, seed=options.seed)):
+        text = generate_source(options.seed * 1000003 + file_num, options.lines, options.depth,
+                               file_name.endswith(".cpp"))
+        corpus.append((file_name, text.splitlines(keepends=True),
+                       to_srcml(text, file_name, "C++" if file_name.endswith(".cpp") else "C")))
+    return corpus
+
+def create_rule_manager(ignore_filter:IgnoreFilter = None) -> RuleManager:
+    """Returns a RuleManager with the benchmark rules loaded, logging through the global LOGGER
+    to a discarded output."""
+    ignore_filter = ignore_filter or IgnoreFilter(None, False)
+    LOGGER.set_ignore_filter(ignore_filter)
+    LOGGER.set_output_sink(TextSink(OutputWriter(open(os.devnull, "w"),
+                                                 OutputWriter.DEFAULT_BUFFER_SIZE)))
+    Rule.set_logger(log_violation_wrapper)
+
+    rule_manager = RuleManager(LOGGER, ignore_filter, False)
+    rule_manager.load_rules([common.RULES_CONFIG], [common.BENCHMARKS_DIR])
+    return rule_manager
+
+def run_benchmarks(options) -> dict:
+    corpus = get_corpus(options)
+    rule_manager = create_rule_manager()
+
+    def parse_files():
+        return [File(file_name, lines, srcml) for file_name, lines, srcml in corpus]
+
+    def run_rules(files):
+        for file in files:
+            rule_manager.run_rules_on_file(file)
+        LOGGER.flush_output()
+
+    def run_rules_lines_only():
+        for file_name, lines, _ in corpus:
+            rule_manager.run_rules_on_file(File(file_name, lines, None))
+        LOGGER.flush_output()
+
+    file_count = len(corpus)
+    line_count = sum(len(lines) for _, lines, _ in corpus)
+    return {"parse srcml": common.make_result(common.measure(parse_files, options.repeat),
+                                              file_count, line_count),
+            "run_rules_on_file": common.make_result(
+                common.measure(run_rules, options.repeat, parse_files), file_count, line_count),
+            "run_rules_on_file without srcml": common.make_result(
+                common.measure(run_rules_lines_only, options.repeat), file_count, line_count)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    common.add_corpus_arguments(parser)
+    common.print_results(run_benchmarks(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
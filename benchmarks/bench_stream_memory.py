@@ -0,0 +1,64 @@
+"""Benchmark of peak memory use when walking srcml as a full tree versus streaming it.
+
+Generated srcML files of increasing size are walked with File.iter_srcml_events, once parsed
+into a full tree and once streamed (--srcml-stream). Each walk runs in its own process and the
+peak memory of that process, see common.get_peak_memory, is reported. The streamed peak should
+stay flat as the file grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_stream_memory [--lines 400000]
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+# Local imports
+from rulecheck.file import File
+from benchmarks import common
+from benchmarks.bench_end_lines import generate_srcml
+
+def walk(srcml_path:str, stream:bool, result_queue):
+    common.start_peak_memory()
+    if stream:
+        with open(srcml_path, 'rb') as srcml_stream:
+            for _ in File(srcml_path, [], None, srcml_stream).iter_srcml_events():
+                pass
+    else:
+        with open(srcml_path, 'rb') as srcml_file:
+            for _ in File(srcml_path, [], srcml_file.read()).iter_srcml_events():
+                pass
+
+    result_queue.put(common.get_peak_memory())
+
+def get_peak_rss(srcml_path:str, stream:bool) -> int:
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=walk, args=(srcml_path, stream, result_queue))
+    process.start()
+    peak = result_queue.get()
+    process.join()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", help="largest file size, in lines", default=400000, type=int)
+    parser.add_argument("--depth", help="if statement nesting depth", default=12, type=int)
+    args = parser.parse_args()
+
+    print("%8s %12s %14s %14s" % ("lines", "xml (MB)", "tree peak (MB)", "stream peak (MB)"))
+    for divisor in (8, 4, 2, 1):
+        line_count = args.lines // divisor
+        file_handle, srcml_path = tempfile.mkstemp(suffix='.xml')
+        try:
+            with os.fdopen(file_handle, 'wb') as srcml_file:
+                srcml_file.write(generate_srcml(line_count, args.depth))
+            print("%8d %12.1f %14.1f %14.1f" % (line_count,
+                                                 os.path.getsize(srcml_path) / 2**20,
+                                                 get_peak_rss(srcml_path, False) / 2**20,
+                                                 get_peak_rss(srcml_path, True) / 2**20))
+        finally:
+            os.remove(srcml_path)
+
+if __name__ == "__main__":
+    main()
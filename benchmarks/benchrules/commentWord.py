@@ -0,0 +1,18 @@
+from lxml import etree as ET
+from rulecheck import rule
+
+class commentWord(rule.Rule):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self._word = settings.get("word", "TODO")
+
+    def get_rule_type(self)->rule.RuleType:
+        return rule.RuleType.SRCML
+
+    def is_cacheable(self) -> bool:
+        return True
+
+    def visit_xml_comment_start(self, pos:rule.LogFilePosition, element:ET.Element):
+        if element.text and self._word in element.text:
+            self.log(rule.LogType.WARNING, pos, "comment contains " + self._word)
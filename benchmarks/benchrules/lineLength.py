@@ -0,0 +1,21 @@
+from rulecheck import rule
+
+class lineLength(rule.Rule):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self._max_length = int(settings.get("max_length", 100))
+
+    def get_rule_type(self)->rule.RuleType:
+        return rule.RuleType.LINE
+
+    def is_cacheable(self) -> bool:
+        return True
+
+    def visit_file_line(self, pos:rule.LogFilePosition, line:str):
+        length = len(line.rstrip("\r\n"))
+        if length > self._max_length:
+            pos.col = self._max_length + 1
+            self.log(rule.LogType.WARNING, pos,
+                     "line is " + str(length) + " characters long, the limit is " +
+                     str(self._max_length))
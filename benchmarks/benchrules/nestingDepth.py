@@ -0,0 +1,27 @@
+from lxml import etree as ET
+from rulecheck import rule
+
+class nestingDepth(rule.Rule):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self._max_depth = int(settings.get("max_depth", 4))
+        self._depth = 0
+
+    def get_rule_type(self)->rule.RuleType:
+        return rule.RuleType.SRCML
+
+    def is_cacheable(self) -> bool:
+        return True
+
+    def visit_file_open(self, pos:rule.LogFilePosition, file_name:str):
+        self._depth = 0
+
+    def visit_xml_block_start(self, pos:rule.LogFilePosition, element:ET.Element):
+        self._depth += 1
+        if self._depth == self._max_depth + 1:
+            self.log(rule.LogType.ERROR, pos,
+                     "blocks are nested more than " + str(self._max_depth) + " deep")
+
+    def visit_xml_block_end(self, pos:rule.LogFilePosition, element:ET.Element):
+        self._depth -= 1
@@ -0,0 +1,98 @@
+"""Helpers shared by the benchmarks: common options, timing and printing of results."""
+
+import argparse
+import os
+import stat
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where tracemalloc measures the peak instead.
+    resource = None
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_CONFIG = os.path.join(BENCHMARKS_DIR, "benchrules.json")
+FAKE_SRCML = os.path.join(BENCHMARKS_DIR, "fake_srcml.py")
+
+def add_corpus_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--files", help="number of files in the corpus", default=100, type=int)
+    parser.add_argument("--lines", help="lines per file", default=400, type=int)
+    parser.add_argument("--depth", help="statement nesting depth", default=6, type=int)
+    parser.add_argument("--seed", help="corpus random seed", default=0, type=int)
+    parser.add_argument("--repeat", help="times to run each benchmark",
+                        default=3, type=int)
+
+def measure(func, repeat:int, setup=None) -> [float]:
+    """Returns the times, in seconds, of repeat runs of func. If setup is given, it is called
+    before each run, untimed, and its result passed to func."""
+    samples = []
+    for _ in range(max(repeat, 1)):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        if setup:
+            func(arg)
+        else:
+            func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def make_result(samples:[float], files:int = 0, lines:int = 0) -> dict:
+    """Returns the result of a benchmark whose runs took samples seconds and each processed
+    files files of lines lines in total. The fastest run is used for the throughput."""
+    result = {"seconds": min(samples), "samples": samples}
+    if files:
+        result["files_per_second"] = files / result["seconds"]
+    if lines:
+        result["lines_per_second"] = lines / result["seconds"]
+    return result
+
+def print_results(results:dict):
+    """Prints results, a dict of benchmark name to make_result() results."""
+    width = max([len(name) for name in results] + [9])
+    print("%-*s %10s %10s %12s" % (width, "benchmark", "seconds", "files/s", "lines/s"))
+    for name, result in results.items():
+        print("%-*s %10.4f %10s %12s" % (width, name, result["seconds"],
+                                           "%.1f" % result["files_per_second"]
+                                           if "files_per_second" in result else "",
+                                           "%.0f" % result["lines_per_second"]
+                                           if "lines_per_second" in result else ""))
+
+def start_peak_memory():
+    """Starts measuring the peak memory of this process, if get_peak_memory needs it to be. Call
+    at the start of the process measured."""
+    if resource is None:
+        tracemalloc.start()
+
+def get_peak_memory(children:bool = False) -> int:
+    """Returns the peak resident set size of this process, or of any of its waited for children
+    too if children is true, in bytes. Without the resource module, it is the peak memory
+    allocated by Python since start_peak_memory was called, children and memory allocated by
+    extensions such as lxml not included."""
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    if sys.platform != 'darwin':
+        peak *= 1024
+    return peak
+
+def write_fake_srcml(directory:str) -> str:
+    """Writes an executable named srcml that runs fake_srcml.py with the current interpreter to
+    directory and returns its path: a batch file on Windows and a shell script elsewhere. Put
+    directory first in the PATH of rulecheck to use it."""
+    if sys.platform == 'win32':
+        path = os.path.join(directory, "srcml.cmd")
+        with open(path, "w") as file_stream:
+            file_stream.write('@"' + sys.executable + '" "' + FAKE_SRCML + '" %*\n')
+        return path
+
+    path = os.path.join(directory, "srcml")
+    with open(path, "w") as file_stream:
+        file_stream.write('#!/bin/sh\nexec "' + sys.executable + '" "' + FAKE_SRCML + '" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
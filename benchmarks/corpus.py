@@ -0,0 +1,175 @@
+"""Deterministic generator of synthetic C and C++ source trees for the benchmarks.
+
+The same options and seed always produce the same files, so timings taken on different machines
+or at different commits check the same code. Files are spread over a tree of directories and
+made of functions whose bodies are nested if/for/while/switch statements, with line and block
+comments, string literals, tabs and over long lines for the rules to find.
+
+Run from the repository root to write a corpus to a directory:
+    python -m benchmarks.corpus DIRECTORY [--files 200] [--lines 400] [--depth 6]
+"""
+
+import argparse
+import os
+import random
+
+KEYWORDS = ("if", "for", "while", "switch")
+WORDS = ("alpha", "beta", "count", "index", "value", "buffer", "length", "state", "result",
+         "offset", "total", "entry", "node", "item", "flag")
+COMMENT_WORDS = ("check", "the", "value", "before", "use", "TODO", "note", "handle", "error",
+                 "case", "FIXME", "later")
+
+class SourceGenerator:
+    """ Generates the text of a single C or C++ file. """
+
+    def __init__(self, rand:random.Random, depth:int, cpp:bool):
+        self._rand = rand
+        self._depth = max(depth, 1)
+        self._cpp = cpp
+        self._lines = []
+
+    def _name(self) -> str:
+        return self._rand.choice(WORDS) + "_" + str(self._rand.randrange(100))
+
+    def _comment(self) -> str:
+        return " ".join(self._rand.choice(COMMENT_WORDS)
+                        for _ in range(self._rand.randrange(2, 9)))
+
+    def _add(self, level:int, text:str):
+        # Mostly spaces, sometimes tabs, for the indentation sensitive parts of rulecheck.
+        indent = "\t" * level if self._rand.random() < 0.1 else "    " * level
+        self._lines.append(indent + text + "\n")
+
+    def _add_statement(self, level:int):
+        choice = self._rand.random()
+        if choice < 0.15:
+            self._add(level, "// " + self._comment())
+        elif choice < 0.25:
+            self._add(level, 'log_message("' + self._comment() + '", ' + self._name() + ');')
+        elif choice < 0.3:
+            # Over long line
+            self._add(level, self._name() + " = " +
+                      " + ".join(self._name() for _ in range(12)) + ";")
+        else:
+            self._add(level, self._name() + " = " + self._name() + " + " +
+                      str(self._rand.randrange(1000)) + ";")
+
+    def _add_block(self, level:int, depth:int, budget:int) -> int:
+        """ Adds statements, and nested blocks while depth allows, using up to budget lines.
+            Returns the number of lines used. """
+        used = 0
+        while used < budget:
+            if depth < self._depth and budget - used > 4 and self._rand.random() < 0.3:
+                keyword = self._rand.choice(KEYWORDS)
+                inner_budget = self._rand.randrange(2, max(budget - used - 1, 3))
+                if keyword == "switch":
+                    self._add(level, "switch (" + self._name() + ") {")
+                    used += 1
+                    case_num = 0
+                    while used < budget and case_num < inner_budget // 3 + 1:
+                        self._add(level + 1, "case " + str(case_num) + ":")
+                        self._add_statement(level + 2)
+                        self._add(level + 2, "break;")
+                        used += 3
+                        case_num += 1
+                    self._add(level + 1, "default:")
+                    self._add(level + 2, "break;")
+                    self._add(level, "}")
+                    used += 3
+                else:
+                    if keyword == "for":
+                        header = "for (int i = 0; i < " + self._name() + "; i++) {"
+                    else:
+                        header = keyword + " (" + self._name() + " > " + \
+                                 str(self._rand.randrange(100)) + ") {"
+                    self._add(level, header)
+                    used += 2 + self._add_block(level + 1, depth + 1, inner_budget)
+                    self._add(level, "}")
+            else:
+                self._add_statement(level)
+                used += 1
+        return used
+
+    def _add_function(self, level:int, name:str, budget:int):
+        self._add(level, "/* " + self._comment())
+        self._add(level, " * " + self._comment() + " */")
+        self._add(level, "int " + name + "(int " + self._name() + ", const char *" +
+                  self._name() + ")")
+        self._add(level, "{")
+        self._add_block(level + 1, 0, max(budget - 6, 1))
+        self._add(level + 1, "return 0;")
+        self._add(level, "}")
+
+    def generate(self, line_count:int) -> str:
+        self._lines = []
+        self._add(0, "/* Generated by benchmarks.corpus, " + self._comment() + " */")
+        self._add(0, "#include <stdio.h>")
+        self._add(0, "#include <string.h>")
+        self._add(0, "")
+
+        level = 0
+        if self._cpp:
+            self._add(0, "namespace generated {")
+            self._add(0, "")
+            level = 1
+
+        function_num = 0
+        while len(self._lines) < line_count - level * 2:
+            budget = min(self._rand.randrange(15, 80), line_count - len(self._lines))
+            self._add_function(level, "function_" + str(function_num), budget)
+            self._add(0, "")
+            function_num += 1
+
+        if self._cpp:
+            self._add(0, "}")
+
+        return "".join(self._lines)
+
+def generate_source(seed:int, line_count:int, depth:int, cpp:bool = False) -> str:
+    """Returns the text of a C (or C++) file of about line_count lines whose statements are
+    nested up to depth blocks deep."""
+    return SourceGenerator(random.Random(seed), depth, cpp).generate(line_count)
+
+def get_corpus_paths(file_count:int, dir_depth:int = 2, fan_out:int = 4,
+                     cpp_ratio:float = 0.25, seed:int = 0) -> [str]:
+    """Returns the relative paths of the files of a corpus, spread over directories dir_depth
+    levels deep with fan_out subdirectories each."""
+    rand = random.Random(seed)
+    paths = []
+    for file_num in range(file_count):
+        dirs = ["dir" + str(rand.randrange(fan_out)) for _ in range(dir_depth)]
+        ext = ".cpp" if rand.random() < cpp_ratio else ".c"
+        paths.append(os.path.join(*dirs, "file" + str(file_num) + ext))
+    return paths
+
+def generate_corpus(directory:str, file_count:int, line_count:int, depth:int,
+                    dir_depth:int = 2, seed:int = 0) -> [str]:
+    """Writes a corpus of file_count files of about line_count lines each under directory and
+    returns the paths of the files written."""
+    paths = []
+    for file_num, relative_path in enumerate(get_corpus_paths(file_count, dir_depth,
+                                                              seed=seed)):
+        path = os.path.join(directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", newline="") as file_stream:
+            file_stream.write(generate_source(seed * 1000003 + file_num, line_count, depth,
+                                              path.endswith(".cpp")))
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="directory to write the corpus to")
+    parser.add_argument("--files", help="number of files", default=200, type=int)
+    parser.add_argument("--lines", help="lines per file", default=400, type=int)
+    parser.add_argument("--depth", help="statement nesting depth", default=6, type=int)
+    parser.add_argument("--dir-depth", help="directory nesting depth", default=2, type=int)
+    parser.add_argument("--seed", help="random seed", default=0, type=int)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.directory, args.files, args.lines, args.depth,
+                            args.dir_depth, args.seed)
+    print("Wrote " + str(len(paths)) + " files to " + args.directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Stand-in for the srcml binary, so the benchmarks run on machines without srcml installed.
+
+Produces srcML in the layout srcml uses, one xml line per source line and position attributes
+on the elements, for a light markup of the source: comments, string and number literals, names,
+blocks, and if/for/while/switch statements and case/default labels. This is far from a full
+parse, but it is enough for the benchmark rules to find things to report and makes rulecheck
+walk a realistic number of elements. Single files and --archive runs over several files are
+supported, as are --version, --language and --register-ext. Other options are ignored.
+
+Used as a module by the benchmarks that do not start srcml, and as a program otherwise:
+    python benchmarks/fake_srcml.py [--archive] [--language LANG] FILE...
+"""
+
+import os
+import re
+import sys
+from xml.sax.saxutils import escape
+from xml.sax.saxutils import quoteattr
+
+VERSION = "srcml 1.0.0 (rulecheck benchmarks fake srcml)"
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+SRC_NS = 'xmlns="http://www.srcML.org/srcML/src"'
+OTHER_NS = 'xmlns:cpp="http://www.srcML.org/srcML/cpp" ' \
+           'xmlns:pos="http://www.srcML.org/srcML/position"'
+
+EXT_LANGUAGES = {".c": "C", ".h": "C", ".cpp": "C++", ".hpp": "C++", ".cc": "C++",
+                 ".java": "Java", ".cs": "C#"}
+
+STATEMENTS = ("if", "for", "while", "switch")
+LABELS = ("case", "default")
+KEYWORDS = frozenset(("int", "char", "const", "void", "return", "break", "continue", "else",
+                      "namespace", "class", "struct", "static", "unsigned", "include")) \
+           .union(STATEMENTS, LABELS)
+
+TOKEN_RE = re.compile(r'(?P<block_comment>/\*.*?\*/)'
+                      r'|(?P<line_comment>//[^\n]*)'
+                      r'|(?P<string>"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')'
+                      r'|(?P<number>\b\d+\b)'
+                      r'|(?P<name>[A-Za-z_]\w*)'
+                      r'|(?P<open>\{)|(?P<close>\})'
+                      r'|(?P<paren>[()])|(?P<semicolon>;)'
+                      r'|(?P<other>[^/"\'\w{}();]+|.)', re.DOTALL)
+
+def _end_pos(text:str, line:int, col:int) -> (int, int):
+    """ Returns the line and column of the last character of text starting at line and col. """
+    newlines = text.count("\n")
+    if newlines:
+        return line + newlines, len(text) - text.rfind("\n") - 1
+    return line, col + len(text) - 1
+
+def to_unit(text:str, file_name:str, language:str, namespaces:bool = True) -> str:
+    """ Returns the srcML unit element for the source text. """
+
+    out = []
+    # ((statement, index of its start tag in out) or None, index of the block start tag in out)
+    # for each open '{'. Start tags get their pos:end attribute once their end is reached.
+    open_blocks = []
+    pending_statement = None
+    paren_depth = 0
+    line = 1
+    line_start = 0
+
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        token = match.group()
+        col = match.start() - line_start + 1
+        pos = '"%d:%d"' % (line, col)
+
+        if kind in ("block_comment", "line_comment"):
+            end_line, end_col = _end_pos(token, line, col)
+            out.append('<comment type="%s" pos:start=%s pos:end="%d:%d">%s</comment>' %
+                       ("block" if kind == "block_comment" else "line", pos, end_line, end_col,
+                        escape(token)))
+        elif kind == "string":
+            out.append('<literal type="string" pos:start=%s>%s</literal>' %
+                       (pos, escape(token)))
+        elif kind == "number":
+            out.append('<literal type="number" pos:start=%s>%s</literal>' % (pos, token))
+        elif kind == "name" and token in STATEMENTS:
+            out.append('<%s pos:start=%s%%s>%s' % (token, pos, token))
+            pending_statement = (token, len(out) - 1)
+        elif kind == "name" and token in LABELS:
+            out.append('<%s pos:start=%s>%s</%s>' % (token, pos, token, token))
+        elif kind == "name" and token not in KEYWORDS:
+            out.append('<name pos:start=%s>%s</name>' % (pos, token))
+        elif kind == "open":
+            out.append('<block pos:start=%s%%s>{<block_content>' % pos)
+            open_blocks.append((pending_statement, len(out) - 1))
+            pending_statement = None
+        elif kind == "close" and open_blocks:
+            statement, block_index = open_blocks.pop()
+            end = ' pos:end="%d:%d"' % (line, col)
+            out[block_index] %= end
+            out.append('</block_content>}</block>')
+            if statement:
+                out[statement[1]] %= end
+                out.append('</%s>' % statement[0])
+        elif kind == "paren":
+            paren_depth += 1 if token == "(" else -1
+            out.append(token)
+        elif kind == "semicolon" and paren_depth <= 0 and pending_statement:
+            # A statement without a block, such as "if (x) return;"
+            out[pending_statement[1]] %= ' pos:end="%d:%d"' % (line, col)
+            out.append(';</%s>' % pending_statement[0])
+            pending_statement = None
+            paren_depth = 0
+        else:
+            out.append(escape(token))
+
+        newlines = token.count("\n")
+        if newlines:
+            line += newlines
+            line_start = match.start() + token.rfind("\n") + 1
+
+    # Close anything left open by unbalanced source.
+    if pending_statement:
+        out[pending_statement[1]] %= ''
+        out.append('</%s>' % pending_statement[0])
+    while open_blocks:
+        statement, block_index = open_blocks.pop()
+        out[block_index] %= ''
+        out.append('</block_content></block>')
+        if statement:
+            out[statement[1]] %= ''
+            out.append('</%s>' % statement[0])
+
+    return '<unit %s%s revision="1.0.0" language=%s filename=%s pos:tabs="8">%s</unit>' % \
+           (SRC_NS + " " if namespaces else "", OTHER_NS, quoteattr(language),
+            quoteattr(file_name), "".join(out))
+
+def to_srcml(text:str, file_name:str, language:str) -> bytes:
+    """ Returns the srcML document srcml would output for the source text of file_name. """
+    return (XML_DECLARATION + to_unit(text, file_name, language) + "\n").encode("utf-8")
+
+def to_srcml_archive(sources:[(str, str, str)]) -> bytes:
+    """ Returns the srcML archive srcml --archive would output for the (text, file name,
+        language) of each file. """
+    units = [to_unit(text, file_name, language, False) for text, file_name, language in sources]
+    return (XML_DECLARATION + '<unit ' + SRC_NS + ' revision="1.0.0">\n\n' +
+            "\n\n".join(units) + '\n\n</unit>\n').encode("utf-8")
+
+def main(args:[str]) -> int:
+    if "--version" in args:
+        print(VERSION)
+        return 0
+
+    language = None
+    ext_languages = dict(EXT_LANGUAGES)
+    archive = False
+    files = []
+    arg_iter = iter(args)
+    for arg in arg_iter:
+        if arg == "--language":
+            language = next(arg_iter)
+        elif arg.startswith("--language="):
+            language = arg.split("=", 1)[1]
+        elif arg == "--register-ext":
+            ext, ext_language = next(arg_iter).split("=", 1)
+            ext_languages["." + ext] = ext_language
+        elif arg == "--archive":
+            archive = True
+        elif arg.startswith("-") and arg != "-":
+            continue
+        else:
+            files.append(arg)
+
+    sources = []
+    for file_name in files or ["-"]:
+        if file_name == "-":
+            text = sys.stdin.read()
+        else:
+            with open(file_name, newline="") as file_stream:
+                text = file_stream.read()
+        sources.append((text, file_name,
+                        language or ext_languages.get(os.path.splitext(file_name)[1], "C")))
+
+    if archive or len(sources) > 1:
+        sys.stdout.buffer.write(to_srcml_archive(sources))
+    else:
+        sys.stdout.buffer.write(to_srcml(*sources[0]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,105 @@
+"""History of benchmark runs, kept in a local JSON file, and comparison against a baseline run.
+
+The history holds every saved run, with its results, the peak resident set size of each suite,
+the corpus options it ran with and the commit it ran on, and the index of the run used as the
+baseline.
+
+A benchmark regressed when its fastest run is slower than the baseline's fastest run by more
+than the threshold plus the noise of the two runs. The noise of a run is how much slower its
+median run is than its fastest, relative to the fastest, so noisy benchmarks need a larger
+slowdown to be reported. Benchmarks whose baseline takes less than MIN_SECONDS are compared
+but never reported as regressed, as timer resolution and scheduling dominate at that scale.
+"""
+
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+
+# Local imports
+from benchmarks import common
+
+DEFAULT_HISTORY = os.path.join(common.BENCHMARKS_DIR, "history.json")
+DEFAULT_THRESHOLD = 0.1
+MIN_SECONDS = 0.001
+
+def load_history(file_name:str) -> dict:
+    if not os.path.exists(file_name):
+        return {"baseline": None, "runs": []}
+    with open(file_name) as file_stream:
+        return json.load(file_stream)
+
+def save_history(history:dict, file_name:str):
+    with open(file_name, "w") as file_stream:
+        json.dump(history, file_stream, indent=2)
+
+def get_commit() -> str:
+    """Returns the commit the working tree is on, or an empty string if it can not be found."""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                cwd=common.BENCHMARKS_DIR, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, check=False)
+        return result.stdout.decode().strip() if result.returncode == 0 else ""
+    except (IOError, OSError):
+        return ""
+
+def create_run(results:dict, peak_rss:dict, corpus:dict) -> dict:
+    return {"time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": corpus,
+            "results": results,
+            "peak_rss": peak_rss}
+
+def add_run(history:dict, run:dict, baseline:bool):
+    """Appends run to history. It becomes the baseline if baseline is True or there is none
+    yet."""
+    history["runs"].append(run)
+    if baseline or history["baseline"] is None:
+        history["baseline"] = len(history["runs"]) - 1
+
+def get_baseline(history:dict) -> dict:
+    if history["baseline"] is None:
+        return None
+    return history["runs"][history["baseline"]]
+
+def get_noise(result:dict) -> float:
+    return statistics.median(result["samples"]) / result["seconds"] - 1.0
+
+def compare(baseline:dict, run:dict, threshold:float, gated_suites:[str]) -> [dict]:
+    """Returns a comparison of each benchmark in both baseline and run, as dicts with the
+    benchmark name, the baseline and new seconds, the change and tolerance (relative to the
+    baseline), and whether it regressed. Only benchmarks of gated_suites can regress."""
+    rows = []
+    for name, result in run["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = result["seconds"] / base["seconds"] - 1.0
+        tolerance = threshold + max(get_noise(base), get_noise(result))
+        suite = name.split(":", 1)[0]
+        rows.append({"name": name, "baseline": base["seconds"], "seconds": result["seconds"],
+                     "change": change, "tolerance": tolerance,
+                     "regressed": suite in gated_suites and change > tolerance and
+                                  base["seconds"] >= MIN_SECONDS})
+    return rows
+
+def print_comparison(baseline:dict, run:dict, rows:[dict]):
+    print("Compared with baseline of " + baseline["time"] +
+          (" at " + baseline["commit"] if baseline["commit"] else "") + ":")
+    width = max([len(row["name"]) for row in rows] + [9])
+    print("%-*s %10s %10s %9s %9s" % (width, "benchmark", "baseline", "seconds", "change",
+                                      "tolerance"))
+    for row in rows:
+        print("%-*s %10.4f %10.4f %+8.1f%% %8.1f%%%s" %
+              (width, row["name"], row["baseline"], row["seconds"], row["change"] * 100,
+               row["tolerance"] * 100, "  REGRESSED" if row["regressed"] else ""))
+
+    for suite, peak in run["peak_rss"].items():
+        base_peak = baseline["peak_rss"].get(suite)
+        if base_peak:
+            print("Peak RSS of %s: %.1f MB (%+.1f%%)" % (suite, peak / 2**20,
+                                                         (peak / base_peak - 1.0) * 100))
@@ -0,0 +1,134 @@
+"""Runs the benchmark suite: rules, ignore filter, logger and command line benchmarks.
+
+All benchmarks run on the same deterministic generated corpus, see benchmarks.corpus, and use
+the fake srcml, see benchmarks.fake_srcml, so srcml does not need to be installed. Each suite
+runs in its own process, so the peak resident set size of each can be reported. The throughput
+of each benchmark is taken from the fastest of --repeat runs.
+
+Runs can be saved to a local history and compared against a baseline run, see
+benchmarks.history. With --compare, the exit value is 1 if a benchmark of the --gate suites
+regressed, and 2 if there is no baseline to compare against or it ran on a different corpus.
+
+Run from the repository root:
+    python -m benchmarks.run [--only rules,ignore,logger,cli] [--json results.json]
+    python -m benchmarks.run --save --baseline      (on the reference commit)
+    python -m benchmarks.run --compare [--save]     (on the commit to check)
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+
+# Local imports
+from benchmarks import bench_cli
+from benchmarks import bench_ignore
+from benchmarks import bench_logger
+from benchmarks import bench_rules
+from benchmarks import common
+from benchmarks import history
+
+SUITES = {"rules": bench_rules,
+          "ignore": bench_ignore,
+          "logger": bench_logger,
+          "cli": bench_cli}
+
+# Options that change what the benchmarks measure. Runs can only be compared if they match.
+CORPUS_OPTIONS = ("files", "lines", "depth", "seed", "entries", "violations", "jobs")
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    common.add_corpus_arguments(parser)
+    for suite in SUITES.values():
+        add_arguments = getattr(suite, "add_arguments", None)
+        if add_arguments:
+            add_arguments(parser)
+    parser.add_argument("--only", help="comma separated suites to run, of: " +
+                        ", ".join(SUITES), default=",".join(SUITES))
+    parser.add_argument("--json", help="file to write the results to, as JSON")
+    parser.add_argument("--history", help="history file", default=history.DEFAULT_HISTORY)
+    parser.add_argument("--save", help="add this run to the history", action="store_true")
+    parser.add_argument("--baseline", help="add this run to the history as the baseline",
+                        action="store_true")
+    parser.add_argument("--compare", help="compare this run with the baseline",
+                        action="store_true")
+    parser.add_argument("--threshold",
+                        help="slowdown, relative to the baseline, on top of the noise of the "
+                             "runs, above which a benchmark regressed. Defaults to " +
+                             str(history.DEFAULT_THRESHOLD),
+                        default=history.DEFAULT_THRESHOLD, type=float)
+    parser.add_argument("--gate", help="comma separated suites whose regressions fail --compare",
+                        default=",".join(SUITES))
+    return parser
+
+def _run_suite(suite_name:str, args, result_queue):
+    common.start_peak_memory()
+    results = SUITES[suite_name].run_benchmarks(args)
+    result_queue.put((results, common.get_peak_memory(children=True)))
+
+def run_suite(suite_name:str, args) -> (dict, int):
+    """Runs a suite in a process of its own. Returns its results and peak RSS."""
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_suite, args=(suite_name, args, result_queue))
+    process.start()
+    results, peak = result_queue.get()
+    process.join()
+    return results, peak
+
+def run_suites(args) -> (dict, dict):
+    """Returns the results of the suites selected by args, as a dict of benchmark name to
+    result, and the peak RSS of each suite. Names are prefixed with the suite name."""
+    results = {}
+    peak_rss = {}
+    for suite_name in args.only.split(","):
+        if suite_name not in SUITES:
+            raise ValueError("Unknown benchmark suite: " + suite_name)
+        suite_results, peak_rss[suite_name] = run_suite(suite_name, args)
+        for name, result in suite_results.items():
+            results[suite_name + ": " + name] = result
+    return results, peak_rss
+
+def main() -> int:
+    args = create_parser().parse_args()
+    results, peak_rss = run_suites(args)
+    common.print_results(results)
+    for suite_name, peak in peak_rss.items():
+        print("Peak RSS of %s: %.1f MB" % (suite_name, peak / 2**20))
+
+    if args.json:
+        with open(args.json, "w") as file_stream:
+            json.dump(results, file_stream, indent=2)
+
+    run = history.create_run(results, peak_rss,
+                             {option: getattr(args, option) for option in CORPUS_OPTIONS})
+    run_history = history.load_history(args.history)
+
+    exit_value = 0
+    if args.compare:
+        baseline = history.get_baseline(run_history)
+        if baseline is None:
+            print("No baseline in " + args.history + " to compare with.")
+            exit_value = 2
+        elif baseline["corpus"] != run["corpus"]:
+            print("The baseline ran with different options, can not compare: " +
+                  str(baseline["corpus"]))
+            exit_value = 2
+        else:
+            rows = history.compare(baseline, run, args.threshold, args.gate.split(","))
+            history.print_comparison(baseline, run, rows)
+            regressed = [row["name"] for row in rows if row["regressed"]]
+            if regressed:
+                print("Regressed: " + ", ".join(regressed))
+                exit_value = 1
+
+    if args.save or args.baseline:
+        history.add_run(run_history, run, args.baseline)
+        history.save_history(run_history, args.history)
+        print("Saved run to " + args.history +
+              (" as the baseline" if run_history["baseline"] == len(run_history["runs"]) - 1
+               else ""))
+
+    return exit_value
+
+if __name__ == "__main__":
+    sys.exit(main())
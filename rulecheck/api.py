@@ -0,0 +1,95 @@
+#################################################
+##
+## Python API
+##
+#################################################
+
+import contextlib
+import io
+
+# Local imports
+from rulecheck import engine
+from rulecheck.logger import CollectingSink
+from rulecheck.logger import Logger
+from rulecheck.logger import Violation
+
+#pylint: disable=missing-function-docstring
+
+class Checker:
+    """ Checks source text held in memory, such as unsaved editor buffers, without writing it to
+    a file. The text is passed to srcml through stdin.
+
+    The rules, srcml settings and ignore list are loaded once, as the command line would load
+    them from config_files, rule_paths, ignore_list and any other command line options given
+    in options, such as ['--tabs', '4', '--Werror']. Raises ValueError, with what rulecheck
+    printed, if the options are not valid or they can not be loaded.
+
+    Violations are returned as rulecheck.logger.Violation objects. Each Checker loads its own
+    rules, logging to its own logger, and changes nothing global, so Checkers configured
+    differently may be used in the same process.
+
+    close() releases the ignore list, which a compiled ignore list keeps open. A Checker is also
+    a context manager closing itself on exit.
+
+    Example:
+        with Checker(['myrules.json']) as checker:
+            for violation in checker.check('src/main.c', text):
+                print(violation.line, violation.rule_name, violation.message)
+    """
+
+    def __init__(self, config_files:[str], rule_paths:[str] = None, ignore_list:str = None,
+                 options:[str] = None):
+        args = []
+        for config_file in config_files:
+            args.extend(['-c', config_file])
+        for rule_path in rule_paths or []:
+            args.extend(['--rulepaths', rule_path])
+        if ignore_list:
+            args.extend(['--ignorelist', ignore_list])
+        args.extend(options or [])
+
+        # What parsing and loading print is only of interest if they fail.
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                parsed_args = engine.create_parser().parse_args(args)
+            except SystemExit:
+                parsed_args = None
+        if parsed_args is None:
+            raise ValueError("Invalid options: " + output.getvalue().strip())
+
+        self._logger = Logger()
+        with contextlib.redirect_stdout(output):
+            self._setup = engine.create_check_setup(parsed_args, logger=self._logger)
+        if self._setup is None:
+            raise ValueError("Could not load the rules: " + output.getvalue().strip())
+        self._file_manager = self._setup.file_manager
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Closes the ignore list. The Checker must not be used after. """
+        self._setup.close()
+
+    def check(self, name:str, text:str, language:str = None) -> [Violation]:
+        """ Returns the violations found in text, checked as the content of the file name,
+            which does not need to exist. The srcml language is language if given, otherwise
+            that of the extension of name. """
+        output_sink = CollectingSink()
+        previous_sink = self._logger.get_output_sink()
+        self._logger.set_output_sink(output_sink)
+        try:
+            self._file_manager.process_text(name, text, language)
+        finally:
+            self._logger.set_output_sink(previous_sink)
+        return output_sink.get_violations()
+
+    def iter_violations(self, sources):
+        """ Yields the violations found in each of sources, (name, text) or (name, text,
+            language) tuples, checked one after the other as by check. """
+        for source in sources:
+            yield from self.check(*source)
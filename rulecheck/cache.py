@@ -0,0 +1,160 @@
+#################################################
+##
+## On-disk Cache
+##
+#################################################
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+#pylint: disable=missing-function-docstring
+
+def get_cache_key(*parts) -> str:
+    """ Returns a hex digest uniquely identifying the combination of all parts. Parts may be
+        str or bytes values. """
+
+    key = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        # Length prefix each part so that different splits of the same bytes do not collide.
+        key.update(str(len(part)).encode('ascii') + b':')
+        key.update(part)
+    return key.hexdigest()
+
+class DiskCache:
+    """ Size capped cache of compressed values stored as files in a directory.
+
+    Values are stored under the key they were put with, one file per key. Files are written to a
+    temporary name and then renamed into place, so several processes can share one cache directory
+    without readers ever seeing a partially written value. The modification time of a file is
+    updated on every hit and, once the total size exceeds max_size bytes, the least recently used
+    files are removed. Temporary files left behind by a process that died while writing are
+    removed once older than STALE_TEMP_SECONDS, when the directory is scanned on creation and
+    eviction.
+    """
+
+    # Once the cap is exceeded, evict down to this fraction of max_size to avoid evicting on
+    # every subsequent put.
+    EVICT_TO_FRACTION = 0.9
+    # Temporary files are renamed into place right after being written, so any older than this
+    # were abandoned.
+    STALE_TEMP_SECONDS = 3600
+
+    def __init__(self, directory:str, max_size:int, verbose:bool):
+        self._directory = directory
+        self._max_size = max_size
+        self._verbose = verbose
+        self._lock = threading.Lock()
+        os.makedirs(self._directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._get_entries())
+
+    def print_verbose(self, message:str):
+        if self._verbose:
+            print(message)
+
+    def get_directory(self) -> str:
+        return self._directory
+
+    def get_size(self) -> int:
+        return self._size
+
+    def _get_path(self, key:str) -> str:
+        return os.path.join(self._directory, key[0:2], key)
+
+    def contains(self, key:str) -> bool:
+        return os.path.isfile(self._get_path(key))
+
+    def get(self, key:str) -> bytes:
+        """ Returns the value stored for key or None if there is no (valid) value. """
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as file_stream:
+                value = zlib.decompress(file_stream.read())
+            os.utime(path)
+            return value
+        except (IOError, OSError):
+            return None
+        except zlib.error:
+            self.print_verbose("Removing corrupt cache entry: " + path)
+            self._remove(path)
+            return None
+
+    def put(self, key:str, value:bytes):
+        path = self._get_path(key)
+        compressed = zlib.compress(value)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(file_handle, 'wb') as file_stream:
+                    file_stream.write(compressed)
+                # An entry written again, such as by another process, replaces the old one.
+                try:
+                    old_size = os.stat(path).st_size
+                except (IOError, OSError):
+                    old_size = 0
+                os.replace(temp_path, path)
+            except (IOError, OSError):
+                self._remove(temp_path)
+                raise
+        except (IOError, OSError) as exc:
+            # Another process may hold the entry open (Windows) or the directory may be gone.
+            # Caching is an optimization only, so carry on without the entry.
+            self.print_verbose("Could not write cache entry " + path + ": " + str(exc))
+            return
+
+        with self._lock:
+            self._size += len(compressed) - old_size
+            if self._size > self._max_size:
+                self._evict()
+
+    def _get_entries(self):
+        """ Yields (mtime, path, size) of every entry currently in the cache directory, removing
+            stale temporary files. """
+        try:
+            sub_dirs = list(os.scandir(self._directory))
+        except (IOError, OSError):
+            return
+        stale_time = time.time() - DiskCache.STALE_TEMP_SECONDS
+        for sub_dir in sub_dirs:
+            if not sub_dir.is_dir():
+                continue
+            try:
+                for entry in os.scandir(sub_dir.path):
+                    try:
+                        stat = entry.stat()
+                    except (IOError, OSError):
+                        # Removed by another process while scanning.
+                        continue
+                    if entry.name.endswith('.tmp'):
+                        if stat.st_mtime < stale_time:
+                            self.print_verbose("Removing stale cache file: " + entry.path)
+                            self._remove(entry.path)
+                        continue
+                    yield (stat.st_mtime, entry.path, stat.st_size)
+            except (IOError, OSError):
+                continue
+
+    def _evict(self):
+        # Rescan as other processes sharing the directory add and remove entries too.
+        entries = sorted(self._get_entries())
+        self._size = sum(size for _, _, size in entries)
+        target = self._max_size * DiskCache.EVICT_TO_FRACTION
+        for _, path, size in entries:
+            if self._size <= target:
+                break
+            self._remove(path)
+            self._size -= size
+        self.print_verbose("Evicted cache entries, cache size is now: " + str(self._size))
+
+    @staticmethod
+    def _remove(path:str):
+        try:
+            os.remove(path)
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,116 @@
+#################################################
+##
+## Daemon Client
+##
+#################################################
+
+# Only standard library modules are imported, so the client starts quickly. See
+# rulecheck.daemon for the requests and responses exchanged with the daemon.
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+#pylint: disable=missing-function-docstring
+
+def send_request(socket_path:str, request:dict) -> dict:
+    """ Sends request to the daemon listening on socket_path and returns its response. """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        raise ValueError("the daemon closed the connection without answering")
+    return json.loads(line.decode('utf-8'))
+
+def format_text(violation:dict, show_hash:bool) -> str:
+    """ Returns the violation, as sent by the daemon, in the text output format. """
+    log_msg = []
+    if show_hash:
+        log_msg.append(violation["hash"] + ": ")
+
+    log_msg.append(violation["file"] + ":")
+
+    if violation["line"]:
+        log_msg.append(str(violation["line"]) + ":")
+    if violation["col"]:
+        log_msg.append(str(violation["col"]) + ":")
+
+    log_msg.append(" " + violation["severity"] + ": " + violation["rule"] + ": " +
+                   violation["message"])
+    return "".join(log_msg)
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description="""Has a rulecheck daemon, started with 'rulecheck --daemon SOCKET', check
+                       source files and reports the violations found.""")
+    parser.add_argument("-s", "--socket", help="Unix domain socket the daemon listens on",
+                        required=True, type=str)
+    parser.add_argument("--stdin-name",
+                        help="""also check the text read from stdin as the content of the given
+                                file, such as an editor buffer not yet saved.""",
+                        default="", type=str)
+    parser.add_argument("--format",
+                        help="""format of the rule violations written: text (the default) or
+                                jsonl (one JSON object per violation and line).""",
+                        choices=['text', 'jsonl'], default="text", type=str)
+    parser.add_argument("-g", "--generatehashes",
+                        help="with the text format, output the ignore list hash of each violation",
+                        action="store_true", default=False)
+    parser.add_argument("--stop", help="stop the daemon", action="store_true", default=False)
+    parser.add_argument('-v', '--verbose', action='store_true', default=False)
+    parser.add_argument("sources",
+                        help="""globs source file(s) and/or path(s), found by the daemon as
+                                rulecheck would from the current directory.""",
+                        nargs='*', type=str)
+    return parser
+
+def run_client(args) -> int:
+    """ Returns the exit value rulecheck would for the sources: 0 without violations, 1 on error,
+        2 if an error and 3 if only warnings were reported. """
+    if args.stop:
+        request = {"command": "stop"}
+    else:
+        request = {"cwd": os.getcwd(), "files": args.sources}
+        if args.stdin_name:
+            request["buffers"] = [{"file": args.stdin_name, "text": sys.stdin.read()}]
+
+    try:
+        response = send_request(args.socket, request)
+    except (IOError, OSError, ValueError) as exc:
+        print("Could not reach the rulecheck daemon at " + args.socket + ": " + str(exc))
+        return 1
+    if "error" in response:
+        print("The rulecheck daemon could not check the sources: " + response["error"])
+        return 1
+    if args.stop:
+        return 0
+
+    for violation in response["violations"]:
+        if args.format == 'jsonl':
+            print(json.dumps(violation))
+        else:
+            print(format_text(violation, args.generatehashes))
+
+    if args.verbose:
+        print("Total Files Checked: " + str(response["files_checked"]))
+        print("Total Warnings (ignored): " + str(response["warnings"]) + "(" +
+              str(response["ignored_warnings"]) + ")")
+        print("Total Errors (ignored): " + str(response["errors"]) + "(" +
+              str(response["ignored_errors"]) + ")")
+
+    if response["errors"] > 0:
+        return 2
+    if response["warnings"] > 0:
+        return 3
+
+    return 0
+
+def main():
+    sys.exit(run_client(create_parser().parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#################################################
+##
+## Compiled Ignore Lists
+##
+#################################################
+
+import mmap
+import struct
+import typing
+
+#pylint: disable=missing-function-docstring
+
+# Layout of a compiled ignore list. All values are little endian.
+#
+#   header:       MAGIC, version, file count, rule count, then the offsets of the string table,
+#                 the file index and the records (see _HEADER)
+#   string table: offset and length of each string (_STRING), then the utf-8 bytes of all the
+#                 strings. The file names come first, sorted, followed by the rule names.
+#   file index:   for each file, in the same order as the file names, the index of its first
+#                 record and its number of records (_FILE)
+#   records:      rule name string index, line number and binary md5 hash of each entry
+#                 (_RECORD), grouped by file
+MAGIC = b'RCIGNORE'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIIQQQ')
+_STRING = struct.Struct('<QI')
+_FILE = struct.Struct('<II')
+_RECORD = struct.Struct('<Ii16s')
+
+def is_compiled_ignore_list(file_name:str) -> bool:
+    """ Returns True if file_name starts like a compiled ignore list. """
+    with open(file_name, 'rb') as file_stream:
+        return file_stream.read(len(MAGIC)) == MAGIC
+
+def compile_ignore_list(file_ignores:dict, output:typing.BinaryIO):
+    """ Writes a compiled ignore list holding file_ignores, lists of (rule name, hash, line
+        number) tuples keyed by the posix form of their file name, to output. """
+
+    file_names = sorted(file_ignores)
+    rule_names = sorted({entry[0] for entries in file_ignores.values() for entry in entries})
+    rule_ids = {name: len(file_names) + i for i, name in enumerate(rule_names)}
+
+    strings = [name.encode('utf-8') for name in file_names + rule_names]
+    string_table_offset = _HEADER.size
+    file_index_offset = string_table_offset + _STRING.size * len(strings) + \
+                        sum(len(string) for string in strings)
+    records_offset = file_index_offset + _FILE.size * len(file_names)
+
+    output.write(_HEADER.pack(MAGIC, VERSION, len(file_names), len(rule_names),
+                              string_table_offset, file_index_offset, records_offset))
+
+    data_offset = string_table_offset + _STRING.size * len(strings)
+    for string in strings:
+        output.write(_STRING.pack(data_offset, len(string)))
+        data_offset += len(string)
+    for string in strings:
+        output.write(string)
+
+    first_record = 0
+    for file_name in file_names:
+        output.write(_FILE.pack(first_record, len(file_ignores[file_name])))
+        first_record += len(file_ignores[file_name])
+
+    for file_name in file_names:
+        for rule_name, line_hash, line_num in sorted(file_ignores[file_name],
+                                                     key=lambda entry: (entry[2], entry[0])):
+            output.write(_RECORD.pack(rule_ids[rule_name], line_num, bytes.fromhex(line_hash)))
+
+class CompiledIgnoreList:
+    """ Read only view of a compiled ignore list, as written by compile_ignore_list.
+
+    The file is memory mapped and nothing is read up front: get() binary searches the sorted file
+    names for the requested file and only decodes that file's records.
+    """
+
+    def __init__(self, file_name:str):
+        with open(file_name, 'rb') as file_stream:
+            self._map = mmap.mmap(file_stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._file_count, self._rule_count, self._string_table_offset, \
+            self._file_index_offset, self._records_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(file_name + " is not a compiled ignore list of version " +
+                             str(VERSION))
+        self._rule_names = {}
+
+    def close(self):
+        self._map.close()
+
+    def get_file_count(self) -> int:
+        return self._file_count
+
+    def _get_string(self, index:int) -> str:
+        offset, length = _STRING.unpack_from(self._map, self._string_table_offset +
+                                             _STRING.size * index)
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def _get_rule_name(self, index:int) -> str:
+        if index not in self._rule_names:
+            self._rule_names[index] = self._get_string(index)
+        return self._rule_names[index]
+
+    def _find_file(self, file_name:str) -> int:
+        low = 0
+        high = self._file_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_string(middle) < file_name:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._file_count and self._get_string(low) == file_name:
+            return low
+        return -1
+
+    def get(self, file_name:str, default=None):
+        """ Returns the (rule name, hash, line number) entries of file_name, which must be in
+            posix form, or default if the file has none. Mirrors dict.get. """
+
+        file_index = self._find_file(file_name)
+        if file_index < 0:
+            return default
+
+        first_record, record_count = _FILE.unpack_from(self._map, self._file_index_offset +
+                                                       _FILE.size * file_index)
+        entries = []
+        for rule_id, line_num, line_hash in _RECORD.iter_unpack(
+                self._map[self._records_offset + _RECORD.size * first_record:
+                          self._records_offset + _RECORD.size * (first_record + record_count)]):
+            entries.append((self._get_rule_name(rule_id), line_hash.hex(), line_num))
+        return entries
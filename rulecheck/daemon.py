@@ -0,0 +1,167 @@
+#################################################
+##
+## Daemon Mode
+##
+#################################################
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+# Local imports
+from rulecheck.file_manager import FileManager
+from rulecheck.logger import CollectingSink
+from rulecheck.logger import Logger
+
+#pylint: disable=missing-function-docstring
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """ Answers each request line of a connection with a response line. """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.answer(line)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            if self.server.is_stopping():
+                break
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Checks files and buffers sent over a Unix domain socket, with the rules, srcml settings
+    and ignore list loaded once when the daemon starts.
+
+    Requests and responses are JSON objects, one per line. A connection may send any number of
+    requests. Each connection is served by its own thread, so a client keeping its connection
+    open does not hold up the others, while checks are run one at a time. A request checks files,
+    buffers or both:
+        {"cwd": "/work/dir", "files": ["src/a.c", "src/**/*.h"],
+         "buffers": [{"file": "src/b.c", "text": "int b;\\n"}]}
+    Files are found as the sources of a command line run are, relative to cwd if given. The text
+    of a buffer is checked as the content of the file named, which does not need to exist, in
+    the srcml language given by its optional "language" or else by its extension. The
+    response holds the violations, as the jsonl output format writes them, the number of files
+    checked and the number of violations reported and ignored:
+        {"violations": [{"hash": ..., "file": ..., "line": ..., "col": ..., "severity": ...,
+                         "rule": ..., "message": ...}],
+         "files_checked": 2, "warnings": 1, "errors": 0, "ignored_warnings": 0,
+         "ignored_errors": 0}
+    {"command": "ping"} is answered with {"pong": true}. {"command": "stop"} is answered with
+    {"stopped": true} and stops the daemon. A request that can not be handled is answered with
+    {"error": message}. rulecheck.client sends requests from the command line.
+    """
+
+    # Connections still open do not keep the daemon from stopping.
+    daemon_threads = True
+    # Seconds waited for a connection before checking whether to stop.
+    timeout = 0.5
+
+    def __init__(self, socket_path:str, file_manager:FileManager, logger:Logger):
+        self._socket_path = socket_path
+        self._file_manager = file_manager
+        self._logger = logger
+        self._stopping = False
+        # The file manager, the logger and the current directory are shared by all connections.
+        self._check_lock = threading.Lock()
+        DaemonServer._remove_stale_socket(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+    @staticmethod
+    def _remove_stale_socket(socket_path:str):
+        """ Removes the socket left behind by a daemon that did not stop cleanly. Raises
+            ValueError if a daemon is still listening on it or the path is not a socket. """
+        try:
+            mode = os.stat(socket_path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise ValueError(socket_path + " exists and is not a socket")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(socket_path)
+                return
+        raise ValueError("a daemon is already listening on " + socket_path)
+
+    def server_bind(self):
+        # Only the user running the daemon may connect to it.
+        old_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+    def serve(self):
+        """ Handles connections until a stop request, then removes the socket. """
+        try:
+            while not self._stopping:
+                self.handle_request()
+        finally:
+            self.server_close()
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+
+    def is_stopping(self) -> bool:
+        return self._stopping
+
+    def answer(self, line:bytes) -> dict:
+        """ Returns the response to a request line. """
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError as exc:
+            return {"error": "invalid request: " + str(exc)}
+        if not isinstance(request, dict):
+            return {"error": "invalid request: not a JSON object"}
+
+        command = request.get("command")
+        if command == "ping":
+            return {"pong": True}
+        if command == "stop":
+            self._stopping = True
+            return {"stopped": True}
+        if command is not None:
+            return {"error": "unknown command: " + str(command)}
+
+        try:
+            with self._check_lock:
+                return self.check(request.get("cwd"), request.get("files", []),
+                                  request.get("buffers", []))
+        except Exception as exc:  #pylint: disable=broad-except
+            # The daemon keeps serving whatever a request makes fail.
+            return {"error": type(exc).__name__ + ": " + str(exc)}
+
+    def check(self, cwd:str, files:[str], buffers:[dict]) -> dict:
+        """ Checks files and buffers. Returns the response to the request. """
+        if "-" in files:
+            raise ValueError("files can not be read from the standard input of the daemon")
+
+        output_sink = CollectingSink()
+        self._logger.set_output_sink(output_sink)
+        counts = self._logger.get_counts()
+        file_count = self._file_manager.get_file_count()
+
+        start_dir = os.getcwd()
+        try:
+            if cwd:
+                os.chdir(cwd)
+            self._file_manager.process_files(files)
+            for buffer in buffers:
+                self._file_manager.process_text(buffer["file"], buffer["text"],
+                                                buffer.get("language"))
+        finally:
+            os.chdir(start_dir)
+
+        warnings, errors, ignored_warnings, ignored_errors = \
+            (new - old for new, old in zip(self._logger.get_counts(), counts))
+        return {"violations": [violation.to_dict() for violation in output_sink.get_violations()],
+                "files_checked": self._file_manager.get_file_count() - file_count,
+                "warnings": warnings,
+                "errors": errors,
+                "ignored_warnings": ignored_warnings,
+                "ignored_errors": ignored_errors}
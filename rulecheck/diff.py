@@ -0,0 +1,141 @@
+#################################################
+##
+## Git Diff Filtering
+##
+#################################################
+
+import os
+import re
+import subprocess
+import sys
+
+# Local imports
+from rulecheck.intervals import LineIntervals
+
+#pylint: disable=missing-function-docstring
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+def _unquote(path:str) -> str:
+    """ Undoes the C style quoting git applies to paths with unusual characters. """
+    if not path.startswith('"'):
+        return path
+    escapes = {'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13, '"': 34, '\\': 92}
+    raw = bytearray()
+    index = 1
+    while index < len(path) - 1:
+        char = path[index]
+        if char == '\\':
+            if path[index + 1] in escapes:
+                raw.append(escapes[path[index + 1]])
+                index += 2
+            else:
+                raw.append(int(path[index + 1:index + 4], 8))
+                index += 4
+        else:
+            raw.extend(char.encode('utf-8'))
+            index += 1
+    return raw.decode('utf-8', errors='replace')
+
+class GitDiff:
+    """ The files changed since a git revision and, for each, the lines changed or added.
+
+    Files are keyed by their absolute real path. Deleted files are not included, files from
+    which lines were only removed are included without any changed line. Untracked files that
+    are not ignored by git are included with all of their lines changed.
+    """
+
+    def __init__(self, changed_lines:dict):
+        self._changed_lines = changed_lines
+        self._last_file_name = None
+        self._last_changed_lines = None
+
+    @staticmethod
+    def parse(diff:str, top:str) -> dict:
+        """ Returns the changed lines, keyed by absolute path, from the output of git diff
+            -U0 run in the working tree whose top directory is top. """
+        changed_lines = {}
+        current = None
+        # Lines of the current hunk still to come, so added lines starting with '++' or '@@'
+        # are not taken for headers.
+        old_remaining = 0
+        new_remaining = 0
+        for line in diff.splitlines():
+            if old_remaining > 0 or new_remaining > 0:
+                if line.startswith('-'):
+                    old_remaining -= 1
+                elif line.startswith('+'):
+                    new_remaining -= 1
+                elif not line.startswith('\\'):
+                    old_remaining -= 1
+                    new_remaining -= 1
+            elif line.startswith('+++ '):
+                path = _unquote(line[4:].rstrip('\t'))
+                if path == '/dev/null':
+                    current = None
+                else:
+                    # Strip the b/ destination prefix.
+                    path = path[2:]
+                    current = changed_lines.setdefault(
+                        os.path.join(top, *path.split('/')), LineIntervals())
+            elif line.startswith('@@'):
+                match = HUNK_HEADER.match(line)
+                if match:
+                    old_remaining = int(match.group(1)) if match.group(1) is not None else 1
+                    first = int(match.group(2))
+                    new_remaining = int(match.group(3)) if match.group(3) is not None else 1
+                    if new_remaining > 0 and current is not None:
+                        current.add(first, first + new_remaining - 1)
+        return changed_lines
+
+    @staticmethod
+    def read(revision:str) -> 'GitDiff':
+        """ Returns the changes of the working tree containing the current directory since
+            revision. Raises ValueError if git fails. """
+        top = GitDiff._run_git(['rev-parse', '--show-toplevel']).strip()
+        diff = GitDiff._run_git(['-c', 'core.quotePath=false', 'diff', '-U0', '--no-color',
+                                 '--no-ext-diff', '--src-prefix=a/', '--dst-prefix=b/',
+                                 revision, '--'])
+        untracked = GitDiff._run_git(['ls-files', '-z', '--others', '--exclude-standard',
+                                      '--full-name', '--', ':/'])
+        top = os.path.realpath(top)
+        changed_lines = GitDiff.parse(diff, top)
+        GitDiff.add_untracked(changed_lines, untracked.split('\0'), top)
+        return GitDiff(changed_lines)
+
+    @staticmethod
+    def add_untracked(changed_lines:dict, paths:[str], top:str):
+        """ Adds the untracked files paths, relative to top, to changed_lines with all of their
+            lines changed, as git diff does not report them. """
+        for path in paths:
+            if path:
+                all_lines = LineIntervals()
+                all_lines.add(1, sys.maxsize)
+                changed_lines[os.path.join(top, *path.split('/'))] = all_lines
+
+    @staticmethod
+    def _run_git(args:[str]) -> str:
+        try:
+            child = subprocess.run(['git'] + args, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, check=False)
+        except (IOError, OSError) as exc:
+            raise ValueError("could not run git: " + str(exc)) from exc
+        if child.returncode != 0:
+            raise ValueError("git " + " ".join(args) + " failed: " +
+                             child.stderr.decode('utf-8', errors='replace').strip())
+        return child.stdout.decode('utf-8', errors='replace')
+
+    def get_changed_files(self) -> [str]:
+        """ Returns the absolute real paths of the changed files, sorted. """
+        return sorted(self._changed_lines)
+
+    def is_changed_file(self, file_name:str) -> bool:
+        return os.path.realpath(file_name) in self._changed_lines
+
+    def is_changed_line(self, file_name:str, line_num:int) -> bool:
+        # Violations come file by file, so the lookup of the file is done once per file.
+        if file_name != self._last_file_name:
+            self._last_file_name = file_name
+            self._last_changed_lines = self._changed_lines.get(os.path.realpath(file_name))
+        return self._last_changed_lines is not None and \
+               self._last_changed_lines.contains(line_num)
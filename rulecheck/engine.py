@@ -1,16 +1,35 @@
 import argparse
+import contextlib
 import shutil
+import socket
 import sys
 
 # Local imports
 from rulecheck.srcml import Srcml
+from rulecheck.cache import DiskCache
+from rulecheck.result_cache import ResultCache
 from rulecheck.file_manager import FileManager
 from rulecheck.rule_manager import RuleManager
 from rulecheck.logger import Logger
 from rulecheck.logger import LOGGER
+from rulecheck.logger import OutputWriter
+from rulecheck.logger import OUTPUT_FORMATS
+from rulecheck.logger import create_output_sink
 from rulecheck.logger import log_violation_wrapper
 from rulecheck.ignore import IgnoreFilter
+from rulecheck.ignore import read_ignore_list
+from rulecheck.compiled_ignore import CompiledIgnoreList
+from rulecheck.compiled_ignore import compile_ignore_list
+from rulecheck.compiled_ignore import is_compiled_ignore_list
+from rulecheck.diff import GitDiff
 from rulecheck.rule import Rule
+from rulecheck.parallel import process_files_in_parallel
+from rulecheck.profiler import FileTimings
+from rulecheck.profiler import NOT_TIMED
+from rulecheck.profiler import RuleProfiler
+from rulecheck.profiler import Tracer
+from rulecheck.walker import FileWalker
+from rulecheck.watch import FileWatcher
 from rulecheck import __version__
 
 #pylint: disable=missing-function-docstring
@@ -25,6 +44,11 @@ from rulecheck import __version__
 #################################################
 
 VERBOSE_ENABLED: bool
+RULE_PROFILER: RuleProfiler = None
+FILE_TIMINGS: FileTimings = None
+TRACER: Tracer = None
+GIT_DIFF: GitDiff = None
+IGNORE_FILTER: IgnoreFilter = None
 
 
 def print_verbose(message:str):
@@ -48,8 +72,9 @@ def create_parser():
     parser.description = "Tool to run rules on code."
     parser.add_argument("-c", "--config",
                         help="""config file. Specify the option multiple times to specify
-                                multiple config files.""",
-                        required=True, action="append", type=str)
+                                multiple config files. Required unless --compile-ignorelist is
+                                used.""",
+                        action="append", type=str)
     parser.add_argument("-r", "--rulepaths",
                         help="""path to rules. Specify the option multiple times to specify
                                 multiple paths.""",
@@ -63,6 +88,22 @@ def create_parser():
                         help="""specify extension to language mappings used with srcml.
                                 --register-ext EXT=LANG""",
                         action="append", type=str)
+    parser.add_argument("-x", "--extensions",
+                        help="""comma separated extensions, such as .c,.h, of the files to check
+                                when searching paths. Specify the option multiple times to add
+                                more. By default, files with any extension are checked, srcml
+                                being run only on those with an extension it reads.""",
+                        action="append", type=str)
+    parser.add_argument("--exclude",
+                        help="""skip files and directories matching this pattern when searching
+                                paths. Excluded directories are not searched at all. A pattern
+                                without a '/' is matched against names, otherwise against whole
+                                paths. Specify the option multiple times to add more.""",
+                        action="append", type=str)
+    parser.add_argument("--gitignore",
+                        help="""skip files and directories ignored by .gitignore files when
+                                searching paths.""",
+                        action="store_true", default=False)
     # The srmclargs value must be quoted and start with a leading space because of this bug in
     # argparse: https://bugs.python.org/issue9334
     parser.add_argument("--srcmlargs",
@@ -72,10 +113,103 @@ def create_parser():
                               Also, --tabs has its own dedicated option.""",
                         default="--position --cpp-markup-if0", nargs=1, type=str)
     parser.add_argument("--tabs", help="number of spaces used for tabs", default=4, type=int)
+    parser.add_argument("--srcml-stream",
+                        help="""parse srcml output while srcml produces it, discarding elements
+                                once visited, to bound memory use on very large files.
+                                Ignored if a loaded rule needs the full srcml tree.""",
+                        action="store_true", default=False)
+    parser.add_argument("--srcml-cache",
+                        help="""directory in which to cache srcml output between runs. The
+                                directory may be shared by rulecheck processes running at the
+                                same time.""",
+                        default="", type=str)
+    parser.add_argument("--srcml-cache-size",
+                        help="""maximum size in MB of the srcml cache. Least recently used
+                                entries are removed once exceeded. Defaults to 512.""",
+                        default=512, type=int)
+    parser.add_argument("--result-cache",
+                        help="""directory in which to cache the results of checking each file
+                                between runs. Unchanged files are not checked again, their cached
+                                results are reported instead. Only used if all loaded rules are
+                                cacheable.""",
+                        default="", type=str)
+    parser.add_argument("--result-cache-size",
+                        help="""maximum size in MB of the result cache. Least recently used
+                                entries are removed once exceeded. Defaults to 512.""",
+                        default=512, type=int)
+    parser.add_argument("--srcml-batch-size",
+                        help="""number of files to pass to a single srcml run (archive mode).
+                                Defaults to 1, one srcml run per file.""",
+                        default=1, type=int)
+    parser.add_argument("--srcml-jobs",
+                        help="""number of srcml runs to perform in parallel, ahead of the file
+                                currently being checked by the rules. Defaults to 1.""",
+                        default=1, type=int)
     parser.add_argument("--Werror", help="all warnings will be promoted to errors",
                         action="store_true", default=False)
     parser.add_argument("-i", "--ignorelist", help="file with rule violations to ignore",
                         default = "", type=str)
+    parser.add_argument("--compile-ignorelist",
+                        help="""compile the ignore list given with --ignorelist into a binary
+                                file, which can then be given to --ignorelist instead, and exit.
+                                No files are checked.""",
+                        default="", type=str)
+    parser.add_argument("-j", "--jobs",
+                        help="""number of processes checking files in parallel. Each process
+                                loads its own instances of the rules. Output is reported in the
+                                same order as with a single process. Defaults to 1.""",
+                        default=1, type=int)
+    parser.add_argument("-o", "--output",
+                        help="""file to write rule violations to instead of stdout. Other output,
+                                such as verbose messages, is still written to stdout, or to
+                                stderr with formats other than text.""",
+                        default="", type=str)
+    parser.add_argument("--format",
+                        help="""format of the rule violations written: text (the default), jsonl
+                                (one JSON object per violation and line) or sarif (SARIF 2.1.0).
+                                All but text include the ignore list hash of every violation.
+                                Without -o, all but text write any other output to stderr.""",
+                        choices=OUTPUT_FORMATS, default="text", type=str)
+    parser.add_argument("--profile-rules",
+                        help="""record the time spent in each visitor method of each rule, print
+                                a report, slowest rule first, and write it as JSON to the given
+                                file.""",
+                        default="", type=str)
+    parser.add_argument("--timing-report",
+                        help="""time each stage of checking each file (read, srcml, parse, rules
+                                and ignore filtering) and print the totals per stage and the
+                                given number of slowest files at the end of the run.""",
+                        default=0, type=int)
+    parser.add_argument("--trace",
+                        help="""write a Chrome trace event file, viewable with chrome://tracing or
+                                Perfetto, with spans for loading the config files, rules and
+                                ignore list, and for each file checked and each stage of checking
+                                it. Each worker process and srcml thread has its own track.""",
+                        default="", type=str)
+    parser.add_argument("--diff-base",
+                        help="""check only the files changed since the given git revision, as
+                                reported by 'git diff' run from the current directory, and report
+                                only the violations on lines changed or added since then.
+                                Untracked files not ignored by git are checked in full.
+                                Violations without a line number are always reported.""",
+                        default="", type=str)
+    parser.add_argument("--watch",
+                        help="""after checking the sources, keep checking them again every
+                                --watch-interval seconds until interrupted, reporting the
+                                violations new and fixed since the previous check of each changed
+                                file. Only files whose modification time, size or inode changed
+                                are checked again. Files are checked in a single process, whatever
+                                --jobs is.""",
+                        action="store_true", default=False)
+    parser.add_argument("--watch-interval",
+                        help="number of seconds between checks with --watch. Defaults to 1.",
+                        default=1.0, type=float)
+    parser.add_argument("--daemon",
+                        help="""instead of checking the sources given, load the rules, srcml
+                                settings and ignore list once and check the files and buffers
+                                sent by clients over the given Unix domain socket, until a client
+                                requests it to stop. See rulecheck-client.""",
+                        default="", type=str)
     parser.add_argument('-v', '--verbose', action='store_true', default=False)
     parser.add_argument('--version', action='version', version='%(prog)s '+ __version__)
     parser.add_argument("sources",
@@ -86,22 +220,25 @@ def create_parser():
 
     return parser
 
-def create_srcml(args) -> Srcml:
+def find_srcml(args) -> str:
+    """Returns the path of the srcml binary, or None if it can not be found."""
     if args.srcml:
         srcml_bin = shutil.which('srcml', path=args.srcml)
     else:
         srcml_bin = shutil.which('srcml')
 
-    if srcml_bin:
-        print_verbose("srcml binary located at: " + srcml_bin)
+    if srcml_bin and args.verbose:
+        print("srcml binary located at: " + srcml_bin)
+    return srcml_bin
+
+def print_srcml_not_found(args):
+    print("Could not locate srcml binary!")
+    if args.srcml:
+        print("srcml path was specified as: " + args.srcml)
     else:
-        print("Could not locate srcml binary!")
-        if args.srcml:
-            print("srcml path was specified as: " + args.srcml)
-        else:
-            print("system path was searched")
-        return None
+        print("system path was searched")
 
+def create_srcml(args, srcml_bin:str) -> Srcml:
     srcml_args = []
     if args.srcmlargs:
         srcml_args.extend(args.srcmlargs.split())
@@ -109,26 +246,57 @@ def create_srcml(args) -> Srcml:
     if args.tabs:
         srcml_args.append("--tabs=" + str(args.tabs))
 
-    return Srcml(srcml_bin, srcml_args, VERBOSE_ENABLED)
-
-def rulecheck(args) -> int:
-    """Run rule check using specified command line arguments. Returns exit value.
-    0 = No errors, normal program termination.
-    1 = Internal rulecheck error
-    2 = At least one rule reported an error
-    3 = At least one rule reported a warning but no rules reported an error
-    """
-    global LOGGER
-    global VERBOSE_ENABLED
-
-    VERBOSE_ENABLED = False
-    if args.verbose:
-        VERBOSE_ENABLED = True
-
-    srcml = create_srcml(args)
-
-    if srcml is None:
-        return 1
+    srcml = Srcml(srcml_bin, srcml_args, args.verbose)
+
+    if args.srcml_cache:
+        srcml.set_cache(DiskCache(args.srcml_cache, args.srcml_cache_size * 1024 * 1024,
+                                  args.verbose))
+
+    return srcml
+
+class CheckSetup:
+    """The objects checking files as specified by the command line arguments, as created by
+    create_check_setup. profiler, file_timings, tracer and git_diff are None if not used."""
+
+    def __init__(self, logger:Logger, ignore_filter:IgnoreFilter, rule_manager:RuleManager,
+                 file_manager:FileManager):
+        self.logger = logger
+        self.ignore_filter = ignore_filter
+        self.rule_manager = rule_manager
+        self.file_manager = file_manager
+        self.profiler = None
+        self.file_timings = None
+        self.tracer = None
+        self.git_diff = None
+
+    def close(self):
+        """Closes the ignore list, which a compiled ignore list keeps open."""
+        self.ignore_filter.close()
+
+def create_check_setup(args, git_diff:GitDiff = None, logger:Logger = None) -> CheckSetup:
+    """Creates srcml, the ignore filter, the rules and the file manager, and configures logger,
+    a new Logger if not given, as specified by the command line arguments. Returns them, or None
+    on error. With --diff-base, the changes are read with git unless git_diff is given. Nothing
+    global is changed, so setups created with different arguments do not interfere."""
+
+    def print_verbose_setup(message:str):
+        if args.verbose:
+            print(message)
+
+    tracer = Tracer() if args.trace else None
+
+    if args.diff_base and git_diff is None:
+        try:
+            git_diff = GitDiff.read(args.diff_base)
+        except ValueError as exc:
+            print("Could not read the changes since " + args.diff_base + ": " + str(exc))
+            return None
+        print_verbose_setup(str(len(git_diff.get_changed_files())) + " files changed since " +
+                            args.diff_base)
+
+    # The binary is only required once the rules are known to visit srcml elements.
+    srcml_bin = find_srcml(args)
+    srcml = create_srcml(args, srcml_bin)
 
     if args.register_ext:
         for register_ext in args.register_ext:
@@ -137,42 +305,240 @@ def rulecheck(args) -> int:
                 srcml.add_ext_mapping('.'+regext[0], regext[1])
             else:
                 print("Bad --register-ext option: " + register_ext)
-                return 1
+                return None
 
-        print_verbose("Extension to language mappings for srcml are: " + \
-                      str(srcml.get_ext_mappings()))
+        print_verbose_setup("Extension to language mappings for srcml are: " + \
+                            str(srcml.get_ext_mappings()))
 
-    ignore_list_file_handle = None
     if args.ignorelist:
-        print_verbose("Ignore list specified: " + args.ignorelist)
-        ignore_list_file_handle = open(args.ignorelist, "r")
+        print_verbose_setup("Ignore list specified: " + args.ignorelist)
+        with tracer.span(args.ignorelist, "load ignore list") if tracer else NOT_TIMED:
+            if is_compiled_ignore_list(args.ignorelist):
+                ignore_filter = IgnoreFilter(None, args.verbose,
+                                             CompiledIgnoreList(args.ignorelist))
+            else:
+                with open(args.ignorelist, "r") as ignore_list_file_handle:
+                    ignore_filter = IgnoreFilter(ignore_list_file_handle, args.verbose)
+    else:
+        ignore_filter = IgnoreFilter(None, args.verbose)
+
+    if logger is None:
+        logger = Logger()
+
+    logger.set_tab_size(args.tabs)
+    logger.set_show_hash(args.generatehashes)
+    logger.set_warnings_are_errors(args.Werror)
+    logger.set_ignore_filter(ignore_filter)
+    logger.set_verbose(args.verbose)
+    logger.set_git_diff(git_diff)
+
+    # The rules loaded log through logger.
+    rule_manager = RuleManager(logger, ignore_filter, args.verbose)
+    rule_manager.set_tracer(tracer)
+
+    rule_manager.load_rules(args.config, args.rulepaths)
+
+    if srcml_bin is None and rule_manager.needs_srcml():
+        print_srcml_not_found(args)
+        ignore_filter.close()
+        return None
+
+    profiler = None
+    if args.profile_rules:
+        profiler = RuleProfiler()
+        rule_manager.set_profiler(profiler)
+
+    file_manager = FileManager(rule_manager, srcml, logger, args.verbose,
+                               args.srcml_batch_size, args.srcml_jobs, args.srcml_stream)
+    setup = CheckSetup(logger, ignore_filter, rule_manager, file_manager)
+    setup.profiler = profiler
+    setup.tracer = tracer
+    setup.git_diff = git_diff
+
+    file_manager.set_file_walker(FileWalker(get_extensions(args), args.exclude,
+                                            args.gitignore, args.verbose))
+    file_manager.set_git_diff(git_diff)
+
+    if args.timing_report > 0:
+        setup.file_timings = FileTimings(args.timing_report)
+        file_manager.set_file_timings(setup.file_timings)
+    logger.set_file_timings(setup.file_timings)
+
+    file_manager.set_tracer(tracer)
+
+    if args.result_cache:
+        uncacheable_rules = rule_manager.get_uncacheable_rules()
+        if uncacheable_rules:
+            print("Result cache not used, these rules are not cacheable: " + \
+                  ", ".join(uncacheable_rules))
+        else:
+            file_manager.set_result_cache(
+                ResultCache(DiskCache(args.result_cache, args.result_cache_size * 1024 * 1024,
+                                      args.verbose),
+                            get_result_cache_identity(srcml, rule_manager), logger, ignore_filter))
 
-    ignore_filter = IgnoreFilter(ignore_list_file_handle, VERBOSE_ENABLED)
+    return setup
 
-    LOGGER.set_tab_size(args.tabs)
-    LOGGER.set_show_hash(args.generatehashes)
-    LOGGER.set_warnings_are_errors(args.Werror)
-    LOGGER.set_ignore_filter(ignore_filter)
-    LOGGER.set_verbose(VERBOSE_ENABLED)
+def create_file_manager(args, git_diff:GitDiff = None):
+    """Creates the file manager checking files as specified by the command line arguments, with
+    the global LOGGER, and sets the other globals from its setup. Returns the file manager, or
+    None on error."""
+    global VERBOSE_ENABLED
+    global RULE_PROFILER
+    global FILE_TIMINGS
+    global TRACER
+    global GIT_DIFF
+    global IGNORE_FILTER
+
+    VERBOSE_ENABLED = args.verbose
 
+    # Rules not loaded by a RuleManager log through the global LOGGER too.
     Rule.set_logger(log_violation_wrapper)
 
-    rule_manager = RuleManager(LOGGER, ignore_filter, VERBOSE_ENABLED)
+    setup = create_check_setup(args, git_diff, LOGGER)
+    if setup is None:
+        return None
 
-    rule_manager.load_rules(args.config, args.rulepaths)
+    RULE_PROFILER = setup.profiler
+    FILE_TIMINGS = setup.file_timings
+    TRACER = setup.tracer
+    GIT_DIFF = setup.git_diff
+    IGNORE_FILTER = setup.ignore_filter
+    return setup.file_manager
+
+def create_worker(args, git_diff:GitDiff = None) -> tuple:
+    """Creates the file manager of a process_files_in_parallel worker process. Returns it along
+    with the global LOGGER, RULE_PROFILER, FILE_TIMINGS and TRACER it uses."""
+    file_manager = create_file_manager(args, git_diff)
+    return file_manager, LOGGER, RULE_PROFILER, FILE_TIMINGS, TRACER
+
+def get_extensions(args) -> [str]:
+    """Returns the extensions of the files to check when searching paths, or None to check files
+    with any extension. srcml is only run on the files whose extension it reads either way."""
+    if not args.extensions:
+        return None
 
-    file_manager = FileManager(rule_manager, srcml, LOGGER, VERBOSE_ENABLED)
+    extensions = []
+    for extension_list in args.extensions:
+        for extension in extension_list.split(","):
+            extension = extension.strip()
+            if extension:
+                extensions.append(extension if extension.startswith(".") else "." + extension)
+    if args.verbose:
+        print("Checking files with extensions: " + ", ".join(extensions))
+    return extensions
+
+def get_result_cache_identity(srcml:Srcml, rule_manager:RuleManager) -> str:
+    """Returns a string capturing everything other than a file itself that the results of
+    checking the file depend on."""
+    identity = [__version__, rule_manager.get_rules_identity()]
+    if rule_manager.needs_srcml():
+        identity.append(" ".join(srcml.get_args()))
+        identity.append(str(sorted(srcml.get_ext_mappings().items())))
+        identity.append(srcml.get_version())
+    return "\n".join(identity)
 
-    # Flatten list of lists in args.sources and pass to process_files
-    file_manager.process_files([item for sublist in args.sources for item in sublist])
+def rulecheck(args) -> int:
+    """Run rule check using specified command line arguments. Returns exit value.
+    0 = No errors, normal program termination.
+    1 = Internal rulecheck error
+    2 = At least one rule reported an error
+    3 = At least one rule reported a warning but no rules reported an error
+    """
+
+    if args.format != 'text' and not args.output:
+        # Violations are then written to stdout as a single JSON or SARIF document, so
+        # everything else printed goes to stderr.
+        violation_stream = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            return run_rulecheck(args, violation_stream)
+    return run_rulecheck(args)
+
+def run_rulecheck(args, violation_stream = None) -> int:
+    """Runs rule check as rulecheck does, writing the violations to violation_stream, if given,
+    unless written to a file. Returns exit value."""
+
+    if args.compile_ignorelist:
+        return compile_ignore_list_file(args)
+
+    if args.watch and args.format == 'sarif':
+        print("--watch can not be used with the sarif format")
+        return 1
 
+    if args.watch and args.watch_interval <= 0:
+        print("--watch-interval must be greater than 0")
+        return 1
+
+    file_manager = create_file_manager(args)
+
+    if file_manager is None:
+        return 1
+
+    try:
+        if args.daemon:
+            return run_daemon(args, file_manager)
+        return check_sources(args, file_manager, violation_stream)
+    finally:
+        IGNORE_FILTER.close()
 
-    if ignore_list_file_handle:
-        ignore_list_file_handle.close()
+def check_sources(args, file_manager:FileManager, violation_stream = None) -> int:
+    """Checks the sources of args with file_manager and writes the violations found, to
+    violation_stream if given and no output file is. Returns the exit value of rulecheck."""
+    global LOGGER
+
+    try:
+        output_stream = open(args.output, "w") if args.output else None
+    except (IOError, OSError) as exc:
+        print("Could not open output file: " + str(exc))
+        return 1
+    output_writer = OutputWriter(output_stream or violation_stream,
+                                 OutputWriter.DEFAULT_BUFFER_SIZE)
+    output_sink = create_output_sink(args.format, output_writer, __version__)
+    LOGGER.set_output_sink(output_sink)
+
+    # Flatten list of lists in args.sources and pass to process_files
+    sources = [item for sublist in args.sources for item in sublist]
+
+    watcher = None
+    try:
+        if args.watch:
+            watcher = FileWatcher(file_manager, LOGGER, sources, output_writer, args.format,
+                                  VERBOSE_ENABLED)
+            watcher.watch(args.watch_interval)
+        elif args.jobs > 1:
+            process_files_in_parallel(args, create_worker, file_manager, LOGGER, sources,
+                                      RULE_PROFILER, FILE_TIMINGS, TRACER, GIT_DIFF)
+        else:
+            file_manager.process_files(sources)
+    finally:
+        output_sink.finish()
+        if output_stream:
+            output_writer.close()
+        else:
+            output_writer.flush()
 
     if VERBOSE_ENABLED:
         print_summary(LOGGER, file_manager)
 
+    if FILE_TIMINGS:
+        FILE_TIMINGS.print_report()
+
+    if TRACER:
+        try:
+            TRACER.write(args.trace)
+        except (IOError, OSError) as exc:
+            print("Could not write trace: " + str(exc))
+
+    if RULE_PROFILER:
+        RULE_PROFILER.print_report()
+        try:
+            RULE_PROFILER.write_report(args.profile_rules)
+        except (IOError, OSError) as exc:
+            print("Could not write rule profile: " + str(exc))
+
+    if watcher:
+        return watcher.get_exit_value()
+
     if LOGGER.get_error_count() > 0:
         return 2
     if LOGGER.get_warning_count() > 0:
@@ -180,8 +546,56 @@ def rulecheck(args) -> int:
 
     return 0
 
+def run_daemon(args, file_manager:FileManager) -> int:
+    """Serves check requests on the socket args.daemon until stopped. Returns exit value, 0 once
+    stopped and 1 if the daemon could not start."""
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("--daemon requires Unix domain sockets, which this platform does not provide")
+        return 1
+
+    # Imported here as the daemon module can only be imported where Unix domain sockets exist.
+    from rulecheck.daemon import DaemonServer  #pylint: disable=import-outside-toplevel
+
+    try:
+        server = DaemonServer(args.daemon, file_manager, LOGGER)
+    except (IOError, OSError, ValueError) as exc:
+        print("Could not start the daemon: " + str(exc))
+        return 1
+
+    print_verbose("Listening for requests on " + args.daemon)
+    sys.stdout.flush()
+    server.serve()
+    return 0
+
+def compile_ignore_list_file(args) -> int:
+    """Compiles the text ignore list args.ignorelist into args.compile_ignorelist. Returns exit
+    value, 0 on success and 1 on error."""
+
+    if not args.ignorelist:
+        print("--compile-ignorelist requires an ignore list to be specified with --ignorelist")
+        return 1
+
+    try:
+        with open(args.ignorelist, "r") as ignore_list_file_handle:
+            file_ignores = read_ignore_list(ignore_list_file_handle, args.verbose)
+        with open(args.compile_ignorelist, "wb") as output:
+            compile_ignore_list(file_ignores, output)
+    except (IOError, OSError) as exc:
+        print("Could not compile ignore list: " + str(exc))
+        return 1
+
+    if args.verbose:
+        print("Compiled " + str(sum(len(entries) for entries in file_ignores.values())) +
+              " entries for " + str(len(file_ignores)) + " files into " +
+              args.compile_ignorelist)
+
+    return 0
+
 def main():
     parser = create_parser()
     args = parser.parse_args()
+    if not args.config and not args.compile_ignorelist:
+        parser.error("the following arguments are required: -c/--config")
     result = rulecheck(args)
     sys.exit(result)
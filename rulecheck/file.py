@@ -7,12 +7,18 @@ import io
 # 3rd party imports
 from lxml import etree as ET
 
+# Local imports
+from rulecheck.srcml import Srcml
+from rulecheck.srcml import XmlLineTracker
+
 class File():
-    def __init__(self, file_name:str, lines, raw_srcml_bytes):
+    def __init__(self, file_name:str, lines, raw_srcml_bytes, srcml_stream = None):
         self._lines = lines
         self._file_name = file_name
         self._raw_srcml_bytes = raw_srcml_bytes
         self._srcml_etree_root = None
+        self._srcml_stream = srcml_stream
+        self._xml_end_lines = None
 
         if self._raw_srcml_bytes:
             self._srcml_etree_root = ET.parse(io.BytesIO(self._raw_srcml_bytes))
@@ -28,3 +34,48 @@ class File():
 
     def get_srcml_etree_root(self):
         return self._srcml_etree_root
+
+    def get_xml_end_lines(self):
+        """ Returns the xml line of every end tag in the srcml tree, in iterwalk order. """
+        if self._xml_end_lines is None and self._srcml_etree_root is not None:
+            self._xml_end_lines = Srcml.get_xml_end_lines(self._srcml_etree_root)
+        return self._xml_end_lines
+
+    def has_srcml(self) -> bool:
+        return self._srcml_etree_root is not None or self._srcml_stream is not None
+
+    def iter_srcml_events(self):
+        """ Yields (event, element, xml line) for the start and end of every srcml element.
+
+            When the file was created from a srcml stream, elements are yielded while the stream
+            is parsed. Once the consumer moves past an element's end event, that element is
+            cleared and its earlier siblings are removed from the tree, so memory use does not
+            grow with the size of the file. Thus, a start event only guarantees the tag and
+            attributes of the element, an end event its text, and nothing may be kept from
+            one event to the next.
+        """
+        if self._srcml_etree_root is not None:
+            end_lines = self.get_xml_end_lines()
+            end_count = 0
+            for event, elem in ET.iterwalk(self._srcml_etree_root, events=("start", "end")):
+                if event == "start":
+                    yield event, elem, Srcml.get_xml_line(elem, event)
+                else:
+                    yield event, elem, end_lines[end_count]
+                    end_count += 1
+        elif self._srcml_stream is not None:
+            tracker = XmlLineTracker()
+            try:
+                for event, elem in ET.iterparse(self._srcml_stream, events=("start", "end"),
+                                                huge_tree=True):
+                    if event == "start":
+                        yield event, elem, tracker.start(elem)
+                    else:
+                        yield event, elem, tracker.end(elem)
+                        elem.clear(keep_tail=True)
+                        parent = elem.getparent()
+                        if parent is not None:
+                            while elem.getprevious() is not None:
+                                del parent[0]
+            except ET.XMLSyntaxError as exc:
+                print("error parsing srcml output for " + self._file_name + ": " + str(exc))
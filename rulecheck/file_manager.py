@@ -1,68 +1,307 @@
-import glob
+import collections
+import concurrent.futures
+import contextlib
+import io
 from pathlib import Path
 import sys
+import time
 
+from rulecheck.diff import GitDiff
 from rulecheck.file import File
 from rulecheck.rule_manager import RuleManager
 from rulecheck.srcml import Srcml
 from rulecheck.logger import Logger
+from rulecheck.profiler import FileTimings
+from rulecheck.profiler import NOT_TIMED
+from rulecheck.profiler import Tracer
+from rulecheck.result_cache import ResultCache
 from rulecheck.rule import LogType
 from rulecheck.rule import LogFilePosition
+from rulecheck.walker import FileIdentities
+from rulecheck.walker import FileWalker
 
 #pylint: disable=missing-function-docstring
 #pylint: disable=too-many-arguments
 #pylint: disable=too-many-instance-attributes
 
 class FileManager:
-    def __init__(self, rules:RuleManager, srcml:Srcml, logger:Logger, verbose:bool):
+    def __init__(self, rules:RuleManager, srcml:Srcml, logger:Logger, verbose:bool,
+                 batch_size:int = 1, srcml_jobs:int = 1, stream_srcml:bool = False):
         self._rules = rules
         self._srcml = srcml
         self._logger = logger
         self._current_file = None
         self._file_count = 0
+        self._batch_size = max(batch_size, 1)
+        self._srcml_jobs = max(srcml_jobs, 1)
+        self._stream_srcml = stream_srcml
+        self._result_cache = None
+        self._file_walker = FileWalker()
+        self._git_diff = None
+        self._file_timings = None
+        self._tracer = None
+        # The file timings and tracer, if set, as both record the stages of checking a file.
+        self._stage_recorders = []
+        self._file_checked = None
         self.verbose = verbose
 
     def print_verbose(self, message:str):
         if self.verbose:
             print(message)
 
+    def set_result_cache(self, result_cache:ResultCache):
+        """ Replay results from result_cache for unchanged files instead of checking them, and
+            store the results of files that are checked. """
+        self._result_cache = result_cache
+
+    def set_file_walker(self, file_walker:FileWalker):
+        """ Find the files matching the globs given to process_files with file_walker. """
+        self._file_walker = file_walker
+
+    def set_git_diff(self, git_diff:GitDiff):
+        """ Only process the files git_diff reports as changed, among those matching the globs
+            given to process_files. """
+        self._git_diff = git_diff
+
+    def set_file_timings(self, file_timings:FileTimings):
+        """ Record the time spent in each stage of checking each file with file_timings. """
+        self._file_timings = file_timings
+        self._stage_recorders = [r for r in (self._file_timings, self._tracer) if r]
+
+    def set_tracer(self, tracer:Tracer):
+        """ Record spans for each file, each stage of checking it, and srcml runs with tracer. """
+        self._tracer = tracer
+        self._stage_recorders = [r for r in (self._file_timings, self._tracer) if r]
+
+    def set_file_checked(self, file_checked):
+        """ While set, file_checked(file_path) is called once each file has been checked and
+            its violations written out, whether or not it could be read. """
+        self._file_checked = file_checked
+
+    def _stage(self, stage:str):
+        if not self._stage_recorders:
+            return NOT_TIMED
+        if len(self._stage_recorders) == 1:
+            return self._stage_recorders[0].stage(stage)
+        stack = contextlib.ExitStack()
+        for recorder in self._stage_recorders:
+            stack.enter_context(recorder.stage(stage))
+        return stack
+
     def process_files(self, globs:[str]):
 
         if (not globs is None) and len(globs) > 0:
-            # Handle STDIN input
-            if len(globs) == 1 and globs[0] == "-":
-                for file_path in sys.stdin:
-                    self.process_file(file_path.rstrip())
-            # Otherwise, handle glob input
-            else:
-                for glob_str in globs:
-                    for file_path in glob.iglob(glob_str, recursive=True):
-                        self.process_file(file_path)
+            if not self._rules.needs_srcml():
+                self.print_verbose("No loaded rule visits srcml elements, srcml will not be run.")
+            elif self._stream_srcml and self._rules.needs_full_tree():
+                self.print_verbose("Not streaming srcml output, a loaded rule needs the full tree.")
 
-    def process_file(self, file_path:str):
-        self._current_file = None
+            self._process_batches(self.get_batches(globs))
+
+    def process_file_list(self, file_paths:[str]):
+        """Processes file_paths, files already found, in batches of batch_size files."""
+        self._process_batches(file_paths[start:start + self._batch_size]
+                              for start in range(0, len(file_paths), self._batch_size))
+
+    def _process_batches(self, batches):
+        if self._srcml_jobs > 1 and self._runs_srcml_on_whole_files():
+            self._process_batches_pipelined(batches)
+        else:
+            for batch in batches:
+                self.process_batch(batch)
+
+    def _get_file_paths(self, globs:[str], identities:FileIdentities):
+        # Handle STDIN input
+        if len(globs) == 1 and globs[0] == "-":
+            for file_path in sys.stdin:
+                file_path = file_path.rstrip()
+                if not Path(file_path).is_dir() and \
+                   (self._git_diff is None or self._git_diff.is_changed_file(file_path)) and \
+                   identities.add(file_path):
+                    yield file_path
+        # Otherwise, handle glob input. The walker only yields files.
+        elif self._git_diff:
+            # Only the changed files are matched against the globs, no directory is searched.
+            yield from self._file_walker.iter_changed_files(
+                globs, self._git_diff.get_changed_files(), identities)
+        else:
+            yield from self._file_walker.iter_files(globs, identities)
+
+    def get_batches(self, globs:[str]):
+        """Yields the files found from globs, skipping directories and files already found
+        through another path, in lists of up to batch_size files."""
+
+        identities = FileIdentities()
+        batch = []
+        for file_path in self._get_file_paths(globs, identities):
+            batch.append(file_path)
+            if len(batch) == self._batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+        if identities.get_duplicate_count():
+            self.print_verbose("Skipped " + str(identities.get_duplicate_count()) +
+                               " files found more than once.")
+
+    def _is_streaming_srcml(self) -> bool:
+        return self._stream_srcml and not self._rules.needs_full_tree()
+
+    def _runs_srcml_on_whole_files(self) -> bool:
+        return self._rules.needs_srcml() and not self._is_streaming_srcml()
+
+    def process_batch(self, file_paths:[str]):
+        """Processes a group of files, using a single srcml run for all of them when srcml
+        output is needed and not streamed."""
+
+        if len(file_paths) > 1 and self._runs_srcml_on_whole_files():
+            self._process_batch_results(file_paths, self._run_srcml(file_paths))
+        else:
+            for file_path in file_paths:
+                self.process_file(file_path)
 
+    def _process_batches_pipelined(self, batches):
+        """Runs srcml on up to srcml_jobs batches ahead of the batch whose rules are currently
+        being run. Batches are still processed in the order they were provided."""
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._srcml_jobs) as executor:
+            pending = collections.deque()
+            for batch in batches:
+                pending.append((batch, executor.submit(self._run_srcml, batch)))
+                if len(pending) > self._srcml_jobs:
+                    batch, srcml_future = pending.popleft()
+                    self._process_batch_results(batch, srcml_future.result())
+
+            while pending:
+                batch, srcml_future = pending.popleft()
+                self._process_batch_results(batch, srcml_future.result())
+
+    def _run_srcml(self, file_paths:[str]) -> dict:
+        # Only existing files are passed to srcml, so that a missing file is reported on its own
+        # without failing the srcml run for the rest of the batch.
+        # Files with cached results are not passed to srcml either.
+        start = time.perf_counter()
+        with self._tracer.span("srcml batch", "srcml", {"files": file_paths}) \
+             if self._tracer else NOT_TIMED:
+            srcml_results = self._srcml.get_srcml_batch(
+                [f for f in file_paths if Path(f).is_file() and not self._has_results(f)])
+        if self._file_timings:
+            # The run covers several files, possibly in another thread, so the time is only
+            # added to the totals.
+            self._file_timings.add_total('srcml', time.perf_counter() - start)
+        return srcml_results
+
+    def _has_results(self, file_path:str) -> bool:
+        if not self._result_cache:
+            return False
+        try:
+            with open(file_path, 'r', newline='') as file_stream:
+                return self._result_cache.has(self._result_cache.get_key(file_path,
+                                                                         file_stream.readlines()))
+        except (IOError, OSError):
+            return False
+
+    def _process_batch_results(self, file_paths:[str], srcml_results:dict):
+        for file_path in file_paths:
+            # A file left out of the srcml run because of cached results needs srcml after all
+            # if its results were evicted from the cache in the meantime.
+            self._process_file(file_path,
+                               lambda f=file_path: srcml_results[f] if f in srcml_results \
+                                                   else self._srcml.get_srcml(f))
+
+    def process_file(self, file_path:str):
         if Path(file_path).is_dir():
             return
 
+        if not self._rules.needs_srcml():
+            self._process_file(file_path, lambda: None)
+        elif self._is_streaming_srcml():
+            self._process_file(file_path, lambda: None, lambda: self._srcml.open_srcml(file_path))
+        else:
+            self._process_file(file_path, lambda: self._srcml.get_srcml(file_path))
+
+    def process_text(self, file_path:str, text:str, language:str = None):
+        """Checks text as the content of file_path, such as an editor buffer not yet saved.
+        file_path does not need to exist. Unless language is given, the extension of file_path
+        selects the srcml language."""
+
+        # Split the same way reading the file would.
+        lines = io.StringIO(text, newline='').readlines()
+        if not self._rules.needs_srcml():
+            self._process_file(file_path, lambda: None, lines=lines)
+        else:
+            self._process_file(file_path,
+                               lambda: self._srcml.get_srcml_text(text, file_path, language),
+                               lines=lines)
+
+    def _process_file(self, file_path:str, get_srcml, open_srcml = lambda: None,
+                      lines:[str] = None):
+        for recorder in self._stage_recorders:
+            recorder.start_file(file_path)
+        self._check_file(file_path, get_srcml, open_srcml, lines)
+        # Violations are written out once per file, rather than one at a time.
+        self._logger.flush_output()
+        if self._file_checked:
+            self._file_checked(file_path)
+        for recorder in self._stage_recorders:
+            recorder.end_file()
+
+    def _check_file(self, file_path:str, get_srcml, open_srcml, lines:[str] = None):
+        self._current_file = None
+
         try:
-            file_stream = open(file_path, 'r', newline='')
+            if lines is None:
+                with self._stage('read'):
+                    with open(file_path, 'r', newline='') as file_stream:
+                        lines = file_stream.readlines()
+            srcml_stream = None
             try:
                 self.print_verbose("Opened file for checking: " + file_path)
-                self._current_file = File(file_path,
-                                          file_stream.readlines(),
-                                          self._srcml.get_srcml(file_path))
+
+                result_key = None
+                if self._result_cache:
+                    result_key = self._result_cache.get_key(file_path, lines)
+                    with self._stage('rules'):
+                        replayed = self._result_cache.replay(result_key, file_path, lines)
+                    if replayed:
+                        self.print_verbose("Replayed cached results for: " + file_path)
+                        self._file_count += 1
+                        return
+
+                with self._stage('srcml'):
+                    srcml_stream = open_srcml()
+                    srcml_bytes = get_srcml()
+                # A streamed srcml output is parsed while the rules run, and timed as such.
+                with self._stage('parse'):
+                    self._current_file = File(file_path, lines, srcml_bytes, srcml_stream)
                 self._file_count += 1
-                self._rules.run_rules_on_file(self._current_file)
+
+                with self._stage('rules'):
+                    if result_key:
+                        self._result_cache.start_recording()
+                        completed = False
+                        try:
+                            self._rules.run_rules_on_file(self._current_file)
+                            completed = True
+                        finally:
+                            # Results of a file whose check did not complete are not cached.
+                            self._result_cache.stop_recording(result_key if completed else None)
+                    else:
+                        self._rules.run_rules_on_file(self._current_file)
             finally:
-                file_stream.close()
+                if srcml_stream:
+                    srcml_stream.close()
         except (IOError, OSError) as exc:
             self.log_file_exception("Could not open file! See stderr.", exc, file_path)
 
-
     def get_file_count(self) -> int:
         return self._file_count
 
+    def add_file_count(self, file_count:int):
+        """ Adds files checked elsewhere (such as by a worker process) to the file count. """
+        self._file_count += file_count
+
     def log_file_exception(self, msg:str, exc:Exception, file_name:str):
         """ Wrapper used to log issues when working with a file.
         """
@@ -2,10 +2,13 @@ from decimal import Decimal
 import hashlib
 import pathlib
 import string
+import sys
 import traceback
 import typing
 
 # Local imports
+from rulecheck.compiled_ignore import CompiledIgnoreList
+from rulecheck.intervals import LineIntervals
 from rulecheck.rule import LogType
 
 #pylint: disable=missing-function-docstring
@@ -30,69 +33,138 @@ def get_ignore_hash(file_name:str,
 
     return ignore_hash
 
+def read_ignore_list(ignore_list_file_handle:typing.TextIO, verbose:bool) -> dict:
+    """ Returns the entries of a (text) ignore list as lists of (rule name, hash, line number)
+        tuples, keyed by the posix form of their file name. """
+    file_ignores = {}
+
+    try:
+        for line in ignore_list_file_handle:
+            entry = IgnoreFileEntry(line)
+
+            if entry.is_valid():
+                file_name_posix = str(pathlib.Path(entry.get_file_name()).as_posix())
+                if file_name_posix not in file_ignores:
+                    file_ignores[file_name_posix] = []
+
+                # Hashes are compared in lower case, as a compiled ignore list stores them.
+                file_ignores[file_name_posix].append((entry.get_rule_name(),
+                                                      entry.get_hash().lower(),
+                                                      entry.get_line_num()))
+
+    except Exception as exc:  #pylint: disable=broad-except
+        print("Failure while checking ignore list. Run with verbose mode for more information.")
+        if verbose:
+            print("Exception on parsing ignore list: " + str(exc))
+            print(traceback.format_exc())
+
+    return file_ignores
+
 class IgnoreFilter:
     """ Used to filter log messages. """
-    def __init__(self, ignore_list_file_handle:typing.TextIO, verbose:bool):
-        self._ignore_list_file_handle = ignore_list_file_handle
+    def __init__(self, ignore_list_file_handle:typing.TextIO, verbose:bool,
+                 compiled_ignore_list:CompiledIgnoreList = None):
         self._rule_ignores = {}
         self._verbose = verbose
+        self._result_recorder = None
+        # Entries of the ignore list as (rule name, hash, line number) lists, keyed by the posix
+        # form of their file name. A text ignore list is only read once, here. A compiled ignore
+        # list provides the same get() method but only reads a file's entries when asked for them.
+        if compiled_ignore_list:
+            self._file_ignores = compiled_ignore_list
+        elif ignore_list_file_handle:
+            self._file_ignores = read_ignore_list(ignore_list_file_handle, verbose)
+        else:
+            self._file_ignores = {}
 
     def print_verbose(self, message:str):
         if self._verbose:
             print(message)
 
+    def close(self):
+        """ Closes the compiled ignore list the filter reads from, if any. The filter must not
+            be used afterwards. """
+        if isinstance(self._file_ignores, CompiledIgnoreList):
+            self._file_ignores.close()
+        self._file_ignores = {}
 
     def init_filter(self, file_name:str):
         self._rule_ignores.clear()
 
-        try:
-            if self._ignore_list_file_handle:
-                self._ignore_list_file_handle.seek(0)
-                for line in self._ignore_list_file_handle:
-                    entry = IgnoreFileEntry(line)
+        file_name_posix = str(pathlib.Path(file_name).as_posix())
+        for rule_name, line_hash, line_num in self._file_ignores.get(file_name_posix, []):
+            if rule_name not in self._rule_ignores:
+                self._rule_ignores[rule_name] = IgnoreIndex()
 
-                    if entry.is_valid() and \
-                       str( pathlib.Path(entry.get_file_name()).as_posix() ) == \
-                       str(pathlib.Path(file_name).as_posix()):
-                        rule_name = entry.get_rule_name()
-                        if rule_name not in self._rule_ignores:
-                            self._rule_ignores[rule_name] = []
+            # Fresh entries for every file, as entries are deactivated once used.
+            self._rule_ignores[rule_name].add(IgnoreEntry(line_hash, line_num, line_num))
 
-                        self._rule_ignores[rule_name].append(IgnoreEntry(entry.get_hash(),
-                                                                         entry.get_line_num(),
-                                                                         entry.get_line_num()))
-
-        except Exception as exc:  #pylint: disable=broad-except
-            print("Failure while checking ignore list. Run with verbose mode for more information.")
-            self.print_verbose("Exception on parsing ignore list: " + str(exc))
-            self.print_verbose(traceback.format_exc())
+    def set_result_recorder(self, result_recorder):
+        """ While set, every call to disable is also passed to result_recorder's
+            record_disable method. """
+        self._result_recorder = result_recorder
 
     def disable(self, rule_name:str, line_num:int):
+        if self._result_recorder:
+            self._result_recorder.record_disable(rule_name, line_num)
+
         if rule_name not in self._rule_ignores:
-            self._rule_ignores[rule_name] = []
+            self._rule_ignores[rule_name] = IgnoreIndex()
 
-        self._rule_ignores[rule_name].append(IgnoreEntry('*', line_num, line_num))
+        self._rule_ignores[rule_name].add(IgnoreEntry('*', line_num, line_num))
 
     def is_filtered(self, rule_name:str, line_num:int, line_hash:hashlib.md5) -> bool:
         """ Returns True if the violation should not be logged """
 
         if '*' in self._rule_ignores:
-            for ignore in self._rule_ignores['*']:
-                if ignore.is_active():
-                    if ignore.get_first() <= line_num <= ignore.get_last():
-                        if ignore.get_hash() == '*' or ignore.get_hash() == str(line_hash):
-                            ignore.mark_use()
-                            return True
+            if self._rule_ignores['*'].is_filtered(line_num, str(line_hash)):
+                return True
 
         if rule_name in self._rule_ignores:
-            for ignore in self._rule_ignores[rule_name]:
-                if ignore.is_active():
-                    if ignore.get_first() <= line_num <= ignore.get_last():
-                        if ignore.get_hash() == '*' or ignore.get_hash() == str(line_hash):
-                            ignore.mark_use()
-                            return True
+            if self._rule_ignores[rule_name].is_filtered(line_num, str(line_hash)):
+                return True
         return False
 
+class IgnoreIndex:
+    """ The IgnoreEntries of a single rule, indexed for lookup by line number and hash.
+
+        Entries with a specific hash are kept in lists keyed by that hash. Each is deactivated
+        once used, so they are checked one by one, in the order they were added. Entries with
+        the '*' hash are never deactivated and, for those, only whether any covers a line
+        matters. They are kept as integer LineIntervals.
+    """
+    def __init__(self):
+        self._hash_entries = {}
+        self._wildcard_lines = LineIntervals()
+
+    @staticmethod
+    def _to_int(value:Decimal) -> int:
+        if value.is_infinite():
+            return sys.maxsize if value > 0 else -sys.maxsize
+        return int(value)
+
+    def add(self, entry:'IgnoreEntry'):
+        if entry.get_hash() != '*':
+            if entry.get_hash() not in self._hash_entries:
+                self._hash_entries[entry.get_hash()] = []
+            self._hash_entries[entry.get_hash()].append(entry)
+            return
+
+        self._wildcard_lines.add(self._to_int(entry.get_first()),
+                                 self._to_int(entry.get_last()))
+
+    def is_filtered(self, line_num:int, line_hash:str) -> bool:
+        """ Returns True if an active entry covers line_num for line_hash. The entry used is
+            marked as such. """
+
+        for ignore in self._hash_entries.get(line_hash, []):
+            if ignore.is_active():
+                if ignore.get_first() <= line_num <= ignore.get_last():
+                    ignore.mark_use()
+                    return True
+
+        return self._wildcard_lines.contains(line_num)
+
 class IgnoreFileEntry:
     """ Parses a line (string) into the members of an ignore entry from an ignore file.
         Always check is_valid() before using any of the getters on the object.
@@ -0,0 +1,39 @@
+#################################################
+##
+## Line Intervals
+##
+#################################################
+
+import bisect
+
+#pylint: disable=missing-function-docstring
+
+class LineIntervals:
+    """ Intervals of line numbers, sorted by first line, along with the running maximum of their
+    last lines, so whether any interval covers a line can be checked with a binary search.
+    Intervals may overlap. """
+
+    def __init__(self):
+        self._firsts = []
+        self._lasts = []
+        self._max_lasts = []
+
+    def add(self, first:int, last:int):
+        # Intervals are usually added in increasing order, in which case they are appended.
+        index = bisect.bisect_right(self._firsts, first)
+        self._firsts.insert(index, first)
+        self._lasts.insert(index, last)
+        self._max_lasts.insert(index, last)
+        for i in range(index, len(self._max_lasts)):
+            if i > 0 and self._max_lasts[i - 1] > self._lasts[i]:
+                self._max_lasts[i] = self._max_lasts[i - 1]
+            else:
+                self._max_lasts[i] = self._lasts[i]
+
+    def contains(self, line_num:int) -> bool:
+        # Of the intervals starting at or before line_num, does any end at or after it?
+        index = bisect.bisect_right(self._firsts, line_num)
+        return index > 0 and self._max_lasts[index - 1] >= line_num
+
+    def get_intervals(self) -> [(int, int)]:
+        return list(zip(self._firsts, self._lasts))
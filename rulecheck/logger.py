@@ -1,4 +1,10 @@
+import json
+import pathlib
+import sys
+import typing
+
 # Local imports
+from rulecheck.diff import GitDiff
 from rulecheck.file import File
 from rulecheck.ignore import IgnoreFilter
 from rulecheck.ignore import get_ignore_hash
@@ -11,6 +17,208 @@ from rulecheck.rule import LogFilePosition
 
 
 
+class OutputWriter:
+    """ Buffers output lines and writes them to a stream in bulk.
+
+    Lines are joined and written once the buffered text reaches buffer_size characters or when
+    flush() is called. A buffer_size of 0 writes every line immediately. If no stream is given,
+    lines are written to whatever sys.stdout is at the time of writing.
+    """
+
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, stream:typing.TextIO = None, buffer_size:int = 0):
+        self._stream = stream
+        self._buffer_size = buffer_size
+        self._lines = []
+        self._buffered_size = 0
+
+    def write_line(self, line:str):
+        self._lines.append(line)
+        self._lines.append("\n")
+        self._buffered_size += len(line) + 1
+        if self._buffered_size >= self._buffer_size:
+            self.flush()
+
+    def write(self, text:str):
+        """ Writes text, which should consist of whole lines. """
+        if text:
+            self._lines.append(text)
+            self._buffered_size += len(text)
+            if self._buffered_size >= self._buffer_size:
+                self.flush()
+
+    def flush(self):
+        if self._lines:
+            stream = self._stream if self._stream else sys.stdout
+            stream.write("".join(self._lines))
+            self._lines.clear()
+            self._buffered_size = 0
+
+    def close(self):
+        """ Flushes and closes the stream, unless writing to sys.stdout. """
+        self.flush()
+        if self._stream:
+            self._stream.close()
+
+class Violation:
+    """ A rule violation as reported, after any promotion of warnings to errors.
+
+       Access the members directly: log_type, line, col, message (with tabs expanded),
+       file_name, rule_name and ignore_hash, the hash used to match the violation in ignore lists.
+       line and col are -1 if unknown or not applicable.
+    """
+    def __init__(self, log_type:LogType, pos:LogFilePosition, message:str, file_name:str,
+                 rule_name:str, ignore_hash:str):
+        self.log_type = log_type
+        self.line = pos.line
+        self.col = pos.col
+        self.message = message
+        self.file_name = file_name
+        self.rule_name = rule_name
+        self.ignore_hash = ignore_hash
+
+    def to_dict(self) -> dict:
+        """ Returns the violation as a dict of JSON types. Line and column are None if
+            unknown. """
+        return {"hash": self.ignore_hash,
+                "file": self.file_name,
+                "line": self.line if self.line > 0 else None,
+                "col": self.col if self.col > 0 else None,
+                "severity": self.log_type.name,
+                "rule": self.rule_name,
+                "message": self.message}
+
+    def __eq__(self, other):
+        return isinstance(other, Violation) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return "Violation(" + ", ".join(key + "=" + repr(value)
+                                        for key, value in vars(self).items()) + ")"
+
+class OutputSink:
+    """ Base class of the output formats. Writes each violation to an OutputWriter as it is
+        logged, so memory use does not grow with the number of violations. """
+
+    def __init__(self, output_writer:OutputWriter):
+        self._output_writer = output_writer
+
+    def set_show_hash(self, show_hash:bool):
+        """ Called with the show hash setting of the Logger. Formats that always include the
+            hash ignore it. """
+
+    def write_violation(self, violation:Violation):
+        raise NotImplementedError
+
+    def flush(self):
+        self._output_writer.flush()
+
+    def finish(self):
+        """ Completes the output and flushes it. """
+        self._output_writer.flush()
+
+class TextSink(OutputSink):
+    """ [hash of line: ]filename:[line:][col:] LogType: Rule Name: Log Message """
+
+    def __init__(self, output_writer:OutputWriter):
+        super().__init__(output_writer)
+        self._show_hash = False
+
+    def set_show_hash(self, show_hash:bool):
+        self._show_hash = show_hash
+
+    def write_violation(self, violation:Violation):
+        self._output_writer.write_line(TextSink.format_violation(violation, self._show_hash))
+
+    @staticmethod
+    def format_violation(violation:Violation, show_hash:bool) -> str:
+        """ Returns the line written for violation. """
+        log_msg = []
+        if show_hash:
+            log_msg.append(violation.ignore_hash + ": ")
+
+        log_msg.append(violation.file_name + ":")
+
+        if violation.line > 0:
+            log_msg.append(str(violation.line) + ":")
+        if violation.col > 0:
+            log_msg.append(str(violation.col) + ":")
+
+        log_msg.append(" " + violation.log_type.name + ": " + violation.rule_name + ": " +
+                       violation.message)
+        return "".join(log_msg)
+
+class JsonLinesSink(OutputSink):
+    """ One JSON object per violation and line. Line and column are null if unknown. """
+
+    def write_violation(self, violation:Violation):
+        self._output_writer.write_line(json.dumps(violation.to_dict()))
+
+class SarifSink(OutputSink):
+    """ A SARIF 2.1.0 log with a single run. Results are written as they are logged, the closing
+        brackets of the document when the sink is closed. """
+
+    SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+    def __init__(self, output_writer:OutputWriter, tool_version:str):
+        super().__init__(output_writer)
+        self._result_count = 0
+        self._output_writer.write(
+            '{"version": "2.1.0", "$schema": ' + json.dumps(SarifSink.SCHEMA) + ', "runs": [' +
+            '{"tool": {"driver": {"name": "rulecheck", "version": ' + json.dumps(tool_version) +
+            ', "informationUri": "https://github.com/e-shreve/rulecheck"}}, "results": [\n')
+
+    def write_violation(self, violation:Violation):
+        region = {}
+        if violation.line > 0:
+            region["startLine"] = violation.line
+            if violation.col > 0:
+                region["startColumn"] = violation.col
+        physical_location = {"artifactLocation":
+                             {"uri": str(pathlib.Path(violation.file_name).as_posix())}}
+        if region:
+            physical_location["region"] = region
+
+        result = json.dumps({
+            "ruleId": violation.rule_name,
+            "level": "error" if violation.log_type == LogType.ERROR else "warning",
+            "message": {"text": violation.message},
+            "locations": [{"physicalLocation": physical_location}],
+            "partialFingerprints": {"rulecheckIgnoreHash/v1": violation.ignore_hash}})
+
+        if self._result_count > 0:
+            self._output_writer.write(",\n")
+        self._output_writer.write(result)
+        self._result_count += 1
+
+    def finish(self):
+        self._output_writer.write("\n]}]}\n")
+        super().finish()
+
+class CollectingSink(OutputSink):
+    """ Keeps the violations written to it, rather than writing them out. """
+
+    def __init__(self):
+        super().__init__(OutputWriter())
+        self._violations = []
+
+    def write_violation(self, violation:Violation):
+        self._violations.append(violation)
+
+    def get_violations(self) -> [Violation]:
+        return self._violations
+
+OUTPUT_FORMATS = ['text', 'jsonl', 'sarif']
+
+def create_output_sink(output_format:str, output_writer:OutputWriter,
+                       tool_version:str) -> OutputSink:
+    """ Returns the sink for output_format, one of OUTPUT_FORMATS. """
+    if output_format == 'jsonl':
+        return JsonLinesSink(output_writer)
+    if output_format == 'sarif':
+        return SarifSink(output_writer, tool_version)
+    return TextSink(output_writer)
+
 class Logger:
     """ Class used to perform the logging.
 
@@ -30,6 +238,10 @@ class Logger:
         self._total_ignored_errors = 0
         self._current_file = None
         self._current_rule_name = "rulecheck"
+        self._result_recorder = None
+        self._output_sink = TextSink(OutputWriter())
+        self._file_timings = None
+        self._git_diff = None
 
     def set_verbose(self, verbose:bool):
         self._verbose = verbose
@@ -37,6 +249,31 @@ class Logger:
     def set_ignore_filter(self, ignore_filter:IgnoreFilter):
         self._ignore_filter = ignore_filter
 
+    def set_result_recorder(self, result_recorder):
+        """ While set, every violation logged is also passed to result_recorder's
+            record_violation method, before any filtering. """
+        self._result_recorder = result_recorder
+
+    def set_git_diff(self, git_diff:GitDiff):
+        """ While set, violations on lines git_diff does not report as changed are dropped
+            without being counted. Violations without a line are kept. """
+        self._git_diff = git_diff
+
+    def set_output_sink(self, output_sink:OutputSink):
+        self._output_sink = output_sink
+        self._output_sink.set_show_hash(self._show_hash)
+
+    def get_output_sink(self) -> OutputSink:
+        return self._output_sink
+
+    def flush_output(self):
+        self._output_sink.flush()
+
+    def set_file_timings(self, file_timings):
+        """ While set, the time spent computing hashes and filtering violations is recorded as
+            the 'ignore' stage of file_timings, a profiler.FileTimings. """
+        self._file_timings = file_timings
+
     def set_current_file(self, file:File):
         self._current_file = file
 
@@ -73,6 +310,7 @@ class Logger:
 
     def set_show_hash(self, show_hash:bool):
         self._show_hash = show_hash
+        self._output_sink.set_show_hash(show_hash)
 
     def _increment_warnings(self):
         if self.warnings_are_errors():
@@ -104,11 +342,25 @@ class Logger:
     def get_ignored_error_count(self) -> int:
         return self._total_ignored_errors
 
+    def get_counts(self) -> (int, int, int, int):
+        """ Returns the (warning, error, ignored warning, ignored error) counts. """
+        return (self._total_warnings, self._total_errors,
+                self._total_ignored_warnings, self._total_ignored_errors)
+
+    def add_counts(self, counts:(int, int, int, int)):
+        """ Adds counts, as returned by get_counts(), of violations logged elsewhere (such as
+            by a worker process.) """
+        self._total_warnings += counts[0]
+        self._total_errors += counts[1]
+        self._total_ignored_warnings += counts[2]
+        self._total_ignored_errors += counts[3]
+
     def log_violation(self, log_type:LogType, pos:LogFilePosition, msg:str,
                       include_indentation:bool, file_name:str, rule_name:str, source_lines:[str]):
         """Log function for violations
 
-        Each violation is logged as follows (with items in [] optional based on logging settings:
+        With the text output format, each violation is logged as follows (with items in []
+        optional based on logging settings:
         [hash of line]:filename:[line]:[col]:LogType:Rule Name:Log Message
 
         Each element is separated by a colon, ':'. If an optional part is not printed then the
@@ -123,6 +375,14 @@ class Logger:
 
         """
 
+        if self._result_recorder:
+            self._result_recorder.record_violation(log_type, pos, msg, include_indentation,
+                                                   file_name, rule_name)
+
+        if self._git_diff and pos.line > 0 and \
+           not self._git_diff.is_changed_line(file_name, pos.line):
+            return
+
         # Adjust log type if user specified all warnings to be errors
         # But keep original log type for use in hash.
         adjusted_log_type = log_type
@@ -130,33 +390,19 @@ class Logger:
         if log_type == LogType.WARNING and self.warnings_are_errors():
             adjusted_log_type = LogType.ERROR
 
-        log_msg = ""
-
-        # Use posix form for hash calculation for consistency across OSes.
-        line_text = None
-        if pos.line > 0 and pos.line < len(source_lines):
-            line_text = source_lines[pos.line-1]
-        log_hash = get_ignore_hash(file_name, line_text, include_indentation,
-                                   log_type.name, rule_name)
-
-        if not self._ignore_filter or not \
-           self._ignore_filter.is_filtered(rule_name, pos.line, log_hash):
-
-            if self.show_hash():
-                log_msg = log_msg + log_hash + ": "
-
-            log_msg = log_msg + file_name + ":"
-
-            if pos.line > 0:
-                log_msg = log_msg + str(pos.line) + ":"
-            if pos.col > 0:
-                log_msg = log_msg + str(pos.col) + ":"
+        if self._file_timings:
+            with self._file_timings.stage('ignore'):
+                log_hash, filtered = self._filter(log_type, pos, include_indentation, file_name,
+                                                  rule_name, source_lines)
+        else:
+            log_hash, filtered = self._filter(log_type, pos, include_indentation, file_name,
+                                              rule_name, source_lines)
 
-            log_msg = log_msg + " "
+        if not filtered:
 
-            log_msg = log_msg + adjusted_log_type.name + ": " + rule_name + ": " + \
-                      msg.expandtabs(self.get_tab_size())
-            print(log_msg)
+            self._output_sink.write_violation(Violation(adjusted_log_type, pos,
+                                                        msg.expandtabs(self.get_tab_size()),
+                                                        file_name, rule_name, log_hash))
 
             if adjusted_log_type == LogType.ERROR:
                 self._increment_errors()
@@ -168,6 +414,29 @@ class Logger:
             else:
                 self._increment_ignored_warnings()
 
+    def log_rule_violation(self, log_type:LogType, pos:LogFilePosition, msg:str,
+                           include_indentation:bool):
+        """ Logs a violation of the current rule in the current file, as log_violation_wrapper
+            does for the global LOGGER. Given to Rule.set_log_function to have a rule log to
+            this logger instead. """
+        self.log_violation(log_type, pos, msg, include_indentation,
+                           self._current_file.get_name(), self._current_rule_name,
+                           self._current_file.get_lines())
+
+    def _filter(self, log_type:LogType, pos:LogFilePosition, include_indentation:bool,
+                file_name:str, rule_name:str, source_lines:[str]) -> (str, bool):
+        """ Returns the ignore hash of the violation and whether the ignore filter filters it. """
+
+        # Use posix form for hash calculation for consistency across OSes.
+        line_text = None
+        if pos.line > 0 and pos.line < len(source_lines):
+            line_text = source_lines[pos.line-1]
+        log_hash = get_ignore_hash(file_name, line_text, include_indentation,
+                                   log_type.name, rule_name)
+
+        return log_hash, self._ignore_filter is not None and \
+                         self._ignore_filter.is_filtered(rule_name, pos.line, log_hash)
+
 LOGGER = Logger()
 
 def log_violation_wrapper(log_type:LogType, pos:LogFilePosition, msg:str,
@@ -183,7 +452,4 @@ def log_violation_wrapper(log_type:LogType, pos:LogFilePosition, msg:str,
 
     global LOGGER  #pylint: disable=global-statement
 
-    LOGGER.log_violation(log_type, pos, msg, include_indentation,
-                         LOGGER.get_current_file().get_name(),
-                         LOGGER.get_current_rule_name(),
-                         LOGGER.get_current_file().get_lines())
+    LOGGER.log_rule_violation(log_type, pos, msg, include_indentation)
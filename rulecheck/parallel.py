@@ -0,0 +1,115 @@
+#################################################
+##
+## Multi-process File Checking
+##
+#################################################
+
+import contextlib
+import io
+import multiprocessing
+import sys
+
+# Local imports
+from rulecheck.diff import GitDiff
+from rulecheck.file_manager import FileManager
+from rulecheck.logger import Logger
+from rulecheck.logger import CollectingSink
+from rulecheck.logger import OutputWriter
+from rulecheck.logger import TextSink
+from rulecheck.profiler import FileTimings
+from rulecheck.profiler import RuleProfiler
+from rulecheck.profiler import Tracer
+
+#pylint: disable=missing-function-docstring
+#pylint: disable=global-statement
+
+# Per worker process state, set by _init_worker.
+_WORKER_FILE_MANAGER = None
+_WORKER_LOGGER = None
+_WORKER_ARGS = None
+_WORKER_PROFILER = None
+_WORKER_FILE_TIMINGS = None
+_WORKER_TRACER = None
+
+def _init_worker(create_worker, args, git_diff:GitDiff = None):
+    """ Loads srcml settings, the ignore list and fresh instances of the rules in a worker, with
+        create_worker(args, git_diff). The changes of --diff-base are passed in, as read by the
+        main process. """
+    global _WORKER_FILE_MANAGER
+    global _WORKER_LOGGER
+    global _WORKER_ARGS
+    global _WORKER_PROFILER
+    global _WORKER_FILE_TIMINGS
+    global _WORKER_TRACER
+
+    # Anything printed while loading was already printed by the main process.
+    with contextlib.redirect_stdout(io.StringIO()):
+        _WORKER_FILE_MANAGER, _WORKER_LOGGER, _WORKER_PROFILER, _WORKER_FILE_TIMINGS, \
+            _WORKER_TRACER = create_worker(args, git_diff)
+    _WORKER_ARGS = args
+
+def _check_files(file_paths:[str]) -> dict:
+    """ Checks file_paths in a worker. Returns everything printed while doing so, the violations
+        logged if they are not printed as text, the number of files checked, the counts of
+        violations logged and the rule profile, file timing and trace events recorded. """
+
+    file_count = _WORKER_FILE_MANAGER.get_file_count()
+    counts = _WORKER_LOGGER.get_counts()
+
+    output = io.StringIO()
+    if _WORKER_ARGS.output or _WORKER_ARGS.format != 'text':
+        # Written by the main process through its output sink.
+        output_sink = CollectingSink()
+    else:
+        # Written to the redirected stdout, along with everything else printed.
+        output_sink = TextSink(OutputWriter(None, OutputWriter.DEFAULT_BUFFER_SIZE))
+    _WORKER_LOGGER.set_output_sink(output_sink)
+    with contextlib.redirect_stdout(output):
+        _WORKER_FILE_MANAGER.process_batch(file_paths)
+        _WORKER_LOGGER.flush_output()
+
+    return {
+        'output': output.getvalue(),
+        'violations': output_sink.get_violations() \
+                      if isinstance(output_sink, CollectingSink) else [],
+        'file_count': _WORKER_FILE_MANAGER.get_file_count() - file_count,
+        'counts': tuple(new - old for new, old in zip(_WORKER_LOGGER.get_counts(), counts)),
+        'rule_profile': _WORKER_PROFILER.pop_stats() if _WORKER_PROFILER else [],
+        'file_timings': _WORKER_FILE_TIMINGS.pop_stats() if _WORKER_FILE_TIMINGS else None,
+        'trace': _WORKER_TRACER.pop_events() if _WORKER_TRACER else None}
+
+def process_files_in_parallel(args, create_worker, file_manager:FileManager, logger:Logger,
+                              globs:[str], profiler:RuleProfiler = None,
+                              file_timings:FileTimings = None, tracer:Tracer = None,
+                              git_diff:GitDiff = None):
+    """ Checks the files found from globs using args.jobs worker processes.
+
+    Each worker loads the rules with create_worker(args, git_diff), a module level function
+    returning the worker's file manager, logger, rule profiler, file timings and tracer, the last
+    three being None if not used.
+
+    file_manager provides the files, in batches, and receives the count of files checked.
+    logger receives the counts of violations logged, profiler, file_timings and tracer, if given,
+    the rule profile and file timing stats and trace events. git_diff, if given, holds the changes
+    of --diff-base, passed on to the workers so they do not run git again. Output produced while
+    checking each batch is printed in the order the batches were provided, so it matches that of
+    a single process run.
+    """
+
+    if (globs is None) or len(globs) == 0:
+        return
+
+    with multiprocessing.Pool(args.jobs, initializer=_init_worker,
+                              initargs=(create_worker, args, git_diff)) as pool:
+        for result in pool.imap(_check_files, file_manager.get_batches(globs)):
+            sys.stdout.write(result['output'])
+            for violation in result['violations']:
+                logger.get_output_sink().write_violation(violation)
+            file_manager.add_file_count(result['file_count'])
+            logger.add_counts(result['counts'])
+            if profiler:
+                profiler.add_stats(result['rule_profile'])
+            if file_timings:
+                file_timings.add_stats(result['file_timings'])
+            if tracer:
+                tracer.add_events(result['trace'])
@@ -0,0 +1,327 @@
+#################################################
+##
+## Profiling
+##
+#################################################
+
+import contextlib
+import heapq
+import json
+import os
+import threading
+import time
+
+#pylint: disable=missing-function-docstring
+
+# Reusable context manager doing nothing, used in place of a span or stage when not profiling.
+NOT_TIMED = contextlib.suppress()
+
+class RuleProfiler:
+    """ Records the wall time spent in, and the number of calls to, each visitor method of each
+    rule.
+
+    The RuleManager wraps the visitor methods with wrap() when it builds its dispatch tables, and
+    only does so when a profiler is set, so rules run unwrapped when not profiling.
+    """
+
+    def __init__(self):
+        # (rule name, method name) -> [calls, seconds]
+        self._stats = {}
+
+    def wrap(self, rule_name:str, method_name:str, meth):
+        """ Returns a function calling meth and recording the call under rule_name and
+            method_name. """
+        stat = self._stats.setdefault((rule_name, method_name), [0, 0.0])
+        perf_counter = time.perf_counter
+
+        def timed(pos, arg):
+            start = perf_counter()
+            try:
+                return meth(pos, arg)
+            finally:
+                stat[0] += 1
+                stat[1] += perf_counter() - start
+
+        return timed
+
+    def pop_stats(self) -> list:
+        """ Returns the stats recorded since the last call, as [rule name, method name, calls,
+            seconds] lists, and restarts recording from zero. """
+        stats = []
+        for (rule_name, method_name), stat in self._stats.items():
+            if stat[0]:
+                stats.append([rule_name, method_name, stat[0], stat[1]])
+                # Reset in place, the wrappers hold on to the lists.
+                stat[0] = 0
+                stat[1] = 0.0
+        return stats
+
+    def add_stats(self, stats:list):
+        """ Adds stats, as returned by pop_stats(), recorded elsewhere (such as by a worker
+            process.) """
+        for rule_name, method_name, calls, seconds in stats:
+            stat = self._stats.setdefault((rule_name, method_name), [0, 0.0])
+            stat[0] += calls
+            stat[1] += seconds
+
+    def get_report(self) -> list:
+        """ Returns a dict per rule, slowest rule first, with its total calls and seconds and
+            the same for each of its visitor methods, slowest first. """
+        rules = {}
+        for (rule_name, method_name), (calls, seconds) in self._stats.items():
+            if not calls:
+                continue
+            rule = rules.setdefault(rule_name, {"rule": rule_name, "calls": 0, "seconds": 0.0,
+                                                "visitors": []})
+            rule["calls"] += calls
+            rule["seconds"] += seconds
+            rule["visitors"].append({"visitor": method_name, "calls": calls, "seconds": seconds})
+
+        report = sorted(rules.values(), key=lambda rule: rule["seconds"], reverse=True)
+        for rule in report:
+            rule["visitors"].sort(key=lambda visitor: visitor["seconds"], reverse=True)
+        return report
+
+    def print_report(self):
+        print("Rule profile (seconds, calls, visitor):")
+        for rule in self.get_report():
+            print("{:10.3f} {:>10} {}".format(rule["seconds"], rule["calls"], rule["rule"]))
+            for visitor in rule["visitors"]:
+                print("{:10.3f} {:>10}   {}".format(visitor["seconds"], visitor["calls"],
+                                                    visitor["visitor"]))
+
+    def write_report(self, file_name:str):
+        with open(file_name, "w") as file_stream:
+            json.dump(self.get_report(), file_stream, indent=2)
+
+class FileTimings:
+    """ Records the wall time spent in each stage of checking each file and keeps the top_count
+    slowest files.
+
+    Stages are timed with the stage() context manager. Stages may be nested, the time of a
+    nested stage is then only counted for the nested stage (ignore filtering happens while the
+    rules run, for example.) Time can also be added to the totals only, for work not done for a
+    single file, such as a srcml run on a batch of files.
+    """
+
+    STAGES = ('read', 'srcml', 'parse', 'rules', 'ignore')
+
+    def __init__(self, top_count:int):
+        self._top_count = top_count
+        self._totals = dict.fromkeys(FileTimings.STAGES, 0.0)
+        self._lock = threading.Lock()
+        # Min heap of (total seconds, sequence number, file name, stage seconds)
+        self._slowest = []
+        self._sequence = 0
+        self._file_name = None
+        self._file_stages = None
+        self._stack = []
+
+    def start_file(self, file_name:str):
+        self._file_name = file_name
+        self._file_stages = dict.fromkeys(FileTimings.STAGES, 0.0)
+
+    def end_file(self):
+        if self._file_name is not None:
+            self._add_file(self._file_name, self._file_stages)
+            self._file_name = None
+            self._file_stages = None
+
+    def _add_file(self, file_name:str, stages:dict):
+        self._sequence += 1
+        entry = (sum(stages.values()), self._sequence, file_name, stages)
+        if len(self._slowest) < self._top_count:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @contextlib.contextmanager
+    def stage(self, stage:str):
+        # [start, seconds spent in nested stages]
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            exclusive = elapsed - frame[1]
+            if self._file_stages is not None:
+                self._file_stages[stage] += exclusive
+            self.add_total(stage, exclusive)
+
+    def add_total(self, stage:str, seconds:float):
+        # Also called from srcml threads.
+        with self._lock:
+            self._totals[stage] += seconds
+
+    def pop_stats(self) -> dict:
+        """ Returns the totals and slowest files recorded since the last call and restarts
+            recording from zero. """
+        with self._lock:
+            stats = {'totals': self._totals,
+                     'files': [(file_name, stages) for _, _, file_name, stages in self._slowest]}
+            self._totals = dict.fromkeys(FileTimings.STAGES, 0.0)
+        self._slowest = []
+        return stats
+
+    def add_stats(self, stats:dict):
+        """ Adds stats, as returned by pop_stats(), recorded elsewhere (such as by a worker
+            process.) """
+        for stage, seconds in stats['totals'].items():
+            self.add_total(stage, seconds)
+        for file_name, stages in stats['files']:
+            self._add_file(file_name, stages)
+
+    def get_totals(self) -> dict:
+        return dict(self._totals)
+
+    def get_slowest(self) -> list:
+        """ Returns (file name, stage seconds) of the slowest files, slowest first. """
+        return [(file_name, stages) for _, _, file_name, stages in
+                sorted(self._slowest, reverse=True)]
+
+    def print_report(self):
+        header = "".join("{:>10}".format(stage) for stage in FileTimings.STAGES)
+        print("Timing report (seconds):")
+        print("{:>10}".format("total") + header)
+        totals = self.get_totals()
+        print("{:10.3f}".format(sum(totals.values())) +
+              "".join("{:10.3f}".format(totals[stage]) for stage in FileTimings.STAGES))
+        print("Slowest " + str(len(self._slowest)) + " files:")
+        for file_name, stages in self.get_slowest():
+            print("{:10.3f}".format(sum(stages.values())) +
+                  "".join("{:10.3f}".format(stages[stage]) for stage in FileTimings.STAGES) +
+                  "  " + file_name)
+
+class Tracer:
+    """ Records spans of time as Chrome trace events, which can be viewed with chrome://tracing
+    or Perfetto.
+
+    Each span is recorded with the process and thread it ran on, so every worker process and
+    srcml thread gets its own track. Timestamps come from time.perf_counter, which is system
+    wide on the supported platforms, so spans of different processes line up.
+
+    The visitor methods of the rules are wrapped with wrap(), as RuleProfiler does. Their calls
+    are interleaved element by element, so rather than a span per call, the time each rule spent
+    on a file is recorded as one span per rule, with the calls and time of each of its visitors.
+    These spans are laid end to end from the start of running the rules on the file.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._thread_names = {}
+        self._file_name = None
+        self._file_start = None
+        # (rule name, method name) -> [calls, seconds] for the current file
+        self._visitor_stats = {}
+        self._rules_start = None
+
+    @staticmethod
+    def _now() -> float:
+        return time.perf_counter() * 1000000
+
+    def _add_span(self, name:str, category:str, start:float, args:dict, duration:float = None):
+        thread = threading.current_thread()
+        pid = os.getpid()
+        self._thread_names[(pid, thread.ident)] = thread.name
+        if duration is None:
+            duration = self._now() - start
+        event = {"name": name, "cat": category, "ph": "X", "ts": start,
+                 "dur": duration, "pid": pid, "tid": thread.ident}
+        if args:
+            event["args"] = args
+        # list.append is atomic, so spans may be added from several threads.
+        self._events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name:str, category:str = "rulecheck", args:dict = None):
+        start = self._now()
+        try:
+            yield
+        finally:
+            self._add_span(name, category, start, args)
+
+    def start_file(self, file_name:str):
+        self._file_name = file_name
+        self._file_start = self._now()
+
+    def end_file(self):
+        if self._file_name is not None:
+            self._add_span(self._file_name, "file", self._file_start, None)
+            self._file_name = None
+
+    def stage(self, stage:str):
+        """ Span of a stage of checking the current file, see FileTimings. """
+        return self.span(stage, "stage", {"file": self._file_name})
+
+    def wrap(self, rule_name:str, method_name:str, meth):
+        """ Returns a function calling meth and recording the call under rule_name and
+            method_name for the spans added by end_rules(). """
+        stat = self._visitor_stats.setdefault((rule_name, method_name), [0, 0.0])
+        perf_counter = time.perf_counter
+
+        def timed(pos, arg):
+            start = perf_counter()
+            try:
+                return meth(pos, arg)
+            finally:
+                stat[0] += 1
+                stat[1] += perf_counter() - start
+
+        return timed
+
+    def start_rules(self):
+        self._rules_start = self._now()
+
+    def end_rules(self):
+        """ Adds a span per rule called since start_rules(), slowest first, for the current
+            file. """
+        rules = {}
+        for (rule_name, method_name), stat in self._visitor_stats.items():
+            if stat[0]:
+                rule = rules.setdefault(rule_name, {"file": self._file_name, "calls": 0,
+                                                    "seconds": 0.0, "visitors": {}})
+                rule["calls"] += stat[0]
+                rule["seconds"] += stat[1]
+                rule["visitors"][method_name] = {"calls": stat[0], "seconds": stat[1]}
+                # Reset in place, the wrappers hold on to the lists.
+                stat[0] = 0
+                stat[1] = 0.0
+
+        start = self._rules_start
+        for rule_name, rule in sorted(rules.items(), key=lambda item: item[1]["seconds"],
+                                      reverse=True):
+            duration = rule["seconds"] * 1000000
+            self._add_span(rule_name, "rule", start, rule, duration)
+            start += duration
+
+    def pop_events(self) -> dict:
+        """ Returns the events recorded since the last call and forgets them. """
+        events = {'events': self._events, 'thread_names': list(self._thread_names.items())}
+        self._events = []
+        return events
+
+    def add_events(self, events:dict):
+        """ Adds events, as returned by pop_events(), recorded elsewhere (such as by a worker
+            process.) """
+        self._events.extend(events['events'])
+        self._thread_names.update(dict((tuple(key), name)
+                                       for key, name in events['thread_names']))
+
+    def write(self, file_name:str):
+        main_pid = os.getpid()
+        metadata = []
+        for pid in sorted({pid for pid, _ in self._thread_names}):
+            metadata.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                             "args": {"name": "rulecheck" if pid == main_pid else
+                                              "rulecheck worker " + str(pid)}})
+        for (pid, tid), name in self._thread_names.items():
+            metadata.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                             "args": {"name": name}})
+
+        with open(file_name, "w") as file_stream:
+            json.dump({"traceEvents": metadata + self._events, "displayTimeUnit": "ms"},
+                      file_stream)
@@ -0,0 +1,95 @@
+#################################################
+##
+## Cache of Rule Results
+##
+#################################################
+
+import json
+
+# Local imports
+from rulecheck.cache import DiskCache
+from rulecheck.cache import get_cache_key
+from rulecheck.ignore import IgnoreFilter
+from rulecheck.logger import Logger
+from rulecheck.rule import LogType
+from rulecheck.rule import LogFilePosition
+
+#pylint: disable=missing-function-docstring
+#pylint: disable=too-many-arguments
+
+class ResultCache:
+    """ Caches what the rules did for each checked file so unchanged files need not be checked.
+
+    While the rules run on a file, every violation logged and every rule disabled by a NORC
+    comment is recorded, in order. Replaying a file feeds the same calls to the Logger and
+    IgnoreFilter again, so the ignore list and options in effect for the current run (werror,
+    hashes, etc.) are applied to the cached violations. Output rules print directly, rather than
+    log, is not cached.
+
+    Entries are keyed by the file's name and content and by an identity string which must
+    capture everything else the results depend on: the rulecheck version, the rules loaded
+    with their settings and source, and the srcml settings.
+    """
+
+    def __init__(self, disk_cache:DiskCache, identity:str, logger:Logger,
+                 ignore_filter:IgnoreFilter):
+        self._disk_cache = disk_cache
+        self._identity = identity
+        self._logger = logger
+        self._ignore_filter = ignore_filter
+        self._events = None
+
+    def get_key(self, file_name:str, lines:[str]) -> str:
+        return get_cache_key("".join(lines), file_name, self._identity)
+
+    def has(self, key:str) -> bool:
+        return self._disk_cache.contains(key)
+
+    def replay(self, key:str, file_name:str, lines:[str]) -> bool:
+        """ Replays the cached results for key. Returns False if there are none. """
+
+        cached = self._disk_cache.get(key)
+        if cached is None:
+            return False
+
+        try:
+            events = json.loads(cached.decode('utf-8'))
+        except ValueError:
+            return False
+
+        self._ignore_filter.init_filter(file_name)
+
+        for event in events:
+            if event[0] == 'disable':
+                self._ignore_filter.disable(event[1], event[2])
+            else:
+                _, log_type_name, line, col, msg, include_indentation, \
+                    logged_file_name, rule_name = event
+                self._logger.log_violation(LogType[log_type_name], LogFilePosition(line, col),
+                                           msg, include_indentation, logged_file_name, rule_name,
+                                           lines)
+
+        return True
+
+    def start_recording(self):
+        self._events = []
+        self._logger.set_result_recorder(self)
+        self._ignore_filter.set_result_recorder(self)
+
+    def stop_recording(self, key:str):
+        """ Stops recording and stores what was recorded under key. If key is None, what was
+            recorded is discarded. """
+
+        self._logger.set_result_recorder(None)
+        self._ignore_filter.set_result_recorder(None)
+        if key:
+            self._disk_cache.put(key, json.dumps(self._events).encode('utf-8'))
+        self._events = None
+
+    def record_violation(self, log_type:LogType, pos:LogFilePosition, msg:str,
+                         include_indentation:bool, file_name:str, rule_name:str):
+        self._events.append(['violation', log_type.name, pos.line, pos.col, msg,
+                             include_indentation, file_name, rule_name])
+
+    def record_disable(self, rule_name:str, line_num:int):
+        self._events.append(['disable', rule_name, line_num])
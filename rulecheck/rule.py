@@ -81,6 +81,27 @@ class Rule:
         """
         return False
 
+    def needs_full_tree(self) -> bool:  #pylint: disable=no-self-use
+        """ Override to return True if the rule's visit_xml_* methods need the complete srcml
+            tree, such as the children or siblings of the element visited.
+
+            When rulecheck streams the srcml output (--srcml-stream), visitors are called while
+            srcml is still being parsed and elements are discarded once visited. A start visitor
+            can then only rely on the tag and attributes of the element and an end visitor on its
+            text. If any loaded rule returns True, rulecheck parses the complete tree instead.
+        """
+        return False
+
+    def is_cacheable(self) -> bool:  #pylint: disable=no-self-use
+        """ Override to return True if the violations the rule logs for a file depend only on
+            that file's name and content (and the rule's settings and source code.)
+
+            Rule instances are kept for the whole run, so a rule could carry state from one file
+            to the next. The result cache (--result-cache) is only used when every loaded rule
+            declares itself cacheable.
+        """
+        return False
+
     def is_active(self) -> bool:
         """ Returns true if the rule is active and will, therefore, have its visitors called. """
         return self._is_active
@@ -117,6 +138,13 @@ class Rule:
         """
         Rule.__log_function = log_function
 
+    def set_log_function(self, log_function):
+        """ Changes the logger function backing the log method of this rule only, overriding the
+            one set by set_logger. Rulecheck will call this method to have the rule log to the
+            logger of the rule manager loading it.
+        """
+        self.__log_function = log_function
+
     def log(self, log_type:LogType, pos:LogFilePosition, message:str):
         """ Log a rule violation (Error or Warning). The system will automatically format
             the output to fit a standard including the name of the file currently being parsed
@@ -126,6 +154,6 @@ class Rule:
         if self._werror:
             log_type = LogType.ERROR
 
-        if callable(Rule.__log_function):
+        if callable(self.__log_function):
             # Note: pylint disabled due to bug: https://github.com/PyCQA/pylint/issues/1493
-            Rule.__log_function(log_type, pos, message, self.is_indentation_sensitive())  #pylint: disable=not-callable
+            self.__log_function(log_type, pos, message, self.is_indentation_sensitive())  #pylint: disable=not-callable
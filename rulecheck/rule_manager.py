@@ -1,6 +1,6 @@
 
 import copy
-
+import hashlib
 import json
 import os
 import pathlib
@@ -17,6 +17,9 @@ from rulecheck.file import File
 from rulecheck.srcml import Srcml
 from rulecheck.ignore import IgnoreFilter
 from rulecheck.logger import Logger
+from rulecheck.profiler import NOT_TIMED
+from rulecheck.profiler import RuleProfiler
+from rulecheck.profiler import Tracer
 from rulecheck.rule import Rule
 from rulecheck.rule import LogType
 from rulecheck.rule import LogFilePosition
@@ -27,8 +30,16 @@ from rulecheck.rule import LogFilePosition
 
 class RuleManager:
 
+    _XML_VISITOR_RE = re.compile('visit_xml_(.+)_(start|end)')
+
     def __init__(self, logger:Logger, ignore_filter:IgnoreFilter, verbose:bool):
         self._rules_dict = {}
+        self._file_dispatch = None
+        self._xml_dispatch = None
+        self._xml_fallback_dispatch = None
+        self._tag_names = {}
+        self._profiler = None
+        self._tracer = None
         self._current_rule_name = "rulecheck"
         self._verbose = verbose
         self._logger_ref = logger
@@ -41,6 +52,22 @@ class RuleManager:
     def enable_verbose(self):
         self._verbose = True
 
+    def set_tracer(self, tracer:Tracer):
+        """Records spans for loading config files and rules, for the phases of running the
+        rules on a file and for the time each rule spent on the file, with tracer."""
+        self._tracer = tracer
+        self._xml_dispatch = None
+
+    def _span(self, name:str, category:str):
+        if self._tracer:
+            return self._tracer.span(name, category)
+        return NOT_TIMED
+
+    def set_profiler(self, profiler:RuleProfiler):
+        """Records the time spent in each visitor method of each rule with profiler."""
+        self._profiler = profiler
+        self._xml_dispatch = None
+
     def _add_rule_paths(self, rule_paths):
         if rule_paths:
             print (rule_paths)
@@ -66,14 +93,17 @@ class RuleManager:
                 # The class name must be the same as the last part of the module name
                 rule_class_name = rule_full_name.rpartition(".")[-1]
 
-                if rule['name'] not in sys.modules:
-                    __import__(rule_full_name)
+                with self._span(rule_full_name, "load rule"):
+                    if rule['name'] not in sys.modules:
+                        __import__(rule_full_name)
 
-                settings = {}
-                if 'settings' in rule:
-                    settings = rule['settings']
+                    settings = {}
+                    if 'settings' in rule:
+                        settings = rule['settings']
 
-                rule_object = getattr(sys.modules[rule_full_name], rule_class_name)(settings)
+                    rule_object = getattr(sys.modules[rule_full_name], rule_class_name)(settings)
+                    if self._logger_ref:
+                        rule_object.set_log_function(self._logger_ref.log_rule_violation)
 
                 identical_rule_exists = False
 
@@ -110,13 +140,16 @@ class RuleManager:
         """Loads all rules specified in the json configuration files."""
 
         self._add_rule_paths(rule_paths)
+        # Dispatch tables are rebuilt on first use with the newly loaded rules.
+        self._xml_dispatch = None
 
         for config_file in config_files:
             try:
-                with open(config_file) as file_stream:
-                    rule_set = json.load(file_stream)
+                with self._span(config_file, "load config"):
+                    with open(config_file) as file_stream:
+                        rule_set = json.load(file_stream)
 
-                rules_loaded, rules_skipped = self._load_rule_set(rule_set)
+                    rules_loaded, rules_skipped = self._load_rule_set(rule_set)
 
                 seperator = '\n  '
                 if rules_loaded:
@@ -144,71 +177,116 @@ class RuleManager:
                     self.log_rule_exception("Exception thrown while activating rule. \
                                              See stderr.", exc, name)
 
-    def visit_file_open_all_active_rules(self, file_name:str):
+    def _get_visitors(self, method_name:str):
+        """Returns [(rule name, rule, method)] for every loaded rule providing method_name,
+        in rule load order."""
+
+        visitors = []
         for name, rule_array in self._rules_dict.items():
-            self._set_current_rule_name(name)
             for rule in rule_array:
-                try:
-                    if rule.is_active():
-                        self.visit_file_open(rule, file_name)
-                except Exception as exc:  #pylint: disable=broad-except
-                    self.log_rule_exception("Exception thrown while calling is_active(). \
-                                             See stderr.", exc, name)
+                meth = getattr(rule, method_name, None)
+                if meth is not None:
+                    visitors.append((name, rule, meth))
+        return visitors
+
+    def _build_dispatch_tables(self):
+        """Builds the tables mapping each visitor to the rules providing it.
+
+        File visitors are keyed by method name. XML visitors are keyed by (tag name, event) and
+        hold, for each rule, either its visit_xml_<tag>_<event> method or, if the rule does not
+        have one, its visit_any_other_xml_element_<event> method. Tags for which no rule has a
+        specific visitor share the visit_any_other_xml_element_<event> lists.
+        """
 
-    def visit_file_open(self, rule:Rule, file_name:str):
-        """Calls visit_file_open(pos, file_name) on any rule providing that method."""
+        self._file_dispatch = {}
+        for method_name in ('visit_file_open', 'visit_file_line', 'visit_file_close'):
+            self._file_dispatch[method_name] = self._get_visitors(method_name)
 
-        meth = getattr(rule, 'visit_file_open', None)
-        if meth is not None:
-            try:
-                meth(LogFilePosition(-1, -1), file_name)
-            except Exception as exc:  #pylint: disable=broad-except
-                self.log_rule_exception("Exception thrown while calling visit_file_open. \
-                                         See stderr.", exc, self._current_rule_name)
+        self._xml_fallback_dispatch = {}
+        for event in ('start', 'end'):
+            self._xml_fallback_dispatch[event] = [
+                (name, rule, meth, 'visit_any_other_xml_element_' + event)
+                for name, rule, meth in self._get_visitors('visit_any_other_xml_element_' + event)]
 
-    def visit_file_close_all_active_rules(self, file_name:str):
+        self._xml_dispatch = {}
+        for rule_array in self._rules_dict.values():
+            for rule in rule_array:
+                for attr in dir(rule):
+                    match = RuleManager._XML_VISITOR_RE.fullmatch(attr)
+                    if match and (match.group(1), match.group(2)) not in self._xml_dispatch:
+                        self._xml_dispatch[(match.group(1), match.group(2))] = \
+                            self._get_xml_visitors(match.group(1), match.group(2))
+
+        # Wrapping the methods in the tables keeps the cost of profiling and tracing out of runs
+        # that do neither.
+        for timer in (self._profiler, self._tracer):
+            if timer is None:
+                continue
+            for method_name, visitors in self._file_dispatch.items():
+                self._file_dispatch[method_name] = [
+                    (name, rule, timer.wrap(name, method_name, meth))
+                    for name, rule, meth in visitors]
+            for tables in (self._xml_fallback_dispatch, self._xml_dispatch):
+                for key, visitors in tables.items():
+                    tables[key] = [
+                        (name, rule, timer.wrap(name, meth_name, meth), meth_name)
+                        for name, rule, meth, meth_name in visitors]
+
+    def _get_xml_visitors(self, tag_name:str, event:str):
+        # Note: parsing xml, the visit methods must be named
+        # visit_xml_nodename_start|end.
+        # The use of xml_ at the start avoids collisions with visit_file_open and
+        # visit_file_line should a <file_open>, <file_close> or <file_line> tag be
+        # encountered. Since the XML standard does not allow nodenames to start
+        # with 'xml' we also don't have to be concerned with a collision between
+        # <xml_name> and <name> since the former is not allowed.
+        # Location of 'xml' in the fallback name is different to avoid problems if the
+        # xml document has an <any_other_xml_element> tag.
+        visitors = []
         for name, rule_array in self._rules_dict.items():
-            self._set_current_rule_name(name)
             for rule in rule_array:
-                try:
-                    if rule.is_active():
-                        self.visit_file_close(rule, file_name)
-                except Exception as exc:  #pylint: disable=broad-except
-                    self.log_rule_exception("Exception thrown while calling is_active(). \
-                                             See stderr.", exc, name)
-
-    def visit_file_close(self, rule:Rule, file_name:str):
-        """Calls visit_file_close(pos, file_name) on any rule providing that method."""
-
-        meth = getattr(rule, 'visit_file_close', None)
-        if meth is not None:
+                meth_name = 'visit_xml_' + tag_name + '_' + event
+                meth = getattr(rule, meth_name, None)
+                if meth is None:
+                    meth_name = 'visit_any_other_xml_element_' + event
+                    meth = getattr(rule, meth_name, None)
+                if meth is not None:
+                    visitors.append((name, rule, meth, meth_name))
+        return visitors
+
+    def _get_dispatch_tables(self):
+        if self._xml_dispatch is None:
+            self._build_dispatch_tables()
+        return self._file_dispatch, self._xml_dispatch, self._xml_fallback_dispatch
+
+    def _visit_file_all_active_rules(self, method_name:str, pos:LogFilePosition, arg:str):
+        file_dispatch, _, _ = self._get_dispatch_tables()
+
+        for name, rule, meth in file_dispatch[method_name]:
+            if name != self._current_rule_name:
+                self._set_current_rule_name(name)
             try:
-                meth(LogFilePosition(-1, -1), file_name)
+                if rule.is_active():
+                    try:
+                        meth(copy.copy(pos), arg)
+                    except Exception as exc:  #pylint: disable=broad-except
+                        self.log_rule_exception("Exception thrown while calling " + method_name +
+                                                ". See stderr.", exc, name)
             except Exception as exc:  #pylint: disable=broad-except
-                self.log_rule_exception("Exception thrown while calling visit_file_close. \
-                                         See stderr.", exc, self._current_rule_name)
+                self.log_rule_exception("Exception thrown while calling is_active(). \
+                                         See stderr.", exc, name)
 
-    def visit_file_line_all_active_rules(self, line_num:int, line:str):
-        for name, rule_array in self._rules_dict.items():
-            self._set_current_rule_name(name)
-            for rule in rule_array:
-                try:
-                    if rule.is_active():
-                        self.visit_file_line(rule, line_num, line)
-                except Exception as exc:  #pylint: disable=broad-except
-                    self.log_rule_exception("Exception thrown while calling is_active(). \
-                                             See stderr.", exc, name)
+    def visit_file_open_all_active_rules(self, file_name:str):
+        """Calls visit_file_open(pos, file_name) on any active rule providing that method."""
+        self._visit_file_all_active_rules('visit_file_open', LogFilePosition(-1, -1), file_name)
 
-    def visit_file_line(self, rule:Rule, line_num:int, line:str):
-        """Calls visit_file_line(pos, line) on any rule providing that method."""
+    def visit_file_close_all_active_rules(self, file_name:str):
+        """Calls visit_file_close(pos, file_name) on any active rule providing that method."""
+        self._visit_file_all_active_rules('visit_file_close', LogFilePosition(-1, -1), file_name)
 
-        try:
-            meth = getattr(rule, 'visit_file_line', None)
-            if meth is not None:
-                meth(LogFilePosition(line_num, -1), line)
-        except Exception as exc:  #pylint: disable=broad-except
-            self.log_rule_exception("Exception thrown while calling visit_file_line. See stderr.",
-                exc, self._current_rule_name)
+    def visit_file_line_all_active_rules(self, line_num:int, line:str):
+        """Calls visit_file_line(pos, line) on any active rule providing that method."""
+        self._visit_file_all_active_rules('visit_file_line', LogFilePosition(line_num, -1), line)
 
     def check_for_rule_disable(self, line_num:int, line:str):
         match = re.search(r'(NORCNEXTLINE|NORC)\(([^)]+)', line)
@@ -239,70 +317,113 @@ class RuleManager:
         return re.sub('{.*}', '', full_tag_name)
 
     def visit_xml_all_active_rules(self, pos:LogFilePosition, node: ET.Element, event):
-        tag_name = RuleManager.strip_namespace(node.tag)
-
-        for name, rule_array in self._rules_dict.items():
-            self._set_current_rule_name(name)
-            for rule in rule_array:
-                try:
-                    if rule.is_active():
-                        self.visit_xml(rule, pos, node, tag_name, event)
-                except Exception as exc:  #pylint: disable=broad-except
-                    self.log_rule_exception("Exception thrown while calling is_active(). \
-                                             See stderr.", exc, name)
-
-    def visit_xml(self, rule:Rule, pos:LogFilePosition, node: ET.Element, tag_name:str, event):
-        # First look for visit methods that include the tag name
-        # Note: parsing xml, the visit methods must be named
-        # visit_xml_nodename_start|end.
-        # The use of xml_ at the start avoids collisions with visit_file_open and
-        # visit_file_line should a <file_open>, <file_close> or <file_line> tag be
-        # encountered. Since the XML standard does not allow nodenames to start
-        # with 'xml' we also don't have to be concerned with a collision between
-        # <xml_name> and <name> since the former is not allowed.
-        meth = getattr(rule, 'visit_xml_'+tag_name+'_'+event, None)
-        if meth is not None:
+        """Calls visit_xml_<tag>_<event>(pos, node), or if not provided,
+        visit_any_other_xml_element_<event>(pos, node) on every active rule providing either."""
+
+        tag_name = self._tag_names.get(node.tag)
+        if tag_name is None:
+            tag_name = RuleManager.strip_namespace(node.tag)
+            self._tag_names[node.tag] = tag_name
+
+        _, xml_dispatch, xml_fallback_dispatch = self._get_dispatch_tables()
+        visitors = xml_dispatch.get((tag_name, event))
+        if visitors is None:
+            visitors = xml_fallback_dispatch[event]
+
+        for name, rule, meth, meth_name in visitors:
+            if name != self._current_rule_name:
+                self._set_current_rule_name(name)
             try:
-                meth(copy.copy(pos), node)
+                if rule.is_active():
+                    try:
+                        meth(copy.copy(pos), node)
+                    except Exception as exc:  #pylint: disable=broad-except
+                        self.log_rule_exception("Exception thrown while calling " + meth_name +
+                                                ". See stderr.", exc, name)
             except Exception as exc:  #pylint: disable=broad-except
-                self.log_rule_exception("Exception thrown while calling " + \
-                                   'visit_xml_' + tag_name + '_' + \
-                                   event + ". See stderr.", exc, self._current_rule_name)
-        else:
-            # Location of 'xml' in name is different to avoid problems if the
-            # xml document has an <any_other_xml_element> tag.
-            meth = getattr(rule, 'visit_any_other_xml_element_' + event, None)
-            if meth is not None:
-                try:
-                    meth(copy.copy(pos), node)
-                except Exception as exc:  #pylint: disable=broad-except
-                    self.log_rule_exception("Exception thrown while calling "
-                                       + 'visit_any_other_xml_element_' + event
-                                       + ". See stderr.", exc, self._current_rule_name)
+                self.log_rule_exception("Exception thrown while calling is_active(). \
+                                         See stderr.", exc, name)
 
+    def needs_srcml(self) -> bool:
+        """Returns True if any loaded rule provides a visit_xml_* or
+        visit_any_other_xml_element_* method. Otherwise, srcml need not be run at all.
 
+        Rule types are not used for this decision as a LINE or FILE rule providing an xml visitor
+        would still have that visitor called. Rules of type SRCML that provide no xml visitors do
+        not require srcml.
+        """
+        _, xml_dispatch, xml_fallback_dispatch = self._get_dispatch_tables()
+        return bool(xml_dispatch) or any(xml_fallback_dispatch.values())
+
+    def get_uncacheable_rules(self) -> [str]:
+        """Returns the names of loaded rules that do not declare themselves cacheable."""
+        uncacheable = []
+        for name, rule_array in self._rules_dict.items():
+            for rule in rule_array:
+                meth = getattr(rule, 'is_cacheable', None)
+                if (meth is None or not meth()) and name not in uncacheable:
+                    uncacheable.append(name)
+        return uncacheable
+
+    def get_rules_identity(self) -> str:
+        """Returns a string identifying the loaded rules: the name and settings of each rule
+        instance and a hash of the source file of each rule's module."""
+        identity = []
+        for name, rule_array in self._rules_dict.items():
+            source_hash = ""
+            module_file = getattr(sys.modules.get(name), '__file__', None)
+            if module_file:
+                try:
+                    with open(module_file, 'rb') as file_stream:
+                        source_hash = hashlib.sha256(file_stream.read()).hexdigest()
+                except (IOError, OSError):
+                    pass
+            for rule in rule_array:
+                identity.append(json.dumps([name, rule.get_settings(), source_hash],
+                                           sort_keys=True))
+        return "\n".join(identity)
+
+    def needs_full_tree(self) -> bool:
+        """Returns True if any loaded rule needs the complete srcml tree (and thus can not be
+        run on streamed srcml)."""
+        for rule_array in self._rules_dict.values():
+            for rule in rule_array:
+                meth = getattr(rule, 'needs_full_tree', None)
+                if meth is not None and meth():
+                    return True
+        return False
 
     def run_rules_on_file(self, file:File):
         self._ignore_filter.init_filter(file.get_name())
 
         self.activate_all_rules()
 
-        next_line = 1
-        element_line = 1
-
         if self._logger_ref:
             self._logger_ref.set_current_file(file)
 
-        self.visit_file_open_all_active_rules(file.get_name())
+        if self._tracer:
+            self._tracer.start_rules()
+
+        with self._span('visit_file_open', "rules"):
+            self.visit_file_open_all_active_rules(file.get_name())
 
-        root = file.get_srcml_etree_root()
+        with self._span('visit lines and srcml', "rules"):
+            self._visit_lines_and_srcml(file)
 
-        if root is not None:
-            context = ET.iterwalk(root, events=("start", "end"))
+        with self._span('visit_file_close', "rules"):
+            self.visit_file_close_all_active_rules(file.get_name())
 
-            for event,elem in context:
-                srcml_xml_line = Srcml.get_xml_line(elem, event)
+        if self._tracer:
+            self._tracer.end_rules()
+
+        self._set_current_rule_name("rulecheck")
 
+    def _visit_lines_and_srcml(self, file:File):
+        next_line = 1
+        element_line = 1
+
+        if file.has_srcml():
+            for event, elem, srcml_xml_line in file.iter_srcml_events():
                 if srcml_xml_line > element_line:
                     element_line = srcml_xml_line
 
@@ -326,12 +447,11 @@ class RuleManager:
                     srcml_pos_line, srcml_pos_col = Srcml.get_pos_row_col(elem, event)
                     pos = LogFilePosition(srcml_pos_line, srcml_pos_col)
                     self.visit_xml_all_active_rules(pos, elem, event)
-        else:
-            self.visit_file_lines(1, len(file.get_lines()), file.get_lines())
 
-        self.visit_file_close_all_active_rules(file.get_name())
+        # Visit any lines not reached by the srcml (all lines if there is no srcml, or if the
+        # srcml stream ended early.)
+        self.visit_file_lines(next_line, len(file.get_lines()), file.get_lines())
 
-        self._set_current_rule_name("rulecheck")
 
 
     def log_rule_exception(self, msg:str, exc:Exception, rule_name:str):
@@ -5,14 +5,20 @@
 #################################################
 
 
+import io
 import os
 import shlex
 import subprocess
 import sys
+import tempfile
 
 # 3rd party imports
 from lxml import etree as ET
 
+# Local imports
+from rulecheck.cache import DiskCache
+from rulecheck.cache import get_cache_key
+
 #pylint: disable=missing-function-docstring
 #pylint: disable=too-many-arguments
 #pylint: disable=too-many-instance-attributes
@@ -48,6 +54,8 @@ class Srcml:
                                ".cs":"C#"
                               }
         self._verbose = verbose
+        self._cache = None
+        self._version = None
 
     def print_verbose(self, message:str):
         if self._verbose:
@@ -59,41 +67,89 @@ class Srcml:
     def can_read_extension(self, ext:str) -> bool:
         return ext in self._srcml_ext_mappings
 
+    def get_args(self) -> [str]:
+        return self._srcml_args.copy()
+
     def get_ext_mappings(self):
         return self._srcml_ext_mappings.copy()
 
-    def get_srcml(self, file_name:str) -> bytes:
+    def get_version(self) -> str:
+        """Returns the version reported by the srcml binary."""
+
+        if self._version is None:
+            try:
+                child = subprocess.Popen([self._srcml_bin, "--version"], shell=False,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+                stdout, _ = child.communicate()
+                self._version = stdout.decode('utf-8', errors='replace').strip()
+            except (IOError, OSError) as exc:
+                self.print_verbose("Could not get srcml version: " + str(exc))
+                self._version = ""
+
+        return self._version
+
+    def set_cache(self, cache:DiskCache):
+        """Cache srcml output in 'cache'. Entries are keyed by file name and content, the srcml
+        version, the srcml arguments and the language the file is parsed as."""
+
+        self._cache = cache
+        if self._cache:
+            self.print_verbose("Caching srcml output in: " + self._cache.get_directory() +
+                               " for srcml version: " + self.get_version())
+
+    def _get_cache_key(self, file_name:str, language:str, content:bytes = None) -> str:
+        if not self._cache:
+            return None
+
+        if content is None:
+            try:
+                with open(file_name, 'rb') as file_stream:
+                    content = file_stream.read()
+            except (IOError, OSError):
+                return None
+
+        return get_cache_key(content, file_name, self.get_version(),
+                             "\0".join(self._srcml_args), language)
+
+    def get_language(self, file_name:str) -> str:
+        """Returns the srcml language for file_name or None if srcml can not read the file."""
 
         file_extension = os.path.splitext(file_name)[1]
 
         if not file_extension or not self.can_read_extension(file_extension):
             return None
 
+        return self._srcml_ext_mappings[file_extension]
 
+    def _get_command(self, args:[str], file_names:[str]) -> [str]:
+        """Build up command and arguments. Use shlex for posix (linux/mac)."""
 
-        # Build up command and arguments. Use shlex for posix (linux/mac).
         srcml_cmd = []
 
         if os.name == 'posix':
             srcml_cmd = shlex.quote(self._srcml_bin) + " " + \
-                        " ".join([shlex.quote(a) for a in self._srcml_args]) + \
-                        " --language " + self._srcml_ext_mappings[file_extension] + \
-                        " " + shlex.quote(file_name)
+                        " ".join([shlex.quote(a) for a in self._srcml_args + args]) + \
+                        " " + " ".join([shlex.quote(f) for f in file_names])
             srcml_cmd = shlex.split(srcml_cmd)
         elif os.name == 'nt':
             srcml_cmd = [self._srcml_bin]
             srcml_cmd.extend(self._srcml_args)
-            srcml_cmd.extend(["--language", self._srcml_ext_mappings[file_extension]])
-            srcml_cmd.append(file_name)
+            srcml_cmd.extend(args)
+            srcml_cmd.extend(file_names)
         else:
             raise ValueError('Unexpected or unsupported OS: ' + os.name)
 
+        return srcml_cmd
+
+    def _run(self, srcml_cmd:[str], input_bytes:bytes = None) -> bytes:
         self.print_verbose("Calling srcml: " + " ".join(srcml_cmd))
         child = subprocess.Popen(srcml_cmd, shell=False,
+                                 stdin=subprocess.PIPE if input_bytes is not None else None,
                                  stdout=subprocess.PIPE,
                                  stderr=subprocess.PIPE)
 
-        stdout, stderr = child.communicate()
+        stdout, stderr = child.communicate(input_bytes)
 
         if child.returncode != 0 or stderr:
             print("error calling srcml, return code: " + str(child.returncode) + " stderr: ")
@@ -102,6 +158,147 @@ class Srcml:
 
         return stdout
 
+    def get_srcml(self, file_name:str) -> bytes:
+
+        language = self.get_language(file_name)
+
+        if language is None:
+            return None
+
+        cache_key = self._get_cache_key(file_name, language)
+        if cache_key:
+            srcml_bytes = self._cache.get(cache_key)
+            if srcml_bytes is not None:
+                return srcml_bytes
+
+        srcml_bytes = self._run(self._get_command(["--language", language], [file_name]))
+
+        if cache_key and srcml_bytes is not None:
+            self._cache.put(cache_key, srcml_bytes)
+
+        return srcml_bytes
+
+    def get_srcml_text(self, text:str, file_name:str, language:str = None) -> bytes:
+        """Returns the srcml of text, passed to srcml through stdin, as if it were the content
+        of file_name. Used for content not saved to disk, such as an editor buffer. The language
+        is that of the extension of file_name unless given."""
+
+        if language is None:
+            language = self.get_language(file_name)
+
+        if language is None:
+            return None
+
+        content = text.encode('utf-8')
+        cache_key = self._get_cache_key(file_name, language, content)
+        if cache_key:
+            srcml_bytes = self._cache.get(cache_key)
+            if srcml_bytes is not None:
+                return srcml_bytes
+
+        srcml_bytes = self._run(self._get_command(["--language", language,
+                                                   "--filename=" + file_name], ["-"]), content)
+
+        if cache_key and srcml_bytes is not None:
+            self._cache.put(cache_key, srcml_bytes)
+
+        return srcml_bytes
+
+    def open_srcml(self, file_name:str):
+        """Starts srcml on file_name and returns a binary file-like object from which the srcml
+        output can be read while srcml is still producing it. Returns None if srcml can not read
+        the file. Call close() on the returned object once done reading. Streamed output is read
+        from, but not added to, the cache."""
+
+        language = self.get_language(file_name)
+
+        if language is None:
+            return None
+
+        cache_key = self._get_cache_key(file_name, language)
+        if cache_key:
+            srcml_bytes = self._cache.get(cache_key)
+            if srcml_bytes is not None:
+                return io.BytesIO(srcml_bytes)
+
+        srcml_cmd = self._get_command(["--language", language], [file_name])
+        self.print_verbose("Calling srcml: " + " ".join(srcml_cmd))
+        return SrcmlStream(srcml_cmd)
+
+    def get_srcml_batch(self, file_names:[str]) -> dict:
+        """Runs a single srcml process, in archive mode, over all of file_names.
+
+        Returns a dictionary mapping each file name to the same srcml bytes get_srcml would have
+        returned for that file. Languages are selected per file by registering the extension of
+        each file in the batch with srcml. Files srcml can not read map to None. If srcml fails
+        on the batch, each file is run through srcml on its own instead. Files found in the
+        cache are not passed to srcml.
+        """
+
+        results = {}
+        languages = {}
+        cache_keys = {}
+        batch = []
+
+        for file_name in file_names:
+            results[file_name] = None
+            language = self.get_language(file_name)
+            if language is None:
+                continue
+
+            cache_key = self._get_cache_key(file_name, language)
+            if cache_key:
+                results[file_name] = self._cache.get(cache_key)
+                if results[file_name] is not None:
+                    continue
+                cache_keys[file_name] = cache_key
+
+            languages[os.path.splitext(file_name)[1]] = language
+            batch.append(file_name)
+
+        if len(batch) <= 1:
+            for file_name in batch:
+                results[file_name] = self.get_srcml(file_name)
+            return results
+
+        args = ["--archive"]
+        for ext, language in languages.items():
+            args.extend(["--register-ext", ext[1:] + "=" + language])
+
+        srcml_archive = self._run(self._get_command(args, batch))
+
+        units = {}
+        if srcml_archive:
+            units = Srcml.split_archive(srcml_archive)
+
+        for file_name in batch:
+            if file_name in units:
+                results[file_name] = units[file_name]
+                if file_name in cache_keys:
+                    self._cache.put(cache_keys[file_name], results[file_name])
+            else:
+                results[file_name] = self.get_srcml(file_name)
+
+        return results
+
+    @staticmethod
+    def split_archive(srcml_archive:bytes) -> dict:
+        """Splits srcml archive output into a dictionary mapping the filename attribute of each
+        unit to a stand-alone srcml document for that unit. Each document keeps the unit tag on
+        the second line (after the XML declaration) so xml line numbers match source lines."""
+
+        units = {}
+        root = ET.fromstring(srcml_archive)
+
+        for unit in root.iterchildren("{http://www.srcML.org/srcML/src}unit"):
+            if "filename" in unit.attrib:
+                units[unit.attrib["filename"]] = ET.tostring(unit, encoding="UTF-8",
+                                                             xml_declaration=True,
+                                                             standalone=True,
+                                                             with_tail=False)
+
+        return units
+
     @staticmethod
     def get_pos_row_col(element : ET.Element, event:str):
         """Returns [row,col] from srcML position start attribute or [-1,-1] it the
@@ -120,6 +317,23 @@ class Srcml:
 
         return [row_num, col_num]
 
+    @staticmethod
+    def get_xml_end_lines(root) -> [int]:
+        """Returns the line number within the xml stream of every end tag under (and including)
+        root, in the order the end events are produced by ET.iterwalk(root). Built in a single
+        pass over the tree."""
+
+        end_lines = []
+        tracker = XmlLineTracker()
+
+        for event, elem in ET.iterwalk(root, events=("start", "end")):
+            if event == "start":
+                tracker.start(elem)
+            else:
+                end_lines.append(tracker.end(elem))
+
+        return end_lines
+
     @staticmethod
     def get_xml_line(element : ET.Element, event:str):
         """Returns line number within the xml stream where 'element' starts or ends"""
@@ -139,3 +353,72 @@ class Srcml:
                 line_num += (len(content.decode('utf8').split("\n")) - 1)
 
         return line_num
+
+
+class SrcmlStream:
+    """Output of a running srcml process. Read it like a binary file. close() waits for srcml to
+    exit and reports any error, as Srcml.get_srcml would."""
+
+    def __init__(self, srcml_cmd:[str]):
+        # stderr goes to a file, not a pipe, so srcml can not block on a full stderr pipe while
+        # its stdout is being consumed.
+        self._stderr = tempfile.TemporaryFile()
+        self._child = subprocess.Popen(srcml_cmd, shell=False,
+                                       stdout=subprocess.PIPE,
+                                       stderr=self._stderr)
+
+    def read(self, size:int = -1) -> bytes:
+        return self._child.stdout.read(size)
+
+    def close(self) -> bool:
+        self._child.stdout.close()
+        returncode = self._child.wait()
+        self._stderr.seek(0)
+        stderr = self._stderr.read()
+        self._stderr.close()
+
+        if returncode != 0 or stderr:
+            print("error calling srcml, return code: " + str(returncode) + " stderr: ")
+            print(stderr.decode(sys.stderr.encoding))
+            return False
+
+        return True
+
+
+class XmlLineTracker:
+    """Computes the xml line number of each element's end tag while walking or parsing a tree.
+
+    start() and end() must be called for every element in document order. An element's end tag
+    line is the end tag line of its last child plus the newlines in that child's tail or, for an
+    element without children, its start line plus the newlines in its text. This avoids
+    serializing the subtree of every element to count its newlines.
+    """
+
+    def __init__(self):
+        # One [start line, end line of last finished child] entry per open element.
+        self._open_elements = []
+
+    def start(self, element : ET.Element) -> int:
+        # Subtract one because first xml line in the srcml is the XML declaration
+        line_num = element.sourceline - 1
+        self._open_elements.append([line_num, line_num])
+        return line_num
+
+    def end(self, element : ET.Element) -> int:
+        start_line, last_child_end_line = self._open_elements.pop()
+
+        if len(element):
+            line_num = last_child_end_line + XmlLineTracker._count_newlines(element[-1].tail)
+        else:
+            line_num = start_line + XmlLineTracker._count_newlines(element.text)
+
+        if self._open_elements:
+            self._open_elements[-1][1] = line_num
+
+        return line_num
+
+    @staticmethod
+    def _count_newlines(text:str) -> int:
+        if text:
+            return text.count("\n")
+        return 0
@@ -0,0 +1,443 @@
+#################################################
+##
+## File Discovery
+##
+#################################################
+
+import fnmatch
+import os
+import re
+
+#pylint: disable=missing-function-docstring
+
+MAGIC_CHECK = re.compile('[*?[]')
+SEPARATORS = re.compile(r'[\\/]' if os.sep == '\\' else '/')
+
+def _has_magic(pattern:str) -> bool:
+    return MAGIC_CHECK.search(pattern) is not None
+
+def _is_hidden(name:str) -> bool:
+    return name.startswith('.')
+
+def _to_posix(path:str) -> str:
+    return os.path.normpath(path).replace(os.sep, '/')
+
+class FileIdentities:
+    """ The set of files seen so far, by identity rather than path, so a file reached through
+    several paths (overlapping globs, symbolic links, hard links, '..') is only checked once.
+
+    A file is identified by its device and inode numbers, kept as a set of inode numbers per
+    device, which is about as small as a set of ints gets. Where the file system does not provide
+    inode numbers, or the file can not be found, the real path of the file is used instead.
+    """
+
+    def __init__(self):
+        self._inodes = {}
+        self._paths = set()
+        self._last_dir = None
+        self._last_dir_device = None
+        self._duplicate_count = 0
+
+    def get_duplicate_count(self) -> int:
+        return self._duplicate_count
+
+    def add(self, path:str) -> bool:
+        """ Adds the file at path. Returns False if it was already seen. """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self._add_path(path)
+        return self._add_inode(stat.st_dev, stat.st_ino, path)
+
+    def add_entry(self, dir_path:str, entry:os.DirEntry) -> bool:
+        """ Adds the file of entry, found in dir_path. Returns False if it was already seen.
+            The inode number of an entry is known without a stat call on posix, and the device
+            of a file that is not a symbolic link is that of its directory. """
+        if entry.is_symlink():
+            return self.add(entry.path)
+        try:
+            if dir_path != self._last_dir:
+                self._last_dir_device = os.stat(dir_path or os.curdir).st_dev
+                self._last_dir = dir_path
+            return self._add_inode(self._last_dir_device, entry.inode(), entry.path)
+        except OSError:
+            return self._add_path(entry.path)
+
+    def _add_inode(self, device:int, inode:int, path:str) -> bool:
+        if not inode:
+            return self._add_path(path)
+        inodes = self._inodes.setdefault(device, set())
+        if inode in inodes:
+            self._duplicate_count += 1
+            return False
+        inodes.add(inode)
+        return True
+
+    def _add_path(self, path:str) -> bool:
+        real_path = os.path.normcase(os.path.realpath(path))
+        if real_path in self._paths:
+            self._duplicate_count += 1
+            return False
+        self._paths.add(real_path)
+        return True
+
+class FileWalker:
+    """ Finds the files matching glob patterns, as glob.iglob(pattern, recursive=True) would,
+    but with os.scandir and pruning whole directories as early as possible.
+
+    Files found by searching, through wildcards or because a directory was given, are skipped
+    if their extension is not one of extensions (unless extensions is None), if they match an
+    exclude pattern or, when enabled, if a .gitignore file ignores them. Directories matching
+    an exclude pattern or ignored by a .gitignore file are not searched at all. As with glob,
+    wildcards do not match names starting with a '.' unless the pattern does. A path given
+    without wildcards is returned as is if it is a file, and searched recursively if it is a
+    directory. Entries of each directory are returned sorted by name.
+
+    An exclude pattern without a '/' is matched against the name of each file and directory,
+    such as 'build' or '*.gen.c'. Otherwise it is matched against the whole path, such as
+    'src/third_party' or '*/generated/*'.
+    """
+
+    def __init__(self, extensions:[str] = None, excludes:[str] = None,
+                 use_gitignore:bool = False, verbose:bool = False):
+        self._extensions = frozenset(extensions) if extensions is not None else None
+        self._name_excludes = []
+        self._path_excludes = []
+        for exclude in excludes or []:
+            exclude = exclude.replace('\\', '/').rstrip('/')
+            regex = re.compile(fnmatch.translate(exclude))
+            if '/' in exclude:
+                self._path_excludes.append(regex)
+            else:
+                self._name_excludes.append(regex)
+        self._use_gitignore = use_gitignore
+        self._verbose = verbose
+        # Absolute directory -> GitIgnores applying to its entries, outermost first
+        self._gitignore_chains = {}
+        self._gitignore_tops = set()
+        self._part_regexes = {}
+        self._identities = None
+
+    def print_verbose(self, message:str):
+        if self._verbose:
+            print(message)
+
+    def iter_files(self, patterns:[str], identities:FileIdentities = None):
+        """ Yields the files matching patterns. If identities is given, files already in it
+            are skipped and the files yielded are added to it. """
+        self._identities = identities
+        try:
+            for pattern in patterns:
+                yield from self._iter_pattern(pattern)
+        finally:
+            self._identities = None
+
+    def iter_changed_files(self, patterns:[str], changed_files:[str],
+                           identities:FileIdentities = None):
+        """ Yields the files of changed_files, absolute real paths, which iter_files would
+            yield for patterns, in the same form, without searching any directory. """
+        self._identities = identities
+        changed_set = frozenset(changed_files)
+        try:
+            for pattern in patterns:
+                yield from self._iter_changed_pattern(pattern, changed_files, changed_set)
+        finally:
+            self._identities = None
+
+    def _iter_changed_pattern(self, pattern:str, changed_files:[str], changed_set:frozenset):
+        parts = SEPARATORS.split(pattern)
+        magic_index = 0
+        while magic_index < len(parts) and not _has_magic(parts[magic_index]):
+            magic_index += 1
+
+        if magic_index == len(parts):
+            if os.path.isfile(pattern):
+                if os.path.realpath(pattern) in changed_set and self._is_new(pattern):
+                    yield pattern
+                return
+            if not os.path.isdir(pattern):
+                return
+            base = pattern
+            parts = ['**']
+        else:
+            base = pattern[:sum(len(part) + 1 for part in parts[:magic_index])]
+            if base and not os.path.isdir(base):
+                return
+            parts = parts[magic_index:]
+
+        self._start_search(base or os.curdir)
+        prefix = os.path.join(os.path.realpath(base or os.curdir), '')
+        for changed_file in changed_files:
+            if not changed_file.startswith(prefix):
+                continue
+            names = changed_file[len(prefix):].split(os.sep)
+            if not self._match_names(parts, names) or not self._has_extension(names[-1]):
+                continue
+            dir_path = base
+            for index, name in enumerate(names):
+                if self._is_excluded(dir_path, name, index < len(names) - 1):
+                    break
+                dir_path = os.path.join(dir_path, name)
+            else:
+                if os.path.isfile(dir_path) and self._is_new(dir_path):
+                    yield dir_path
+
+    def _match_names(self, parts:[str], names:[str]) -> bool:
+        """ Returns True if the path made of names matches the pattern made of parts, with
+            the same rules as _match. """
+        if not parts:
+            return not names
+        part = parts[0]
+        if part == '**':
+            if len(parts) == 1:
+                return bool(names) and not any(_is_hidden(name) for name in names)
+            if self._match_names(parts[1:], names):
+                return True
+            return len(names) > 1 and not _is_hidden(names[0]) and \
+                   self._match_names(parts, names[1:])
+        if not part:
+            # Repeated separator
+            return self._match_names(parts[1:], names)
+        if not names:
+            return False
+        if _has_magic(part):
+            if _is_hidden(names[0]) and not _is_hidden(part):
+                return False
+            if not self._get_part_regex(part).match(names[0]):
+                return False
+        elif part != names[0]:
+            return False
+        return self._match_names(parts[1:], names[1:])
+
+    def _is_new(self, path:str) -> bool:
+        return self._identities is None or self._identities.add(path)
+
+    def _is_new_entry(self, dir_path:str, entry:os.DirEntry) -> bool:
+        return self._identities is None or self._identities.add_entry(dir_path, entry)
+
+    def _iter_pattern(self, pattern:str):
+        parts = SEPARATORS.split(pattern)
+        magic_index = 0
+        while magic_index < len(parts) and not _has_magic(parts[magic_index]):
+            magic_index += 1
+
+        if magic_index == len(parts):
+            if os.path.isfile(pattern):
+                if self._is_new(pattern):
+                    yield pattern
+            elif os.path.isdir(pattern):
+                self._start_search(pattern)
+                yield from self._walk(pattern)
+            return
+
+        # The literal directory the pattern starts from, as written, so the paths found start
+        # the same way glob's would.
+        base_length = sum(len(part) + 1 for part in parts[:magic_index])
+        base = pattern[:base_length]
+        if base and not os.path.isdir(base):
+            return
+        self._start_search(base or os.curdir)
+        yield from self._match(base, parts[magic_index:])
+
+    def _match(self, dir_path:str, parts:[str]):
+        part = parts[0]
+        rest = parts[1:]
+
+        if part == '**':
+            if not rest:
+                yield from self._walk(dir_path)
+                return
+            # '**' matches zero or more directories.
+            yield from self._match(dir_path, rest)
+            for entry in self._scan(dir_path):
+                if not _is_hidden(entry.name) and entry.is_dir():
+                    yield from self._match(os.path.join(dir_path, entry.name), parts)
+        elif _has_magic(part):
+            regex = self._get_part_regex(part)
+            for entry in self._scan(dir_path):
+                if _is_hidden(entry.name) and not _is_hidden(part):
+                    continue
+                if regex.match(entry.name):
+                    path = os.path.join(dir_path, entry.name)
+                    if rest:
+                        if entry.is_dir():
+                            yield from self._match(path, rest)
+                    elif entry.is_file() and self._has_extension(entry.name) and \
+                         self._is_new_entry(dir_path, entry):
+                        yield path
+        elif part:
+            path = os.path.join(dir_path, part)
+            if rest:
+                if os.path.isdir(path) and not self._is_excluded(dir_path, part, True):
+                    yield from self._match(path, rest)
+            elif os.path.isfile(path) and self._has_extension(part) and \
+                 not self._is_excluded(dir_path, part, False) and self._is_new(path):
+                yield path
+        elif rest:
+            # Repeated separator
+            yield from self._match(dir_path, rest)
+
+    def _walk(self, dir_path:str):
+        """ Yields every file under dir_path, except in hidden, excluded or ignored
+            directories. """
+        for entry in self._scan(dir_path):
+            if _is_hidden(entry.name):
+                continue
+            path = os.path.join(dir_path, entry.name)
+            if entry.is_dir():
+                yield from self._walk(path)
+            elif entry.is_file() and self._has_extension(entry.name) and \
+                 self._is_new_entry(dir_path, entry):
+                yield path
+
+    def _get_part_regex(self, part:str):
+        if part not in self._part_regexes:
+            self._part_regexes[part] = re.compile(fnmatch.translate(part))
+        return self._part_regexes[part]
+
+    def _has_extension(self, name:str) -> bool:
+        return self._extensions is None or os.path.splitext(name)[1] in self._extensions
+
+    def _scan(self, dir_path:str) -> [os.DirEntry]:
+        """ Returns the entries of dir_path, sorted by name, which are not excluded or
+            ignored. """
+        try:
+            with os.scandir(dir_path or os.curdir) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            return []
+
+        if not self._name_excludes and not self._path_excludes and not self._use_gitignore:
+            return entries
+
+        return [entry for entry in entries
+                if not self._is_excluded(dir_path, entry.name, entry.is_dir())]
+
+    def _is_excluded(self, dir_path:str, name:str, is_dir:bool) -> bool:
+        excluded = False
+        if any(regex.match(name) for regex in self._name_excludes):
+            excluded = True
+        elif self._path_excludes:
+            path = _to_posix(os.path.join(dir_path, name))
+            excluded = any(regex.match(path) for regex in self._path_excludes)
+
+        if not excluded and self._use_gitignore:
+            abs_dir = os.path.abspath(dir_path or os.curdir)
+            abs_path = os.path.join(abs_dir, name)
+            ignored = None
+            for gitignore in self._get_gitignore_chain(abs_dir):
+                result = gitignore.match(abs_path, is_dir)
+                if result is not None:
+                    ignored = result
+            excluded = bool(ignored)
+
+        if excluded and is_dir:
+            self.print_verbose("Not searching excluded directory: " +
+                               os.path.join(dir_path, name))
+        return excluded
+
+    def _start_search(self, dir_path:str):
+        """ Finds where the .gitignore files applying to a search from dir_path start: at the
+            top of the git working tree containing it, or at dir_path itself if there is
+            none. """
+        if not self._use_gitignore:
+            return
+        abs_dir = os.path.abspath(dir_path)
+        top = abs_dir
+        while not os.path.exists(os.path.join(top, '.git')):
+            parent = os.path.dirname(top)
+            if parent == top:
+                top = abs_dir
+                break
+            top = parent
+        self._gitignore_tops.add(top)
+
+    def _get_gitignore_chain(self, abs_dir:str) -> ['GitIgnore']:
+        chain = self._gitignore_chains.get(abs_dir)
+        if chain is None:
+            parent = os.path.dirname(abs_dir)
+            if abs_dir in self._gitignore_tops or parent == abs_dir:
+                chain = []
+            else:
+                chain = list(self._get_gitignore_chain(parent))
+            gitignore = GitIgnore.read(abs_dir)
+            if gitignore:
+                chain.append(gitignore)
+            self._gitignore_chains[abs_dir] = chain
+        return chain
+
+class GitIgnore:
+    """ The patterns of a single .gitignore file, following the rules described in the git
+    documentation (gitignore(5)), except that character classes are passed on to fnmatch as
+    they are. """
+
+    def __init__(self, dir_path:str, lines:[str]):
+        self._dir_path = dir_path
+        # (regex, negated, directories only, matched against the whole relative path)
+        self._patterns = []
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.strip() or line.startswith('#'):
+                continue
+            line = line.rstrip(' ')
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            self._patterns.append((re.compile(GitIgnore._translate(line.lstrip('/'))),
+                                   negated, dir_only, anchored))
+
+    @staticmethod
+    def read(dir_path:str) -> 'GitIgnore':
+        """ Returns the GitIgnore of the .gitignore file in dir_path, or None if there is
+            none. """
+        try:
+            with open(os.path.join(dir_path, '.gitignore'), 'r') as file_stream:
+                return GitIgnore(dir_path, file_stream.readlines())
+        except (IOError, OSError):
+            return None
+
+    @staticmethod
+    def _translate(pattern:str) -> str:
+        regex = []
+        index = 0
+        while index < len(pattern):
+            if pattern.startswith('**/', index):
+                regex.append('(?:.*/)?')
+                index += 3
+            elif pattern.startswith('**', index):
+                regex.append('.*')
+                index += 2
+            elif pattern[index] == '*':
+                regex.append('[^/]*')
+                index += 1
+            elif pattern[index] == '?':
+                regex.append('[^/]')
+                index += 1
+            elif pattern[index] == '[' and ']' in pattern[index + 2:]:
+                end = pattern.index(']', index + 2)
+                regex.append(fnmatch.translate(pattern[index:end + 1])[4:-3])
+                index = end + 1
+            else:
+                regex.append(re.escape(pattern[index]))
+                index += 1
+        return ''.join(regex) + r'\Z'
+
+    def match(self, abs_path:str, is_dir:bool) -> bool:
+        """ Returns True if abs_path is ignored, False if it is explicitly not ignored and None
+            if no pattern matches it. """
+        relative_path = abs_path[len(self._dir_path):].replace(os.sep, '/').lstrip('/')
+        name = relative_path.rpartition('/')[2]
+        result = None
+        for regex, negated, dir_only, anchored in self._patterns:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path if anchored else name):
+                result = not negated
+        return result
@@ -0,0 +1,189 @@
+#################################################
+##
+## Watch Mode
+##
+#################################################
+
+import collections
+import json
+import os
+import sys
+import time
+
+# Local imports
+from rulecheck.file_manager import FileManager
+from rulecheck.logger import CollectingSink
+from rulecheck.logger import Logger
+from rulecheck.logger import OutputWriter
+from rulecheck.logger import TextSink
+from rulecheck.logger import Violation
+from rulecheck.rule import LogType
+
+#pylint: disable=missing-function-docstring
+#pylint: disable=too-many-arguments
+
+def _get_stat_key(file_path:str) -> tuple:
+    """ Returns what tells whether file_path changed, or None if it can not be found. The inode
+        number catches editors saving by replacing the file with a new one. """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _get_violation_key(violation:Violation) -> tuple:
+    # The ignore hash depends on the text of the line rather than its number, so a violation
+    # that only moved because lines were added or removed above it is not reported again.
+    return (violation.ignore_hash, violation.log_type, violation.rule_name, violation.message)
+
+class FileWatcher:
+    """ Checks the files found from globs, then checks them again each time they change,
+    reporting only the violations that are new and those that were fixed.
+
+    The files are found again and stat'ed at each poll, so added and removed files are noticed.
+    A file is checked again when its modification time, size or inode number changes. The
+    rules, srcml settings and ignore list loaded by the file manager are reused throughout.
+    """
+
+    def __init__(self, file_manager:FileManager, logger:Logger, globs:[str],
+                 output_writer:OutputWriter, output_format:str = 'text', verbose:bool = False):
+        self._file_manager = file_manager
+        self._logger = logger
+        # A file list read from stdin can only be read once.
+        if len(globs) == 1 and globs[0] == "-":
+            globs = [file_path.rstrip() for file_path in sys.stdin]
+        self._globs = globs
+        self._output_writer = output_writer
+        self._output_format = output_format
+        self._verbose = verbose
+        # File path -> stat key when last checked
+        self._stat_keys = {}
+        # File path -> violations found when last checked
+        self._violations = {}
+
+    def print_verbose(self, message:str):
+        if self._verbose:
+            print(message)
+
+    def check_all(self):
+        """ Checks every file and writes the violations found through the logger's output
+            sink, as a run without watching would. """
+        output_sink = self._logger.get_output_sink()
+        file_paths = self._find_files()
+        for violation in self._check(file_paths):
+            output_sink.write_violation(violation)
+        output_sink.flush()
+
+    def poll(self) -> [(str, Violation)]:
+        """ Checks the files that changed, were added or were removed since the last check.
+            Returns the ("new" or "fixed", violation) changes, which are also written out. """
+        file_paths = self._find_files()
+
+        removed = [file_path for file_path in self._stat_keys if file_path not in file_paths]
+        changed = [file_path for file_path, stat_key in file_paths.items()
+                   if self._stat_keys.get(file_path) != stat_key]
+        if not removed and not changed:
+            return []
+
+        old_violations = []
+        for file_path in removed + changed:
+            old_violations.extend(self._violations.pop(file_path, []))
+            self._stat_keys.pop(file_path, None)
+        if removed:
+            self.print_verbose("Removed: " + ", ".join(removed))
+        if changed:
+            self.print_verbose("Checking changed files: " + ", ".join(changed))
+
+        new_violations = self._check({file_path: file_paths[file_path]
+                                      for file_path in changed})
+        changes = FileWatcher.compare(old_violations, new_violations)
+        self._write_changes(changes)
+        return changes
+
+    def watch(self, interval:float):
+        """ Checks every file, then polls for changes every interval seconds until
+            interrupted. """
+        try:
+            self.check_all()
+            while True:
+                time.sleep(interval)
+                self.poll()
+        except KeyboardInterrupt:
+            pass
+
+    def get_violations(self) -> [Violation]:
+        """ Returns the violations of every file as last checked. """
+        return [violation for violations in self._violations.values()
+                for violation in violations]
+
+    def get_exit_value(self) -> int:
+        """ Returns the exit value of a run finding the violations last found: 2 if any is an
+            error, 3 if there are only warnings and 0 otherwise. """
+        violations = self.get_violations()
+        if any(violation.log_type == LogType.ERROR for violation in violations):
+            return 2
+        if violations:
+            return 3
+        return 0
+
+    @staticmethod
+    def compare(old_violations:[Violation], new_violations:[Violation]) -> [(str, Violation)]:
+        """ Returns the violations of new_violations not in old_violations as "new" and those of
+            old_violations not in new_violations as "fixed". Each violation is matched at most
+            once, so a violation found once more than before is new. """
+        changes = []
+        for label, violations, other_violations in (("fixed", old_violations, new_violations),
+                                                    ("new", new_violations, old_violations)):
+            unmatched = collections.Counter(_get_violation_key(v) for v in other_violations)
+            for violation in violations:
+                key = _get_violation_key(violation)
+                if unmatched[key] > 0:
+                    unmatched[key] -= 1
+                else:
+                    changes.append((label, violation))
+        return changes
+
+    def _find_files(self) -> dict:
+        """ Returns the stat key of each file found from the globs, in the order found. """
+        file_paths = {}
+        for batch in self._file_manager.get_batches(self._globs):
+            for file_path in batch:
+                file_paths[file_path] = _get_stat_key(file_path)
+        return file_paths
+
+    def _check(self, file_paths:dict) -> [Violation]:
+        """ Checks file_paths, recording the violations found for each file and its stat key
+            from before it was read. Returns all the violations found. """
+        output_sink = self._logger.get_output_sink()
+        collecting_sink = CollectingSink()
+        self._logger.set_output_sink(collecting_sink)
+        for file_path, stat_key in file_paths.items():
+            self._stat_keys[file_path] = stat_key
+            self._violations[file_path] = []
+
+        # Violations are kept by the file checked rather than by their file name, which is
+        # "rulecheck" for those logged when a rule raises an exception.
+        recorded = 0
+        def file_checked(file_path:str):
+            nonlocal recorded
+            violations = collecting_sink.get_violations()
+            self._violations.setdefault(file_path, []).extend(violations[recorded:])
+            recorded = len(violations)
+
+        self._file_manager.set_file_checked(file_checked)
+        try:
+            self._file_manager.process_file_list(list(file_paths))
+        finally:
+            self._file_manager.set_file_checked(None)
+            self._logger.set_output_sink(output_sink)
+        return collecting_sink.get_violations()
+
+    def _write_changes(self, changes:[(str, Violation)]):
+        for label, violation in changes:
+            if self._output_format == 'jsonl':
+                line = dict(violation.to_dict(), change=label)
+                self._output_writer.write_line(json.dumps(line))
+            else:
+                self._output_writer.write_line(
+                    label + ": " + TextSink.format_violation(violation, self._logger.show_hash()))
+        self._output_writer.flush()
@@ -23,7 +23,7 @@ setup(
     author="Erik Shreve",
     author_email="e-shreve@users.noreply.github.com",
     url='https://github.com/e-shreve/rulecheck',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Environment :: Console',
@@ -45,6 +45,7 @@ setup(
     entry_points={
         'console_scripts': [
             'rulecheck = rulecheck.engine:main',
+            'rulecheck-client = rulecheck.client:main',
         ],
     },
 )
@@ -0,0 +1,19 @@
+import pytest
+
+from rulecheck.srcml import Srcml
+
+@pytest.fixture
+def srcml():
+    """ Pytest fixture returning a Srcml object whose methods running srcml tests may patch """
+    return Srcml("srcml", [], False)
+
+@pytest.fixture
+def mock_rules(mocker):
+    """ Pytest fixture returning a function creating a mock RuleManager, whose needs_srcml method
+        returns needs_srcml and whose run_rules_on_file method calls run_rules_on_file """
+    def create_rules(needs_srcml:bool, run_rules_on_file):
+        rules = mocker.Mock(spec_set=['run_rules_on_file', 'needs_srcml', 'needs_full_tree'])
+        rules.needs_srcml = mocker.Mock(return_value=needs_srcml)
+        rules.run_rules_on_file = mocker.Mock(side_effect=run_rules_on_file)
+        return rules
+    return create_rules
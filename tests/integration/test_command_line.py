@@ -4,9 +4,18 @@ Created on Sep 7, 2020
 @author: Erik
 '''
 
+import json
+import os
 import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
 import pytest
 from rulecheck import __version__
+from rulecheck.client import send_request
 
 @pytest.mark.script_launch_mode('subprocess')
 def test_version(script_runner):
@@ -69,3 +78,313 @@ def test_all_the_things(script_runner):
     # Check summary results. Expect one error, which would be from using a per-rule werror setting
     assert r'Total Warnings (ignored): 13(0)' in result.stdout
     assert r'Total Errors (ignored): 1(0)' in result.stdout
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_parallel_jobs_match_serial_run(script_runner):
+    """ This integration test confirms that checking files with multiple processes reports the
+    same output, in the same order, with the same totals and exit code as a single process.
+    """
+    args = ['-v',
+            '-c', './tests/integration/rules1.json',
+            '-c', './tests/integration/rules2.json',
+            '--rulepaths', './tests',
+            r'./tests/src/basic utils/*',
+            r'./tests/src/network/**/*']
+
+    serial = script_runner.run('rulecheck', *args)
+    parallel = script_runner.run('rulecheck', '-j', '3', *args)
+
+    assert parallel.returncode == serial.returncode
+    assert parallel.stdout == serial.stdout
+    assert r'Total Files Checked: 7' in parallel.stdout
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_srcml_stream_matches_tree(script_runner, tmp_path):
+    """ This integration test confirms that the rules of the test rule packs, which read the text
+    of an element from its end visitor, report the same with the srcml streamed as parsed into a
+    full tree.
+    """
+    config = tmp_path / "rules.json"
+    config.write_text('{"rules": [{"name": "rulepack1.findSingleLineCommentsWith",' \
+                      ' "settings": {"with_string": "TODO"}}]}')
+    # Enough comments for some to be split across the chunks the srcml stream is parsed in.
+    source = tmp_path / "comments.c"
+    source.write_text("int a; // TODO: first\nint b;\n  // second\n" +
+                      "".join("int c%d; // comment number %d\n" % (i, i) for i in range(5000)))
+    args = ['-c', str(config), '-c', './tests/integration/rules1.json',
+            '--rulepaths', './tests', str(source)]
+
+    tree = script_runner.run('rulecheck', *args)
+    stream = script_runner.run('rulecheck', '--srcml-stream', *args)
+
+    assert stream.returncode == tree.returncode
+    assert stream.stdout == tree.stdout
+    assert 'comments.c:1:8: WARNING: rulepack1.findSingleLineCommentsWith: ' \
+           'Found line comment // TODO: first' in stream.stdout
+    assert 'comments.c:3:3: WARNING: rulepack1.findSingleLineCommentsWith: ' \
+           'Found line comment // second' in stream.stdout
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_result_cache(script_runner, tmp_path):
+    """ This integration test confirms that results replayed from the result cache are reported
+    the same as when the files are checked, and that the cache is not used when a loaded rule is
+    not cacheable.
+    """
+    config = tmp_path / "rules.json"
+    config.write_text('{"rules": [{"name": "rulepack1.printRowsWithWord",' \
+                      ' "settings": {"word": "int"}}]}')
+    args = ['-c', str(config),
+            '--rulepaths', './tests',
+            '--result-cache', str(tmp_path / "cache"),
+            r'./tests/src/basic utils/*']
+
+    first = script_runner.run('rulecheck', *args)
+    second = script_runner.run('rulecheck', '-v', *args)
+    third = script_runner.run('rulecheck', *args)
+
+    assert 'Replayed cached results for: ' in second.stdout
+    assert third.returncode == first.returncode
+    assert third.stdout == first.stdout
+    assert 'use of the word int' in third.stdout
+
+    uncached = script_runner.run('rulecheck', *args[0:1], './tests/integration/rules1.json',
+                                 *args[2:])
+    assert 'Result cache not used, these rules are not cacheable: ' in uncached.stdout
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_compiled_ignore_list(script_runner, tmp_path):
+    """ This integration test confirms that an ignore list compiled with --compile-ignorelist
+    filters the same violations as the text ignore list it was compiled from.
+    """
+    config = tmp_path / "rules.json"
+    config.write_text('{"rules": [{"name": "rulepack1.printRowsWithWord",' \
+                      ' "settings": {"word": "int"}}]}')
+    args = ['-c', str(config), '--rulepaths', './tests', r'./tests/src/basic utils/*']
+
+    hashes = script_runner.run('rulecheck', '--generatehashes', *args)
+    assert 'use of the word int' in hashes.stdout
+    text_file = tmp_path / "ignore.txt"
+    text_file.write_text(hashes.stdout)
+    compiled_file = str(tmp_path / "ignore.bin")
+
+    compiled = script_runner.run('rulecheck', '-i', str(text_file),
+                                 '--compile-ignorelist', compiled_file)
+    assert compiled.returncode == 0
+
+    for ignore_list in [str(text_file), compiled_file]:
+        result = script_runner.run('rulecheck', '-i', ignore_list, *args)
+        assert result.returncode == 0
+        assert 'use of the word int' not in result.stdout
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_output_file(script_runner, tmp_path):
+    """ This integration test confirms that --output writes the violations, and only the
+    violations, to the given file, with single and multiple processes.
+    """
+    args = ['-c', './tests/integration/rules1.json',
+            '--rulepaths', './tests',
+            r'./tests/src/basic utils/*']
+
+    stdout = script_runner.run('rulecheck', *args)
+    violations = [line for line in stdout.stdout.splitlines(keepends=True)
+                  if 'WARNING: ' in line or 'ERROR: ' in line]
+    assert violations
+
+    for jobs in ['1', '2']:
+        output_file = tmp_path / ("output" + jobs + ".txt")
+        result = script_runner.run('rulecheck', '-j', jobs, '-o', str(output_file), *args)
+        assert result.returncode == stdout.returncode
+        assert output_file.read_text() == "".join(violations)
+        for line in violations:
+            assert line not in result.stdout
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_output_formats(script_runner, tmp_path):
+    """ This integration test confirms that the jsonl and sarif formats report the same
+    violations as the text format, with single and multiple processes.
+    """
+    args = ['-c', './tests/integration/rules1.json',
+            '--rulepaths', './tests',
+            r'./tests/src/basic utils/*']
+
+    text = script_runner.run('rulecheck', '-g', *args)
+    violations = [line for line in text.stdout.splitlines()
+                  if 'WARNING: ' in line or 'ERROR: ' in line]
+
+    for jobs in ['1', '2']:
+        output_file = tmp_path / ("output" + jobs + ".jsonl")
+        script_runner.run('rulecheck', '-j', jobs, '--format', 'jsonl', '-o', str(output_file),
+                          *args)
+        results = [json.loads(line) for line in output_file.read_text().splitlines()]
+        assert [result["hash"] for result in results] == \
+            [violation.split(": ")[0] for violation in violations]
+        assert all(violation.endswith(": " + result["severity"] + ": " + result["rule"] + ": " +
+                                      result["message"])
+                   for result, violation in zip(results, violations))
+
+        output_file = tmp_path / ("output" + jobs + ".sarif")
+        script_runner.run('rulecheck', '-j', jobs, '--format', 'sarif', '-o', str(output_file),
+                          *args)
+        results = json.loads(output_file.read_text())["runs"][0]["results"]
+        assert [result["partialFingerprints"]["rulecheckIgnoreHash/v1"] for result in results] == \
+            [violation.split(": ")[0] for violation in violations]
+
+        # Without -o, stdout holds only the violations.
+        result = script_runner.run('rulecheck', '-v', '-j', jobs, '--format', 'sarif', *args)
+        results = json.loads(result.stdout)["runs"][0]["results"]
+        assert len(results) == len(violations)
+        assert 'Total Files Checked' in result.stderr
+        result = script_runner.run('rulecheck', '-v', '-j', jobs, '--format', 'jsonl', *args)
+        assert [json.loads(line)["hash"] for line in result.stdout.splitlines()] == \
+            [violation.split(": ")[0] for violation in violations]
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_file_search_options(script_runner):
+    """ This integration test confirms that searched paths are filtered by extension and
+    exclude patterns, and that directories are searched.
+    """
+    args = ['-v',
+            '-c', './tests/integration/rules1.json',
+            '--rulepaths', './tests']
+
+    # Files with any extension are checked by default.
+    result = script_runner.run('rulecheck', *args, './tests/src')
+    assert r'Total Files Checked: 9' in result.stdout
+
+    # Also when a rule needs srcml, which is not run on README.md, whose lines are checked.
+    result = script_runner.run('rulecheck', '-v', '-c', './tests/integration/rules2.json',
+                               '--rulepaths', './tests', './tests/src')
+    assert r'Total Files Checked: 9' in result.stdout
+    assert re.search(r'README\.md:\d+:\d+: WARNING: rulepack1\.printRowsWithWord', result.stdout)
+
+    result = script_runner.run('rulecheck', *args, '-x', '.md,.txt', '-x', 'h', './tests/src')
+    assert r'Total Files Checked: 2' in result.stdout
+    assert re.search(r'Opened file for checking: [^\n]*README.md', result.stdout)
+
+    result = script_runner.run('rulecheck', *args, '--exclude', 'udp', '--exclude', '*/tcp',
+                               './tests/src/network/**/*')
+    assert r'Total Files Checked: 1' in result.stdout
+    assert re.search(r'Not searching excluded directory: [^\n]*udp', result.stdout)
+
+    result = script_runner.run('rulecheck', *args, './tests/src/network/**/*',
+                               './tests/src/network/../network/err.c')
+    assert r'Total Files Checked: 4' in result.stdout
+    assert r'Skipped 1 files found more than once.' in result.stdout
+
+@pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+@pytest.mark.script_launch_mode('subprocess')
+def test_diff_base(script_runner, tmp_path):
+    """ This integration test confirms that with --diff-base only the changed files are checked
+    and only violations on changed lines, or without a line, are reported.
+    """
+    def git(*git_args):
+        subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com',
+                        *git_args], cwd=str(tmp_path), check=True, stdout=subprocess.PIPE)
+
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'a.c').write_text("int not1;\nint a;\nint not3;\n")
+    (tmp_path / 'src' / 'b.c').write_text("int not1;\n")
+    (tmp_path / '.gitignore').write_text("ignored.c\n")
+    (tmp_path / 'rules.json').write_text(json.dumps({"rules": [
+        {"name": "rulepack1.printFilename"},
+        {"name": "rulepack1.printRowsWithWord", "settings": {"word": "not"}}]}))
+    git('init', '-q')
+    git('add', '.')
+    git('commit', '-q', '-m', 'initial')
+    (tmp_path / 'src' / 'a.c').write_text("int not1;\nint not2;\nint not3;\n")
+    # Untracked files are checked in full, unless ignored by git.
+    (tmp_path / 'src' / 'c.c').write_text("int not1;\n")
+    (tmp_path / 'src' / 'ignored.c').write_text("int not1;\n")
+
+    args = ['-c', 'rules.json', '--rulepaths', os.path.abspath('./tests'), '--diff-base', 'HEAD']
+    for jobs in ['1', '2']:
+        result = script_runner.run('rulecheck', '-v', '-j', jobs, *args, 'src',
+                                   cwd=str(tmp_path))
+        assert r'Total Files Checked: 2' in result.stdout
+        violations = [line for line in result.stdout.splitlines() if 'WARNING' in line]
+        assert len(violations) == 4
+        assert 'Visited file: ' in violations[0]
+        assert re.search(r'a\.c:2:4: WARNING: rulepack1\.printRowsWithWord', violations[1])
+        assert re.search(r'c\.c:1:4: WARNING: rulepack1\.printRowsWithWord', violations[3])
+
+    result = script_runner.run('rulecheck', *args, '--diff-base', 'nosuchref', 'src',
+                               cwd=str(tmp_path))
+    assert result.returncode == 1
+    assert 'Could not read the changes since nosuchref' in result.stdout
+
+@pytest.mark.skipif(os.name != 'posix', reason="interrupts the watch with SIGINT")
+def test_watch(tmp_path):
+    """ This integration test confirms that --watch, given before the sources, checks them, then
+    reports the violations new since, and exits on Ctrl-C with the exit value of the last check.
+    """
+    source = tmp_path / 'a.c'
+    source.write_text("int a;\n")
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    watch = subprocess.Popen(['rulecheck', '-c', './tests/integration/rules1.json',
+                              '--rulepaths', './tests', '--watch', '--watch-interval', '0.1',
+                              str(tmp_path)],
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             universal_newlines=True, env=env)
+    def read_until(text):
+        for line in watch.stdout:
+            if text in line:
+                return line
+        return ""
+
+    try:
+        assert read_until('Visited file: ')
+        source.write_text("int a;\nint not_a;\n")
+        stat = os.stat(str(source))
+        os.utime(str(source), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert 'printRowsWithWord' in read_until('new: ')
+    finally:
+        watch.send_signal(signal.SIGINT)
+        watch.wait(timeout=10)
+    assert watch.returncode == 3
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="no Unix domain sockets")
+def test_daemon(tmp_path):
+    """ This integration test confirms that a daemon checks files and buffers sent by the client
+    as a command line run would, and stops when asked to.
+    """
+    socket_path = str(tmp_path / 'rulecheck.sock')
+    daemon = subprocess.Popen(['rulecheck', '-c', './tests/integration/rules1.json',
+                               '--rulepaths', './tests', '--daemon', socket_path],
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        for _ in range(100):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        assert send_request(socket_path, {"command": "ping"}) == {"pong": True}
+
+        def client(*client_args, stdin=None):
+            return subprocess.run([sys.executable, '-m', 'rulecheck.client', '-s', socket_path,
+                                   *client_args], input=stdin, stdout=subprocess.PIPE,
+                                  universal_newlines=True, check=False)
+
+        source = './tests/src/network/udp/udp-client.c'
+        local = subprocess.run(['rulecheck', '-c', './tests/integration/rules1.json',
+                                '--rulepaths', './tests', source], stdout=subprocess.PIPE,
+                               universal_newlines=True, check=False)
+        result = client(source)
+        assert result.returncode == local.returncode == 3
+        violations = result.stdout.splitlines()
+        assert violations
+        assert all(violation in local.stdout.splitlines() for violation in violations)
+
+        result = client('--format', 'jsonl', '--stdin-name', 'unsaved.c',
+                        stdin="int udp;\nint b;\n")
+        results = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [(r["file"], r["line"], r["rule"]) for r in results] == \
+            [('unsaved.c', None, 'rulepack1.printFilename'),
+             ('unsaved.c', 1, 'rulepack1.printRowsWithWord')]
+
+        assert send_request(socket_path, {"files": ["-"]})["error"]
+        assert client('--stop').returncode == 0
+        daemon.wait(10)
+        assert not os.path.exists(socket_path)
+    finally:
+        if daemon.poll() is None:
+            daemon.kill()
@@ -1,5 +1,6 @@
 from lxml import etree as ET
 from rulecheck import rule
+from rulecheck.srcml import Srcml
 
 class findSingleLineCommentsWith(rule.Rule):
 
@@ -13,7 +14,14 @@ class findSingleLineCommentsWith(rule.Rule):
     def get_rule_type(self)->rule.RuleType:
         return rule.RuleType.SRCML
 
-    def visit_xml_comment_start(self, pos:rule.LogFilePosition, element : ET.Element):
+    def is_cacheable(self) -> bool:
+        return True
+
+    # The text is only complete once the element ends, so it is read from the end visitor, and
+    # the violation reported where the comment starts.
+    def visit_xml_comment_end(self, pos:rule.LogFilePosition, element : ET.Element):
         if "type" in element.attrib:
             if element.attrib["type"] == "line":
-                self.log(rule.LogType.WARNING, pos, "Found line comment " + element.text)
+                line, col = Srcml.get_pos_row_col(element, "start")
+                self.log(rule.LogType.WARNING, rule.LogFilePosition(line, col),
+                         "Found line comment " + element.text)
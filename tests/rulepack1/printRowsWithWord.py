@@ -15,6 +15,9 @@ class printRowsWithWord(rule.Rule):
     def get_rule_type(self)->rule.RuleType:
         return rule.RuleType.LINE
 
+    def is_cacheable(self) -> bool:
+        return True
+
     def visit_file_line(self, pos:rule.LogFilePosition, line:str):
         col = line.find(self._word)
         if col >= 0:
@@ -0,0 +1,96 @@
+import io
+
+import pytest
+
+from rulecheck import engine
+from rulecheck.api import Checker
+from rulecheck.compiled_ignore import CompiledIgnoreList
+from rulecheck.compiled_ignore import compile_ignore_list
+from rulecheck.ignore import read_ignore_list
+from rulecheck.rule import LogType
+from rulecheck.rule import Rule
+
+def test_check_text():
+    """ Confirm text is checked as the content of the named file, without the file existing,
+        and violations are returned rather than printed. """
+    checker = Checker(['./tests/integration/rules1.json'], ['./tests'])
+
+    violations = checker.check('unsaved/a.c', "int a;\nint not_b;\n")
+    assert [(v.file_name, v.line, v.rule_name) for v in violations] == \
+           [('unsaved/a.c', -1, 'rulepack1.printFilename'),
+            ('unsaved/a.c', 2, 'rulepack1.printRowsWithWord')]
+    assert violations[1].log_type == LogType.WARNING
+    assert violations[1].message == "use of the word not : int not_b;"
+
+    violations = list(checker.iter_violations([('b.c', "int not_b;\n"),
+                                               ('c.txt', "int c;\n", 'C')]))
+    assert [(v.file_name, v.line) for v in violations] == [('b.c', -1), ('b.c', 1), ('c.txt', -1)]
+
+def test_load_error():
+    """ Confirm a configuration rulecheck can not load raises ValueError. """
+    with pytest.raises(ValueError, match="Bad --register-ext option"):
+        Checker(['./tests/integration/rules1.json'], options=['--register-ext', 'pc'])
+
+def test_invalid_option():
+    """ Confirm an option rulecheck does not accept raises ValueError rather than exiting. """
+    with pytest.raises(ValueError, match="--no-such-option"):
+        Checker(['./tests/integration/rules1.json'], options=['--no-such-option'])
+
+def test_checkers_configured_differently():
+    """ Confirm each Checker keeps its own settings when another is created and used. """
+    checker_a = Checker(['./tests/integration/rules1.json'], ['./tests'])
+    checker_b = Checker(['./tests/integration/rules1.json'], ['./tests'],
+                        options=['--Werror', '-g'])
+
+    text = "int not_b;\n"
+    for _ in range(2):
+        violations_a = checker_a.check('a.c', text)
+        violations_b = checker_b.check('b.c', text)
+        assert [v.log_type for v in violations_a] == [LogType.WARNING, LogType.WARNING]
+        assert [v.log_type for v in violations_b] == [LogType.ERROR, LogType.ERROR]
+        assert [v.file_name for v in violations_a] == ['a.c', 'a.c']
+        assert [v.file_name for v in violations_b] == ['b.c', 'b.c']
+
+def test_srcml_only_required_by_srcml_rules(mocker):
+    """ Confirm the srcml binary is only required if a loaded rule visits srcml elements. """
+    mocker.patch('rulecheck.engine.shutil.which', return_value=None)
+
+    checker = Checker(['./tests/integration/rules1.json'], ['./tests'])
+    assert [v.line for v in checker.check('a.c', "int not_a;\n")] == [-1, 1]
+
+    with pytest.raises(ValueError, match="Could not locate srcml binary"):
+        Checker(['./tests/integration/rules2.json'], ['./tests'])
+
+def test_engine_globals_untouched(tmp_path):
+    """ Confirm creating and using a Checker leaves the globals of the command line alone. """
+    names = ['VERBOSE_ENABLED', 'RULE_PROFILER', 'FILE_TIMINGS', 'TRACER', 'GIT_DIFF',
+             'IGNORE_FILTER']
+    engine_globals = [vars(engine).get(name) for name in names]
+    log_function = Rule._Rule__log_function  #pylint: disable=protected-access
+
+    checker = Checker(['./tests/integration/rules1.json'], ['./tests'],
+                      options=['--verbose', '--profile-rules', str(tmp_path / "profile.json"),
+                               '--trace', str(tmp_path / "trace.json"), '--timing-report', '1'])
+    assert [v.line for v in checker.check('a.c', "int not_a;\n")] == [-1, 1]
+    checker.close()
+
+    assert [vars(engine).get(name) for name in names] == engine_globals
+    assert Rule._Rule__log_function is log_function  #pylint: disable=protected-access
+
+def test_close_compiled_ignore_list(tmp_path, mocker):
+    """ Confirm a Checker used as a context manager closes its compiled ignore list on exit. """
+    checker = Checker(['./tests/integration/rules1.json'], ['./tests'])
+    violation = checker.check('a.c', "int not_a;\n")[1]
+    checker.close()
+
+    ignore_list = violation.ignore_hash + ": a.c:1:1: WARNING: " + violation.rule_name + \
+                  ": " + violation.message + "\n"
+    compiled_file = str(tmp_path / "ignore.bin")
+    with open(compiled_file, "wb") as output:
+        compile_ignore_list(read_ignore_list(io.StringIO(ignore_list), False), output)
+
+    close = mocker.spy(CompiledIgnoreList, 'close')
+    with Checker(['./tests/integration/rules1.json'], ['./tests'], compiled_file) as checker:
+        assert [v.line for v in checker.check('a.c', "int not_a;\n")] == [-1]
+        assert close.call_count == 0
+    assert close.call_count == 1
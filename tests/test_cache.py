@@ -0,0 +1,178 @@
+import os
+import time
+
+from rulecheck.cache import DiskCache
+from rulecheck.cache import get_cache_key
+from rulecheck.ignore import IgnoreFilter
+from rulecheck.logger import Logger
+from rulecheck.result_cache import ResultCache
+from rulecheck.rule import LogFilePosition
+from rulecheck.rule import LogType
+from rulecheck.srcml import Srcml
+
+#pylint: disable=protected-access
+
+def test_cache_key():
+    """ Confirm cache keys depend on every part and on how the parts are split. """
+    assert get_cache_key(b"abc", "C") == get_cache_key("abc", b"C")
+    assert get_cache_key("abc", "C") != get_cache_key("abc", "C++")
+    assert get_cache_key("ab", "cC") != get_cache_key("abc", "C")
+
+def test_put_and_get(tmp_path):
+    """ Confirm values are stored compressed and can be read back, including by another
+        cache object sharing the same directory. """
+    cache = DiskCache(str(tmp_path), 1024 * 1024, False)
+    key = get_cache_key("value")
+    value = b"<unit>" + b"x" * 10000 + b"</unit>"
+
+    assert cache.get(key) is None
+    cache.put(key, value)
+    assert cache.get(key) == value
+    assert 0 < cache.get_size() < len(value)
+
+    assert DiskCache(str(tmp_path), 1024 * 1024, False).get(key) == value
+
+def test_put_again_replaces_size(tmp_path):
+    """ Confirm writing an entry again counts only the size of the new value. """
+    cache = DiskCache(str(tmp_path), 1024 * 1024, False)
+    key = get_cache_key("value")
+    cache.put(key, b"x" * 10000)
+    size = cache.get_size()
+
+    cache.put(key, b"x" * 10000)
+    assert cache.get_size() == size
+    cache.put(key, b"y")
+    assert cache.get_size() == os.path.getsize(cache._get_path(key))
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    """ Confirm a corrupt entry is treated as a miss and removed. """
+    cache = DiskCache(str(tmp_path), 1024 * 1024, False)
+    key = get_cache_key("value")
+    cache.put(key, b"value")
+    with open(cache._get_path(key), 'wb') as file_stream:
+        file_stream.write(b"not compressed")
+
+    assert cache.get(key) is None
+    assert not os.path.exists(cache._get_path(key))
+
+def test_least_recently_used_are_evicted(tmp_path):
+    """ Confirm the size cap evicts the entries that were least recently used. """
+    keys = [get_cache_key(str(i)) for i in range(4)]
+    # Incompressible values, so the compressed sizes are predictable.
+    values = [os.urandom(1000) for _ in keys]
+    cache = DiskCache(str(tmp_path), 3500, False)
+
+    for key, value in zip(keys[0:3], values[0:3]):
+        cache.put(key, value)
+    # Make key 1 the least and key 0 the most recently used entry.
+    for age, key in zip([100, 300, 200], keys[0:3]):
+        old_time = time.time() - age
+        os.utime(cache._get_path(key), (old_time, old_time))
+
+    cache.put(keys[3], values[3])
+
+    assert cache.get(keys[0]) == values[0]
+    assert cache.get(keys[3]) == values[3]
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) == values[2]
+    assert cache.get_size() <= 3500
+
+def test_stale_temp_files_are_removed(tmp_path):
+    """ Confirm temporary files abandoned by a process that died while writing are removed on
+        eviction, while recent ones, which may still be written, are kept. """
+    cache = DiskCache(str(tmp_path), 1500, False)
+    key = get_cache_key("value")
+    cache.put(key, os.urandom(1000))
+
+    sub_dir = os.path.dirname(cache._get_path(key))
+    stale_path = os.path.join(sub_dir, "stale.tmp")
+    recent_path = os.path.join(sub_dir, "recent.tmp")
+    for path in (stale_path, recent_path):
+        with open(path, 'wb') as file_stream:
+            file_stream.write(os.urandom(1000))
+    old_time = time.time() - DiskCache.STALE_TEMP_SECONDS - 60
+    os.utime(stale_path, (old_time, old_time))
+
+    cache.put(get_cache_key("other"), os.urandom(1000))
+
+    assert not os.path.exists(stale_path)
+    assert os.path.exists(recent_path)
+
+def test_srcml_uses_cache(tmp_path, mocker):
+    """ Confirm srcml is only run when the file content (or srcml settings) changed. """
+    source_file = tmp_path / "main.c"
+    source_file.write_text("int a;\n")
+
+    srcml = Srcml("srcml", ["--tabs=4"], False)
+    mocker.patch.object(srcml, "get_version", return_value="srcml 1.0.0")
+    run = mocker.patch.object(srcml, "_run", return_value=b"<unit/>")
+    srcml.set_cache(DiskCache(str(tmp_path / "cache"), 1024 * 1024, False))
+
+    assert srcml.get_srcml(str(source_file)) == b"<unit/>"
+    assert srcml.get_srcml(str(source_file)) == b"<unit/>"
+    assert run.call_count == 1
+
+    source_file.write_text("int b;\n")
+    srcml.get_srcml(str(source_file))
+    assert run.call_count == 2
+
+    srcml._srcml_args = ["--tabs=8"]
+    srcml.get_srcml(str(source_file))
+    assert run.call_count == 3
+
+def test_result_cache_replays_violations_and_disables(tmp_path, capsys):
+    """ Confirm replayed results produce the same output and counts as the recorded run,
+        including violations suppressed by NORC comments seen while recording. """
+    logger = Logger()
+    logger.set_tab_size(4)
+    logger.set_show_hash(False)
+    logger.set_warnings_are_errors(False)
+    ignore_filter = IgnoreFilter(None, False)
+    logger.set_ignore_filter(ignore_filter)
+    logger.set_verbose(False)
+
+    lines = ["int a;\n", "int b; // NORC\n", "int c;\n"]
+    result_cache = ResultCache(DiskCache(str(tmp_path), 1024 * 1024, False), "identity",
+                               logger, ignore_filter)
+    key = result_cache.get_key("a.c", lines)
+    assert not result_cache.has(key)
+    assert not result_cache.replay(key, "a.c", lines)
+
+    def run_rules():
+        ignore_filter.init_filter("a.c")
+        logger.log_violation(LogType.WARNING, LogFilePosition(1, 1), "first", False, "a.c",
+                             "rule", lines)
+        ignore_filter.disable("rule", 2)
+        logger.log_violation(LogType.ERROR, LogFilePosition(2, 1), "second", False, "a.c",
+                             "rule", lines)
+        logger.log_violation(LogType.ERROR, LogFilePosition(3, 1), "third", False, "a.c",
+                             "rule", lines)
+
+    result_cache.start_recording()
+    run_rules()
+    result_cache.stop_recording(key)
+    recorded_output = capsys.readouterr().out
+    recorded_counts = logger.get_counts()
+    assert "first" in recorded_output and "second" not in recorded_output
+
+    assert result_cache.has(key)
+    assert result_cache.replay(key, "a.c", lines)
+    assert capsys.readouterr().out == recorded_output
+    assert logger.get_counts() == tuple(count * 2 for count in recorded_counts)
+
+    # Identity and content are part of the key.
+    assert ResultCache(None, "other", logger, ignore_filter).get_key("a.c", lines) != key
+    assert result_cache.get_key("a.c", lines[0:2]) != key
+
+def test_result_cache_discards_incomplete_recording(tmp_path):
+    """ Confirm nothing is stored when recording is stopped without a key. """
+    logger = Logger()
+    ignore_filter = IgnoreFilter(None, False)
+    logger.set_ignore_filter(ignore_filter)
+    result_cache = ResultCache(DiskCache(str(tmp_path), 1024 * 1024, False), "identity",
+                               logger, ignore_filter)
+    key = result_cache.get_key("a.c", [])
+
+    result_cache.start_recording()
+    result_cache.stop_recording(None)
+    assert not result_cache.has(key)
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from rulecheck.compiled_ignore import CompiledIgnoreList
+from rulecheck.compiled_ignore import compile_ignore_list
+from rulecheck.compiled_ignore import is_compiled_ignore_list
+from rulecheck.ignore import IgnoreFilter
+from rulecheck.ignore import read_ignore_list
+
+IGNORE_LIST = \
+"""11111111111111111111111111111111: src/a.c:2:1: WARNING: rule1: first
+22222222222222222222222222222222: src/a.c:5:1: ERROR: rule2: second
+33333333333333333333333333333333: src/b.c:2:1: WARNING: rule1: third
+44444444444444444444444444444444: src/b.c: WARNING: rule1: no line number
+AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA: src/d.c:7:1: WARNING: rule3: fourth
+"""
+
+@pytest.fixture(name="compiled_file")
+def fixture_compiled_file(tmp_path):
+    compiled_file = str(tmp_path / "ignore.bin")
+    with open(compiled_file, "wb") as output:
+        compile_ignore_list(read_ignore_list(io.StringIO(IGNORE_LIST), False), output)
+    return compiled_file
+
+def test_compiled_entries_match_text(compiled_file):
+    """ Confirm a compiled ignore list returns the same entries as the text it was compiled
+        from. """
+    file_ignores = read_ignore_list(io.StringIO(IGNORE_LIST), False)
+    assert is_compiled_ignore_list(compiled_file)
+
+    compiled = CompiledIgnoreList(compiled_file)
+    assert compiled.get_file_count() == 3
+    for file_name in ["src/a.c", "src/b.c", "src/d.c"]:
+        assert sorted(compiled.get(file_name)) == sorted(file_ignores[file_name])
+    for file_name in ["src/0.c", "src/c.c", "src/z.c", ""]:
+        assert compiled.get(file_name, []) == []
+    compiled.close()
+
+def test_compiled_ignore_filter(compiled_file):
+    """ Confirm an IgnoreFilter using a compiled ignore list filters like one using the text. """
+    compiled_file_ignores = CompiledIgnoreList(compiled_file)
+    ignore_filter = IgnoreFilter(None, False, compiled_file_ignores)
+
+    ignore_filter.init_filter("src/a.c")
+    assert ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+    assert not ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+    assert ignore_filter.is_filtered("rule2", 5, "22222222222222222222222222222222")
+
+    ignore_filter.init_filter("src/b.c")
+    assert ignore_filter.is_filtered("rule1", -1, "44444444444444444444444444444444")
+
+    ignore_filter.close()
+    with pytest.raises(ValueError):
+        compiled_file_ignores.get("src/a.c")
+
+def test_hashes_are_lower_case():
+    """ Confirm upper case hashes of a text ignore list match, as they do once compiled. """
+    ignore_filter = IgnoreFilter(io.StringIO(IGNORE_LIST), False)
+    ignore_filter.init_filter("src/d.c")
+    assert ignore_filter.is_filtered("rule3", 7, "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa")
+
+def test_text_is_not_compiled(tmp_path):
+    """ Confirm text ignore lists are recognized as such and rejected by CompiledIgnoreList. """
+    text_file = tmp_path / "ignore.txt"
+    text_file.write_text(IGNORE_LIST)
+    assert not is_compiled_ignore_list(str(text_file))
+    with pytest.raises(ValueError):
+        CompiledIgnoreList(str(text_file))
@@ -0,0 +1,46 @@
+import socket
+import threading
+
+import pytest
+
+from rulecheck.client import send_request
+from rulecheck.logger import Logger
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+                                reason="no Unix domain sockets")
+
+@pytest.fixture(name="server")
+def fixture_server(tmp_path, mocker):
+    from rulecheck.daemon import DaemonServer  #pylint: disable=import-outside-toplevel
+
+    file_manager = mocker.Mock()
+    file_manager.get_file_count.return_value = 0
+    server = DaemonServer(str(tmp_path / 'rulecheck.sock'), file_manager, Logger())
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    yield server
+    if thread.is_alive():
+        send_request(server.server_address, {"command": "stop"})
+    thread.join(10)
+    assert not thread.is_alive()
+
+def test_idle_connection_does_not_block(server):
+    """ Confirm a client keeping its connection open does not hold up the requests of others,
+        nor stopping the daemon. """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+        idle.connect(server.server_address)
+        idle.settimeout(10)
+        assert send_request(server.server_address, {"command": "ping"}) == {"pong": True}
+        assert send_request(server.server_address, {"files": []})["files_checked"] == 0
+        assert send_request(server.server_address, {"command": "stop"}) == {"stopped": True}
+
+def test_unexpected_error_is_answered(server, mocker):
+    """ Confirm a request failing with any exception is answered with an error and the daemon
+        keeps serving. """
+    server._file_manager.process_text = \
+        mocker.Mock(side_effect=RuntimeError("rule failed"))  #pylint: disable=protected-access
+
+    request = {"buffers": [{"file": "a.c", "text": "int a;\n"}]}
+    assert send_request(server.server_address, request) == \
+           {"error": "RuntimeError: rule failed"}
+    assert send_request(server.server_address, {"command": "ping"}) == {"pong": True}
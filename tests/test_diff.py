@@ -0,0 +1,69 @@
+import os
+import sys
+
+from rulecheck.diff import GitDiff
+
+DIFF = """diff --git a/src/a.c b/src/a.c
+index 1111111..2222222 100644
+--- a/src/a.c
++++ b/src/a.c
+@@ -3 +3 @@ int main()
+-int a;
++int b;
+@@ -10,0 +11,3 @@ int main()
++int c;
++++ d;
++@@ -1 +40 @@
+@@ -20,2 +21,0 @@ int main()
+-int e;
+-int f;
+diff --git a/old.c b/old.c
+deleted file mode 100644
+--- a/old.c
++++ /dev/null
+@@ -1 +0,0 @@
+-int a;
+diff --git a/new file.c b/new file.c
+new file mode 100644
+--- /dev/null
++++ b/new file.c
+@@ -0,0 +1,3 @@
++int a;
++int b;
++int c;
+diff --git "a/tab\\there.c" "b/tab\\there.c"
+--- "a/tab\\there.c"
++++ "b/tab\\there.c"
+@@ -1 +1 @@
+-@@ -1 +5 @@
++int x;
+"""
+
+def test_parse_diff(tmp_path):
+    """ Confirm changed files and lines are read from git diff -U0 output. """
+    top = str(tmp_path)
+    git_diff = GitDiff(GitDiff.parse(DIFF, top))
+
+    a_file = os.path.join(top, "src", "a.c")
+    assert git_diff.get_changed_files() == sorted([a_file, os.path.join(top, "new file.c"),
+                                                   os.path.join(top, "tab\there.c")])
+    assert [line for line in range(1, 30) if git_diff.is_changed_line(a_file, line)] == \
+           [3, 11, 12, 13]
+    assert git_diff.is_changed_line(os.path.join(top, "new file.c"), 3)
+    assert git_diff.is_changed_line(os.path.join(top, "tab\there.c"), 1)
+    assert not git_diff.is_changed_line(os.path.join(top, "tab\there.c"), 5)
+    assert not git_diff.is_changed_file(os.path.join(top, "old.c"))
+    assert not git_diff.is_changed_line(os.path.join(top, "old.c"), 1)
+
+def test_add_untracked(tmp_path):
+    """ Confirm every line of an untracked file is changed. """
+    top = str(tmp_path)
+    changed_lines = GitDiff.parse(DIFF, top)
+    GitDiff.add_untracked(changed_lines, ["src/new.c", ""], top)
+    git_diff = GitDiff(changed_lines)
+
+    new_file = os.path.join(top, "src", "new.c")
+    assert new_file in git_diff.get_changed_files()
+    assert git_diff.is_changed_line(new_file, 1)
+    assert git_diff.is_changed_line(new_file, sys.maxsize)
+    assert len(git_diff.get_changed_files()) == 4
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from rulecheck.file_manager import FileManager
+from rulecheck.logger import Logger
+
+#pylint: disable=protected-access
+#pylint: disable=redefined-outer-name
+
+@pytest.fixture
+def source_files(tmp_path):
+    """ Pytest fixture creating a set of small C source files """
+    file_paths = []
+    for i in range(6):
+        file_path = tmp_path / ("file" + str(i) + ".c")
+        file_path.write_text("int a" + str(i) + ";\n")
+        file_paths.append(str(file_path))
+    return file_paths
+
+def test_srcml_jobs_keep_input_order(source_files, srcml, mock_rules, mocker):
+    """ Confirm files are checked in input order even when srcml runs finish out of order. """
+
+    def slow_first_srcml(file_name):
+        # Earlier files take longer, so srcml results complete in reverse order.
+        time.sleep(0.05 * (len(source_files) - source_files.index(file_name)))
+        return None
+
+    mocker.patch.object(srcml, "get_srcml", side_effect=slow_first_srcml)
+    checked = []
+    rules = mock_rules(True, lambda f: checked.append(f.get_name()))
+
+    file_manager = FileManager(rules, srcml, Logger(), False, srcml_jobs=3)
+    file_manager.process_files(source_files)
+
+    assert checked == source_files
+    assert file_manager.get_file_count() == len(source_files)
+    assert srcml.get_srcml.call_count == len(source_files)
+
+def test_batches_and_srcml_jobs(source_files, srcml, mock_rules, mocker):
+    """ Confirm batching and srcml jobs can be combined. """
+    mocker.patch.object(srcml, "get_srcml_batch",
+                        side_effect=lambda files: {f : None for f in files})
+    checked = []
+    rules = mock_rules(True, lambda f: checked.append(f.get_name()))
+
+    file_manager = FileManager(rules, srcml, Logger(), False, batch_size=4, srcml_jobs=2)
+    file_manager.process_files(source_files)
+
+    assert checked == source_files
+    assert srcml.get_srcml_batch.call_count == 2
+
+def test_srcml_not_run_when_not_needed(source_files, srcml, mock_rules, mocker):
+    """ Confirm srcml is skipped when no loaded rule visits srcml elements. """
+    mocker.patch.object(srcml, "get_srcml")
+    mocker.patch.object(srcml, "get_srcml_batch")
+    checked = []
+    rules = mock_rules(False, lambda f: checked.append((f.get_name(), f.has_srcml())))
+
+    file_manager = FileManager(rules, srcml, Logger(), False, batch_size=4, srcml_jobs=2)
+    file_manager.process_files(source_files)
+    file_manager.process_file(source_files[0])
+
+    assert checked == [(f, False) for f in source_files + source_files[0:1]]
+    assert srcml.get_srcml.call_count == 0
+    assert srcml.get_srcml_batch.call_count == 0
+
+def test_process_text(tmp_path, srcml, mock_rules, mocker):
+    """ Confirm text is checked as the content of a file, which does not need to exist, with
+        lines split as reading the file would split them. """
+    mocker.patch.object(srcml, "get_srcml_text", return_value=None)
+    checked = []
+    rules = mock_rules(True, lambda f: checked.append((f.get_name(), f.get_lines())))
+
+    file_path = str(tmp_path / "unsaved.c")
+    file_manager = FileManager(rules, srcml, Logger(), False)
+    file_manager.process_text(file_path, "int a;\r\nint b;\rint c;\n\x0cint d;")
+
+    assert checked == [(file_path, ["int a;\r\n", "int b;\r", "int c;\n", "\x0cint d;"])]
+    srcml.get_srcml_text.assert_called_once_with("int a;\r\nint b;\rint c;\n\x0cint d;",
+                                                 file_path, None)
+    assert file_manager.get_file_count() == 1
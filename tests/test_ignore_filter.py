@@ -0,0 +1,81 @@
+import io
+
+from rulecheck.ignore import IgnoreEntry
+from rulecheck.ignore import IgnoreFilter
+from rulecheck.ignore import IgnoreIndex
+
+IGNORE_LIST = \
+"""11111111111111111111111111111111: src/a.c:2:1: WARNING: rule1: first
+22222222222222222222222222222222: src/a.c:5:1: ERROR: rule2: second
+33333333333333333333333333333333: src/b.c:2:1: WARNING: rule1: third
+not an ignore list entry
+"""
+
+def test_ignore_list_read_once():
+    """ Confirm the ignore list is read when the filter is created and entries are selected by
+        file name. """
+    ignore_list = io.StringIO(IGNORE_LIST)
+    ignore_filter = IgnoreFilter(ignore_list, False)
+    # The handle is no longer used once the filter is created.
+    ignore_list.close()
+
+    ignore_filter.init_filter("src/a.c")
+    assert ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+    assert ignore_filter.is_filtered("rule2", 5, "22222222222222222222222222222222")
+    assert not ignore_filter.is_filtered("rule1", 2, "33333333333333333333333333333333")
+
+    ignore_filter.init_filter("src/b.c")
+    assert not ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+    assert ignore_filter.is_filtered("rule1", 2, "33333333333333333333333333333333")
+
+    ignore_filter.init_filter("src/c.c")
+    assert not ignore_filter.is_filtered("rule1", 2, "33333333333333333333333333333333")
+
+def test_ignore_list_entries_are_fresh_per_file():
+    """ Confirm an entry is only used once per check of a file, but is available again when the
+        file is checked again. """
+    ignore_filter = IgnoreFilter(io.StringIO(IGNORE_LIST), False)
+
+    for _ in range(2):
+        ignore_filter.init_filter("src/a.c")
+        assert ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+        assert not ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+
+def test_ignore_list_without_file():
+    """ Confirm a filter without an ignore list only applies disabled lines. """
+    ignore_filter = IgnoreFilter(None, False)
+
+    ignore_filter.init_filter("src/a.c")
+    assert not ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+    ignore_filter.disable("rule1", 2)
+    assert ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+    assert ignore_filter.is_filtered("rule1", 2, "11111111111111111111111111111111")
+
+def test_ignore_index_intervals():
+    """ Confirm wildcard entries cover their whole range, regardless of the order they were
+        added in, and are never used up. """
+    index = IgnoreIndex()
+    index.add(IgnoreEntry('*', 50, 'Inf'))
+    index.add(IgnoreEntry('*', 10, 20))
+    index.add(IgnoreEntry('*', 12, 14))
+    index.add(IgnoreEntry('*', 30, 30))
+
+    for line_num in [10, 14, 15, 20, 30, 50, 1000000]:
+        assert index.is_filtered(line_num, "11111111111111111111111111111111")
+        assert index.is_filtered(line_num, "11111111111111111111111111111111")
+    for line_num in [-1, 9, 21, 29, 31, 49]:
+        assert not index.is_filtered(line_num, "11111111111111111111111111111111")
+
+def test_ignore_index_hash_entries_used_once():
+    """ Confirm each entry with a hash filters a single violation with that hash. """
+    index = IgnoreIndex()
+    index.add(IgnoreEntry("11111111111111111111111111111111", 3, 3))
+    index.add(IgnoreEntry("11111111111111111111111111111111", 3, 3))
+    index.add(IgnoreEntry("22222222222222222222222222222222", 4, 4))
+
+    assert not index.is_filtered(4, "11111111111111111111111111111111")
+    assert index.is_filtered(3, "11111111111111111111111111111111")
+    assert index.is_filtered(3, "11111111111111111111111111111111")
+    assert not index.is_filtered(3, "11111111111111111111111111111111")
+    assert index.is_filtered(4, "22222222222222222222222222222222")
+    assert not index.is_filtered(4, "22222222222222222222222222222222")
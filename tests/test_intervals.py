@@ -0,0 +1,11 @@
+from rulecheck.intervals import LineIntervals
+
+def test_line_intervals():
+    """ Confirm line lookup across ordered, unordered and nested intervals. """
+    intervals = LineIntervals()
+    for first, last in [(10, 12), (3, 3), (20, 40), (25, 26), (50, 50)]:
+        intervals.add(first, last)
+
+    assert intervals.get_intervals() == [(3, 3), (10, 12), (20, 40), (25, 26), (50, 50)]
+    assert [line for line in range(1, 60) if intervals.contains(line)] == \
+           [3, 10, 11, 12] + list(range(20, 41)) + [50]
@@ -1,5 +1,12 @@
+import io
+import json
 
 from rulecheck.engine import Logger
+from rulecheck.logger import JsonLinesSink
+from rulecheck.logger import OutputWriter
+from rulecheck.logger import SarifSink
+from rulecheck.logger import TextSink
+from rulecheck.logger import Violation
 from rulecheck import rule
 
 
@@ -222,3 +229,84 @@ def test_pos_line_out_of_range(capsys):
 
 #### TODO: Need to add ignore file list tests, don't forget to check
 # for error cases (bad handle?)
+
+def test_output_writer_buffering():
+    """ Confirm buffered lines are written in bulk once the buffer size is reached or on flush,
+        and that an unbuffered writer writes each line immediately. """
+    stream = io.StringIO()
+    writer = OutputWriter(stream, 10)
+    writer.write_line("abc")
+    writer.write_line("def")
+    assert stream.getvalue() == ""
+    writer.write_line("ghi")
+    assert stream.getvalue() == "abc\ndef\nghi\n"
+    writer.write("jkl\n")
+    assert stream.getvalue() == "abc\ndef\nghi\n"
+    writer.flush()
+    assert stream.getvalue() == "abc\ndef\nghi\njkl\n"
+
+    stream = io.StringIO()
+    writer = OutputWriter(stream)
+    writer.write_line("abc")
+    assert stream.getvalue() == "abc\n"
+
+def test_log_to_output_writer(capsys):
+    """ Confirm violations are written to the logger's output writer rather than stdout. """
+    logger = Logger()
+    logger.set_tab_size(4)
+    logger.set_show_hash(False)
+    logger.set_warnings_are_errors(False)
+    logger.set_ignore_filter(None)
+    logger.set_verbose(False)
+    stream = io.StringIO()
+    logger.set_output_sink(TextSink(OutputWriter(stream, OutputWriter.DEFAULT_BUFFER_SIZE)))
+
+    logger.log_violation(rule.LogType.WARNING, rule.LogFilePosition(2, 3), "message", False,
+                         "file.c", "rule", ["a\n", "b\n", "c\n"])
+    assert stream.getvalue() == ""
+    logger.flush_output()
+    assert stream.getvalue() == "file.c:2:3: WARNING: rule: message\n"
+    assert capsys.readouterr().out == ""
+
+def test_json_lines_sink():
+    """ Confirm each violation is written as one JSON object per line. """
+    stream = io.StringIO()
+    sink = JsonLinesSink(OutputWriter(stream))
+    sink.write_violation(Violation(rule.LogType.ERROR, rule.LogFilePosition(2, 3), "first",
+                                   "src/a.c", "rule1", "11111111111111111111111111111111"))
+    sink.write_violation(Violation(rule.LogType.WARNING, rule.LogFilePosition(-1, -1), "second",
+                                   "src/a.c", "rule2", "22222222222222222222222222222222"))
+    sink.finish()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0]) == {"hash": "11111111111111111111111111111111",
+                                    "file": "src/a.c", "line": 2, "col": 3,
+                                    "severity": "ERROR", "rule": "rule1", "message": "first"}
+    assert json.loads(lines[1])["line"] is None
+
+def test_sarif_sink():
+    """ Confirm the SARIF output is a single, valid JSON document, with or without results. """
+    stream = io.StringIO()
+    SarifSink(OutputWriter(stream), "1.0").finish()
+    assert json.loads(stream.getvalue())["runs"][0]["results"] == []
+
+    stream = io.StringIO()
+    sink = SarifSink(OutputWriter(stream, OutputWriter.DEFAULT_BUFFER_SIZE), "1.0")
+    sink.write_violation(Violation(rule.LogType.ERROR, rule.LogFilePosition(2, 3), "first",
+                                   "src/a.c", "rule1", "11111111111111111111111111111111"))
+    sink.write_violation(Violation(rule.LogType.WARNING, rule.LogFilePosition(-1, -1), "second",
+                                   "src/b.c", "rule2", "22222222222222222222222222222222"))
+    sink.finish()
+
+    sarif = json.loads(stream.getvalue())
+    assert sarif["version"] == "2.1.0"
+    assert sarif["runs"][0]["tool"]["driver"]["version"] == "1.0"
+    results = sarif["runs"][0]["results"]
+    assert [result["ruleId"] for result in results] == ["rule1", "rule2"]
+    assert [result["level"] for result in results] == ["error", "warning"]
+    assert results[0]["locations"][0]["physicalLocation"] == \
+        {"artifactLocation": {"uri": "src/a.c"}, "region": {"startLine": 2, "startColumn": 3}}
+    assert "region" not in results[1]["locations"][0]["physicalLocation"]
+    assert results[1]["partialFingerprints"] == \
+        {"rulecheckIgnoreHash/v1": "22222222222222222222222222222222"}
@@ -0,0 +1,74 @@
+import json
+
+from rulecheck.profiler import FileTimings
+from rulecheck.profiler import Tracer
+
+#pylint: disable=protected-access
+
+def test_file_timings_nested_stages(mocker):
+    """ Confirm time in a nested stage is only counted for that stage. """
+    mocker.patch("rulecheck.profiler.time.perf_counter", side_effect=[0.0, 1.0, 3.0, 10.0])
+    file_timings = FileTimings(5)
+
+    file_timings.start_file("a.c")
+    with file_timings.stage("rules"):
+        with file_timings.stage("ignore"):
+            pass
+    file_timings.end_file()
+
+    assert file_timings.get_totals()["rules"] == 8.0
+    assert file_timings.get_totals()["ignore"] == 2.0
+    assert file_timings.get_slowest() == [("a.c", {"read": 0.0, "srcml": 0.0, "parse": 0.0,
+                                                   "rules": 8.0, "ignore": 2.0})]
+
+def test_file_timings_slowest_files():
+    """ Confirm only the slowest files are kept, also when merging stats from elsewhere. """
+    file_timings = FileTimings(2)
+    other_timings = FileTimings(2)
+    for i, seconds in enumerate([3.0, 1.0, 4.0, 1.5, 5.0, 9.0, 2.0]):
+        timings = file_timings if i % 2 == 0 else other_timings
+        timings.start_file(str(i) + ".c")
+        timings._file_stages["rules"] = seconds
+        timings.end_file()
+        timings.add_total("srcml", 1.0)
+
+    file_timings.add_stats(other_timings.pop_stats())
+    assert [file_name for file_name, _ in file_timings.get_slowest()] == ["5.c", "4.c"]
+    assert file_timings.get_totals()["srcml"] == 7.0
+    assert not other_timings.get_slowest()
+    assert other_timings.get_totals()["srcml"] == 0.0
+
+def test_tracer_events(mocker, tmp_path):
+    """ Confirm spans are recorded in microseconds with their process and thread, and are written
+        out with process and thread names, including spans added from elsewhere. """
+    mocker.patch("rulecheck.profiler.time.perf_counter", side_effect=[1.0, 2.0, 2.5, 4.0])
+    tracer = Tracer()
+    other_tracer = Tracer()
+
+    tracer.start_file("a.c")
+    with tracer.stage("rules"):
+        pass
+    tracer.end_file()
+
+    events = tracer.pop_events()
+    assert [(event["name"], event["cat"], event["ts"], event["dur"])
+            for event in events["events"]] == [("rules", "stage", 2000000.0, 500000.0),
+                                               ("a.c", "file", 1000000.0, 3000000.0)]
+    assert events["events"][0]["args"] == {"file": "a.c"}
+    assert not tracer.pop_events()["events"]
+
+    # Spans of a worker process, as passed back to the main process.
+    events["events"][0]["pid"] = 1
+    events["thread_names"] = [[[1, 2], "worker thread"]]
+    other_tracer.add_events(events)
+    trace_file = tmp_path / "trace.json"
+    other_tracer.write(str(trace_file))
+
+    trace = json.loads(trace_file.read_text())
+    assert trace["displayTimeUnit"] == "ms"
+    metadata = [event for event in trace["traceEvents"] if event["ph"] == "M"]
+    assert {"name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+            "args": {"name": "rulecheck worker 1"}} in metadata
+    assert {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2,
+            "args": {"name": "worker thread"}} in metadata
+    assert len([event for event in trace["traceEvents"] if event["ph"] == "X"]) == 2
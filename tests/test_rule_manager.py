@@ -5,6 +5,7 @@ Created on Apr 2, 2020
 '''
 
 import sys
+import itertools
 import pathlib
 import json
 
@@ -13,6 +14,8 @@ from rulecheck.file import File
 from rulecheck.engine import RuleManager
 from rulecheck.engine import IgnoreFilter
 from rulecheck.engine import Srcml
+from rulecheck.profiler import RuleProfiler
+from rulecheck.profiler import Tracer
 from rulecheck import rule
 
 #pylint: disable=protected-access
@@ -318,6 +321,129 @@ def test_visit_xml(rule_manager, mocker):
     assert rule1.visit_any_other_xml_element_start.call_count == 1
 
 
+def test_visit_xml_dispatch_tables(rule_manager, mocker):
+    """Confirm xml events only reach rules subscribed to them, tag names with underscores are
+    dispatched correctly, and the tables are rebuilt when rules are loaded."""
+    rule1 = mocker.Mock(spec_set=['visit_xml_block_content_end', 'is_active'])
+    rule1.visit_xml_block_content_end = mocker.Mock()
+    rule1.is_active = mocker.Mock(return_value = True)
+
+    rule2 = mocker.Mock(spec_set=['visit_file_line', 'is_active'])
+    rule2.visit_file_line = mocker.Mock()
+    rule2.is_active = mocker.Mock(return_value = True)
+
+    rule_manager._rules_dict['rule1'] = [rule1]
+    rule_manager._rules_dict['rule2'] = [rule2]
+
+    node = mocker.Mock()
+    node.tag = "{http://www.srcML.org/srcML/src}block_content"
+
+    rule_manager.visit_xml_all_active_rules(rule.LogFilePosition(1,5), node, "end")
+    rule_manager.visit_xml_all_active_rules(rule.LogFilePosition(1,5), node, "start")
+    node.tag = "{http://www.srcML.org/srcML/src}block"
+    rule_manager.visit_xml_all_active_rules(rule.LogFilePosition(1,5), node, "end")
+
+    rule1.visit_xml_block_content_end.assert_called_once_with(rule.LogFilePosition(1,5), node)
+    assert rule1.is_active.call_count == 1
+    assert rule2.is_active.call_count == 0
+
+    rule3 = mocker.Mock(spec_set=['visit_any_other_xml_element_end', 'is_active'])
+    rule3.visit_any_other_xml_element_end = mocker.Mock()
+    rule3.is_active = mocker.Mock(return_value = True)
+    rule_manager._rules_dict['rule3'] = [rule3]
+    rule_manager.load_rules([], None)
+
+    rule_manager.visit_xml_all_active_rules(rule.LogFilePosition(1,5), node, "end")
+
+    rule3.visit_any_other_xml_element_end.assert_called_once_with(rule.LogFilePosition(1,5), node)
+    assert rule1.is_active.call_count == 1
+
+
+def test_profiler(rule_manager, mocker):
+    """Confirm calls to each visitor of each rule are counted, and still made, when a profiler is
+    set."""
+    rule1 = mocker.Mock(spec_set=['visit_xml_block_end', 'visit_any_other_xml_element_end',
+                                  'visit_file_line', 'is_active'])
+    rule1.is_active = mocker.Mock(return_value = True)
+    rule_manager._rules_dict['rule1'] = [rule1]
+
+    profiler = RuleProfiler()
+    rule_manager.set_profiler(profiler)
+
+    node = mocker.Mock()
+    node.tag = "{http://www.srcML.org/srcML/src}block"
+    rule_manager.visit_xml_all_active_rules(rule.LogFilePosition(1,5), node, "end")
+    rule_manager.visit_xml_all_active_rules(rule.LogFilePosition(2,5), node, "end")
+    node.tag = "{http://www.srcML.org/srcML/src}name"
+    rule_manager.visit_xml_all_active_rules(rule.LogFilePosition(3,5), node, "end")
+    rule_manager.visit_file_lines(1, 3, ["a\n", "b\n", "c\n"])
+
+    assert rule1.visit_xml_block_end.call_count == 2
+    assert rule1.visit_any_other_xml_element_end.call_count == 1
+    assert rule1.visit_file_line.call_count == 3
+
+    report = profiler.get_report()
+    assert [entry["rule"] for entry in report] == ["rule1"]
+    assert report[0]["calls"] == 6
+    assert sorted((visitor["visitor"], visitor["calls"]) for visitor in report[0]["visitors"]) == \
+        [("visit_any_other_xml_element_end", 1), ("visit_file_line", 3),
+         ("visit_xml_block_end", 2)]
+
+    stats = profiler.pop_stats()
+    assert sum(stat[2] for stat in stats) == 6
+    assert not profiler.get_report()
+    profiler.add_stats(stats)
+    assert profiler.get_report()[0]["calls"] == 6
+
+
+
+def test_tracer_rule_spans(rule_manager, mocker):
+    """Confirm a span is recorded per rule and file when a tracer is set, with the calls and time
+    of each visitor, slowest rule first and laid end to end."""
+    # Every call to a visitor takes a second.
+    mocker.patch("rulecheck.profiler.time.perf_counter", side_effect=itertools.count())
+    rule1 = mocker.Mock(spec_set=['visit_file_open', 'visit_file_line', 'is_active',
+                                  'set_active'])
+    rule1.is_active = mocker.Mock(return_value = True)
+    rule2 = mocker.Mock(spec_set=['visit_file_line', 'is_active', 'set_active'])
+    rule2.is_active = mocker.Mock(return_value = True)
+    rule_manager._rules_dict['rule2'] = [rule2]
+    rule_manager._rules_dict['rule1'] = [rule1]
+
+    tracer = Tracer()
+    rule_manager.set_tracer(tracer)
+    tracer.start_file("file.c")
+    rule_manager.run_rules_on_file(File("file.c", ["line1", "line2", "line3"], None))
+    tracer.end_file()
+
+    assert rule1.visit_file_line.call_count == 3
+    spans = [event for event in tracer.pop_events()["events"] if event["cat"] == "rule"]
+    assert [(span["name"], span["dur"]) for span in spans] == [("rule1", 4000000.0),
+                                                               ("rule2", 3000000.0)]
+    assert spans[1]["ts"] == spans[0]["ts"] + 4000000.0
+    assert spans[0]["args"] == {"file": "file.c", "calls": 4, "seconds": 4.0,
+                                "visitors": {"visit_file_open": {"calls": 1, "seconds": 1.0},
+                                             "visit_file_line": {"calls": 3, "seconds": 3.0}}}
+
+    # The calls are counted anew for each file.
+    rule_manager.run_rules_on_file(File("other.c", ["line1"], None))
+    spans = [event for event in tracer.pop_events()["events"] if event["cat"] == "rule"]
+    assert [(span["name"], span["args"]["calls"]) for span in spans] == [("rule1", 2),
+                                                                         ("rule2", 1)]
+
+
+def test_needs_srcml(rule_manager, mocker):
+    """Confirm srcml is only needed when a loaded rule visits xml elements."""
+    line_rule = mocker.Mock(spec_set=['visit_file_line', 'is_active'])
+    rule_manager._rules_dict['line_rule'] = [line_rule]
+    assert not rule_manager.needs_srcml()
+
+    xml_rule = mocker.Mock(spec_set=['visit_any_other_xml_element_end', 'is_active'])
+    rule_manager._rules_dict['xml_rule'] = [xml_rule]
+    rule_manager.load_rules([], None)
+    assert rule_manager.needs_srcml()
+
+
 def test_run_rules_on_file_no_srcml_order(rule_manager, mocker):
     """Confirm order of operations performed by run_rules_on_file
     when srcml is not generated"""
@@ -0,0 +1,125 @@
+import io
+
+from lxml import etree as ET
+
+from rulecheck.file import File
+from rulecheck.srcml import Srcml
+
+#pylint: disable=protected-access
+
+SRCML_ARCHIVE = r'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<unit xmlns="http://www.srcML.org/srcML/src" revision="1.0.0">
+
+<unit xmlns:cpp="http://www.srcML.org/srcML/cpp" xmlns:pos="http://www.srcML.org/srcML/position" revision="1.0.0" language="C" filename="a.c" pos:tabs="8"><decl_stmt pos:start="1:1" pos:end="1:6">int a;</decl_stmt>
+<comment type="line" pos:start="2:1" pos:end="2:4">// a</comment>
+</unit>
+
+<unit xmlns:cpp="http://www.srcML.org/srcML/cpp" xmlns:pos="http://www.srcML.org/srcML/position" revision="1.0.0" language="C++" filename="b.cpp" pos:tabs="8">
+<comment type="line" pos:start="2:1" pos:end="2:4">// b</comment>
+</unit>
+
+</unit>
+'''.encode()
+
+def test_split_archive():
+    """ Confirm each unit of an archive becomes a stand-alone srcml document with the xml lines
+        of the unit content matching the source lines. """
+    units = Srcml.split_archive(SRCML_ARCHIVE)
+
+    assert list(units.keys()) == ["a.c", "b.cpp"]
+
+    root = ET.fromstring(units["b.cpp"])
+    assert root.tag == "{http://www.srcML.org/srcML/src}unit"
+    assert root.attrib["language"] == "C++"
+    comment = root.find("{http://www.srcML.org/srcML/src}comment")
+    assert Srcml.get_xml_line(comment, "start") == 2
+    assert Srcml.get_pos_row_col(comment, "start") == [2, 1]
+
+    root = ET.fromstring(units["a.c"])
+    assert Srcml.get_xml_line(root, "start") == 1
+    assert Srcml.get_xml_line(root, "end") == 3
+
+
+def test_get_srcml_batch(mocker):
+    """ Confirm a batch runs srcml once with per extension languages and that unreadable
+        files are not passed to srcml. """
+    srcml = Srcml("srcml", ["--position"], False)
+    run = mocker.patch.object(srcml, "_run", return_value=SRCML_ARCHIVE)
+
+    results = srcml.get_srcml_batch(["a.c", "readme.txt", "b.cpp"])
+
+    run.assert_called_once()
+    command = run.call_args[0][0]
+    assert command[0:3] == ["srcml", "--position", "--archive"]
+    assert "c=C" in command
+    assert "cpp=C++" in command
+    assert command[-2:] == ["a.c", "b.cpp"]
+
+    assert results["readme.txt"] is None
+    assert ET.fromstring(results["a.c"]).attrib["filename"] == "a.c"
+    assert ET.fromstring(results["b.cpp"]).attrib["filename"] == "b.cpp"
+
+
+def test_get_srcml_batch_falls_back_to_single_file(mocker):
+    """ Confirm files missing from the archive output are run through srcml one at a time. """
+    srcml = Srcml("srcml", [], False)
+    mocker.patch.object(srcml, "_run", return_value=None)
+    get_srcml = mocker.patch.object(srcml, "get_srcml", return_value=b"<unit/>")
+
+    results = srcml.get_srcml_batch(["a.c", "b.c"])
+
+    assert get_srcml.call_count == 2
+    assert results == {"a.c": b"<unit/>", "b.c": b"<unit/>"}
+
+
+def test_get_srcml_text(mocker):
+    """ Confirm text is passed to srcml through stdin with the language of the file name. """
+    srcml = Srcml("srcml", [], False)
+    run = mocker.patch.object(srcml, "_run", return_value=b"<unit/>")
+
+    assert srcml.get_srcml_text("int a;\n", "src/a.cpp") == b"<unit/>"
+    run.assert_called_once_with(["srcml", "--language", "C++", "--filename=src/a.cpp", "-"],
+                                b"int a;\n")
+    assert srcml.get_srcml_text("text", "readme.txt") is None
+
+    srcml.get_srcml_text("int a;\n", "buffer", "C")
+    assert run.call_args[0][0] == ["srcml", "--language", "C", "--filename=buffer", "-"]
+
+
+def test_get_xml_end_lines():
+    """ Confirm the end line table matches get_xml_line for every end tag. """
+    root = ET.fromstring(SRCML_ARCHIVE)
+
+    expected = [Srcml.get_xml_line(elem, event)
+                for event, elem in ET.iterwalk(root, events=("start", "end")) if event == "end"]
+
+    assert Srcml.get_xml_end_lines(root) == expected
+    assert expected[-1] == 11
+
+
+def test_streamed_events_match_tree_events():
+    """ Confirm streaming srcml yields the same events and lines as walking the full tree, and
+        that visited elements are discarded. """
+    tree_file = File("a.c", [], SRCML_ARCHIVE)
+    stream_file = File("a.c", [], None, io.BytesIO(SRCML_ARCHIVE))
+
+    tree_events = [(event, elem.tag, line) for event, elem, line in tree_file.iter_srcml_events()]
+
+    stream_events = []
+    for event, elem, line in stream_file.iter_srcml_events():
+        stream_events.append((event, elem.tag, line))
+        if event == "end" and elem.getparent() is not None:
+            # Nothing before this element is kept once it is being visited.
+            assert elem.getprevious() is None or elem.getprevious().getprevious() is None
+
+    assert stream_events == tree_events
+
+
+def test_streamed_srcml_parse_error(capsys):
+    """ Confirm a truncated srcml stream stops the events and reports the error. """
+    stream_file = File("a.c", [], None, io.BytesIO(SRCML_ARCHIVE[0:400]))
+
+    events = list(stream_file.iter_srcml_events())
+
+    assert events
+    assert "error parsing srcml output for a.c" in capsys.readouterr().out
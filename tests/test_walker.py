@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from rulecheck.walker import FileIdentities
+from rulecheck.walker import FileWalker
+from rulecheck.walker import GitIgnore
+
+#pylint: disable=redefined-outer-name
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """ Pytest fixture creating a small source tree and returning its path """
+    for file_name in ["main.c", "main.h", "notes.txt", ".hidden.c",
+                      "src/a.c", "src/b.cpp", "src/gen/a.gen.c",
+                      "build/out.c", "build/deep/out.c",
+                      "third_party/lib/lib.c", ".git/config.c"]:
+        file_path = tmp_path / file_name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("int a;\n")
+    return tmp_path
+
+def relative(paths, root) -> [str]:
+    return [os.path.relpath(path, str(root)).replace(os.sep, "/") for path in paths]
+
+def test_walker_matches_glob(source_tree):
+    """ Confirm patterns are matched like recursive globs, skipping hidden entries. """
+    walker = FileWalker()
+    assert relative(walker.iter_files([str(source_tree / "**" / "*.c")]), source_tree) == \
+           ["main.c", "build/out.c", "build/deep/out.c", "src/a.c", "src/gen/a.gen.c",
+            "third_party/lib/lib.c"]
+    assert relative(walker.iter_files([str(source_tree / "*" / "*.c*")]), source_tree) == \
+           ["build/out.c", "src/a.c", "src/b.cpp"]
+    # A file given without wildcards is always returned, a directory is searched.
+    assert relative(walker.iter_files([str(source_tree / ".hidden.c"),
+                                       str(source_tree / "src")]), source_tree) == \
+           [".hidden.c", "src/a.c", "src/b.cpp", "src/gen/a.gen.c"]
+
+def test_walker_extensions_and_excludes(source_tree, mocker):
+    """ Confirm files are filtered by extension and excluded directories are not searched. """
+    walker = FileWalker([".c", ".h"], ["build", "*.gen.c", "*/third_party"])
+    scandir = mocker.spy(os, "scandir")
+
+    assert relative(walker.iter_files([str(source_tree)]), source_tree) == \
+           ["main.c", "main.h", "src/a.c"]
+    scanned = relative([call.args[0] for call in scandir.call_args_list], source_tree)
+    assert "build" not in scanned
+    assert "third_party" not in scanned
+
+def test_walker_gitignore(source_tree):
+    """ Confirm .gitignore files of searched directories and their parents are applied. """
+    (source_tree / ".gitignore").write_text("# build output\n/build/\n*.txt\nlib/\n")
+    (source_tree / "src" / ".gitignore").write_text("*.c\n!a.c\n")
+
+    walker = FileWalker(None, None, True)
+    assert relative(walker.iter_files([str(source_tree / "src" / "**" / "*")]), source_tree) == \
+           ["src/a.c", "src/b.cpp"]
+    assert relative(walker.iter_files([str(source_tree / "**" / "*")]), source_tree) == \
+           ["main.c", "main.h", "src/a.c", "src/b.cpp"]
+
+def test_gitignore_patterns(tmp_path):
+    """ Confirm anchored, directory only, '**' and negated patterns. """
+    gitignore = GitIgnore(str(tmp_path), ["/top.c\n", "out/\n", "docs/**/*.md\n", "*.o\n",
+                                          "!keep.o\n", "\\#hash\n"])
+
+    def match(path, is_dir=False):
+        return gitignore.match(str(tmp_path / path), is_dir)
+
+    assert match("top.c")
+    assert match("src/top.c") is None
+    assert match("src/out", True)
+    assert match("src/out") is None
+    assert match("docs/a.md")
+    assert match("docs/x/y/a.md")
+    assert match("src/docs/a.md") is None
+    assert match("src/a.o")
+    assert match("src/keep.o") is False
+    assert match("#hash")
+
+def test_walker_skips_files_seen_before(source_tree):
+    """ Confirm a file reached through overlapping patterns, a symbolic link or a relative path
+        is only returned once. """
+    (source_tree / "link").symlink_to(source_tree / "src", target_is_directory=True)
+    (source_tree / "main_link.c").symlink_to(source_tree / "main.c")
+    identities = FileIdentities()
+
+    assert relative(FileWalker([".c"]).iter_files([str(source_tree / "src" / "*.c"),
+                                                   str(source_tree / "*" / "*.c"),
+                                                   str(source_tree / "src" / ".." / "main.c"),
+                                                   str(source_tree / "*.c")],
+                                                  identities), source_tree) == \
+           ["src/a.c", "build/out.c", "main.c"]
+    assert identities.get_duplicate_count() == 4
+    assert not identities.add(str(source_tree / "link" / "a.c"))
+    assert identities.add(str(source_tree / "missing.c"))
+    assert not identities.add(str(source_tree / "missing.c"))
+
+def test_walker_changed_files(source_tree):
+    """ Confirm only the changed files matching the patterns are returned, as they would be by
+        searching. """
+    changed_files = sorted(os.path.realpath(str(source_tree / name))
+                           for name in ["main.c", "notes.txt", ".hidden.c", "src/gen/a.gen.c",
+                                        "build/deep/out.c", "third_party/lib/lib.c"])
+    walker = FileWalker([".c", ".h"], ["build"])
+
+    for patterns in [[str(source_tree / "**" / "*.c")],
+                     [str(source_tree)],
+                     [str(source_tree / "*" / "*" / "*"), str(source_tree / ".hidden.c")],
+                     [str(source_tree / "src" / "**")]]:
+        expected = [path for path in walker.iter_files(patterns)
+                    if os.path.realpath(path) in changed_files]
+        assert list(walker.iter_changed_files(patterns, changed_files)) == expected
+
+    assert relative(walker.iter_changed_files([str(source_tree)], changed_files), source_tree) == \
+           ["main.c", "src/gen/a.gen.c", "third_party/lib/lib.c"]
@@ -0,0 +1,112 @@
+import io
+import os
+
+import pytest
+
+from rulecheck.file_manager import FileManager
+from rulecheck.logger import Logger
+from rulecheck.logger import OutputWriter
+from rulecheck.rule import LogFilePosition
+from rulecheck.rule import LogType
+from rulecheck.watch import FileWatcher
+
+#pylint: disable=redefined-outer-name
+
+@pytest.fixture
+def watched(tmp_path, srcml, mock_rules):
+    """ Pytest fixture returning a file watcher over tmp_path, whose rule warns about each line
+        containing 'bad', and the stream its changes are written to """
+    logger = Logger()
+
+    def run_rules_on_file(file):
+        if "raise" in "".join(file.get_lines()):
+            # As RuleManager logs the exception of a rule.
+            logger.log_violation(LogType.ERROR, LogFilePosition(-1, -1), "Exception in rule!",
+                                 False, "rulecheck", "word", [])
+        for line_num, line in enumerate(file.get_lines(), 1):
+            if "bad" in line:
+                logger.log_violation(LogType.WARNING, LogFilePosition(line_num, -1),
+                                     "bad: " + line.strip(), False, file.get_name(), "word",
+                                     file.get_lines())
+
+    rules = mock_rules(False, run_rules_on_file)
+    file_manager = FileManager(rules, srcml, logger, False)
+    stream = io.StringIO()
+    watcher = FileWatcher(file_manager, logger, [str(tmp_path / "*.c")], OutputWriter(stream))
+    return watcher, stream, rules
+
+def write(path, text):
+    path.write_text(text)
+    # Make sure the change is seen on file systems with a coarse modification time.
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_watch_reports_new_and_fixed(tmp_path, watched):
+    """ Confirm only changed files are checked again and only new and fixed violations are
+        reported, not those that moved. """
+    watcher, stream, rules = watched
+    a_file = tmp_path / "a.c"
+    b_file = tmp_path / "b.c"
+    write(a_file, "bad one\nok\nbad two\n")
+    write(b_file, "bad three\n")
+
+    watcher.check_all()
+    assert len(watcher.get_violations()) == 3
+    assert watcher.get_exit_value() == 3
+    assert rules.run_rules_on_file.call_count == 2
+    assert watcher.poll() == []
+    assert rules.run_rules_on_file.call_count == 2
+
+    write(a_file, "added\nbad one\nbad four\nok\n")
+    changes = watcher.poll()
+    assert [(label, v.file_name, v.line, v.message) for label, v in changes] == \
+           [("fixed", str(a_file), 3, "bad: bad two"), ("new", str(a_file), 3, "bad: bad four")]
+    assert rules.run_rules_on_file.call_count == 3
+    assert stream.getvalue().splitlines() == \
+           ["fixed: " + str(a_file) + ":3: WARNING: word: bad: bad two",
+            "new: " + str(a_file) + ":3: WARNING: word: bad: bad four"]
+
+    c_file = tmp_path / "c.c"
+    write(c_file, "bad five\n")
+    os.remove(str(b_file))
+    changes = watcher.poll()
+    assert [(label, v.message) for label, v in changes] == \
+           [("fixed", "bad: bad three"), ("new", "bad: bad five")]
+
+    write(a_file, "ok\n")
+    write(c_file, "ok\n")
+    watcher.poll()
+    assert watcher.get_violations() == []
+    assert watcher.get_exit_value() == 0
+
+def test_compare_counts_repeated_violations(tmp_path, watched):
+    """ Confirm a violation found more or fewer times than before is reported once per
+        difference. """
+    watcher, _, _ = watched
+    a_file = tmp_path / "a.c"
+    write(a_file, "bad\nbad\nok\n")
+    watcher.check_all()
+
+    write(a_file, "bad\nbad\nbad\nok\n")
+    assert [(label, v.line) for label, v in watcher.poll()] == [("new", 3)]
+    write(a_file, "bad\nok\n")
+    assert [(label, v.line) for label, v in watcher.poll()] == [("fixed", 2), ("fixed", 3)]
+
+def test_violations_kept_by_file_checked(tmp_path, watched):
+    """ Confirm violations not named after the file checked, such as those of a rule raising an
+        exception, are replaced when the file is checked again. """
+    watcher, _, _ = watched
+    a_file = tmp_path / "a.c"
+    write(a_file, "raise\nok\n")
+    watcher.check_all()
+    assert [v.file_name for v in watcher.get_violations()] == ["rulecheck"]
+    assert watcher.get_exit_value() == 2
+
+    write(a_file, "raise\nstill ok\n")
+    assert watcher.poll() == []
+    assert len(watcher.get_violations()) == 1
+
+    write(a_file, "ok\n")
+    assert [(label, v.file_name) for label, v in watcher.poll()] == [("fixed", "rulecheck")]
+    assert watcher.get_violations() == []
+